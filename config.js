@@ -16,7 +16,10 @@ const config = {
         manufacturer: 'Pathmathics_Brand_Manufacturer_Classified_v2.csv',
         dme: 'Pathmatics_DME_classified_v2.csv',
         instagram: 'SM_IG_Breast_Pump_Brands_analyzed_v2.csv',
-        tiktok: 'SM_TikTok_Breast_Pump_Brands_analyzed_v2.csv'
+        tiktok: 'SM_TikTok_Breast_Pump_Brands_analyzed_v2.csv',
+        bubbleCube: 'bubble_cube.json',
+        bubbleLayout: 'bubble_layout.json',
+        columnar: 'normalized_sources.json'
     },
     
     // Get current data paths based on version
@@ -24,6 +27,10 @@ const config = {
         return this.DATA_VERSION === 'v2' ? this.dataPathsV2 : this.dataPathsV1;
     },
     
+    // Base URL of scripts/dashboard_service.py, e.g. 'http://127.0.0.1:8765/api', to take
+    // bubbles and totals from the service; null aggregates them in the browser
+    apiEndpoint: null,
+    
     // Default filters
     defaultFilters: {
         mainCategory: 'all',
@@ -9,6 +9,12 @@ let state = {
         instagram: [],
         tiktok: []
     },
+    // Pre-aggregated bubble cube (Data/bubble_cube.json), null when unavailable
+    cube: null,
+    // Precomputed bubble positions and quadtrees (Data/bubble_layout.json), null when unavailable
+    layout: null,
+    // Bubbles answered by scripts/dashboard_service.py for the current filters (config.apiEndpoint)
+    serviceBubbles: null,
     filters: {
         marketingTheme: 'all',
         brandType: 'all',
@@ -84,6 +90,7 @@ const BRAND_MAPPING = {
     'Elvie | Women\'s Health': 'Elvie',
     'Evenflo Feeding': 'Evenflo',
     'Freemiebreastpumps': 'Freemie',
+    'eufy Baby': 'Eufy',
     'Zomee': 'Zomee',
     'Motif Medical': 'Motif Medical',
     'BabyBuddha': 'Baby Buddha',
@@ -136,19 +143,110 @@ const BRAND_MAPPING = {
     'State Bags': 'State Bags'
 };
 
+// Brand name resolution, as in scripts/brand_resolver.py: names are matched on a
+// key without case, punctuation or legal suffixes, then fuzzily on trigrams
+const UNKNOWN_BRAND = 'Unknown Brand';
+const LEGAL_TOKENS = new Set(['inc', 'incorporated', 'ltd', 'limited', 'llc', 'corp', 'corporation', 'co', 'company',
+                              'plc', 'gmbh', 'official', 'usa']);
+const FUZZY_THRESHOLD = 0.7;
+
+// Matching key of a brand name: 'Medela Inc.', 'MEDELA' and 'Medela, Inc' all give 'medela'
+function brandKey(name) {
+    const text = String(name).normalize('NFKD').replace(/[^\x00-\x7F]/g, '');
+    return text.toLowerCase().replace(/&/g, ' and ').split(/[^a-z0-9]+/)
+        .filter(token => token && !LEGAL_TOKENS.has(token))
+        .join(' ');
+}
+
+// Shorter forms a brand also goes by: the name before any '(' or '|', and what is in parentheses
+function brandNameParts(name) {
+    const parts = [name.split(/[(|]/)[0]];
+    for (const match of name.matchAll(/\(([^)]*)\)/g)) {
+        parts.push(match[1]);
+    }
+    return parts;
+}
+
+// Matching key -> canonical brand; shorter forms claimed by two brands are left out
+function buildBrandAliases(mapping) {
+    const aliases = new Map();
+    const claim = (key, canonical) => { if (!aliases.has(key)) aliases.set(key, canonical); };
+    Object.entries(mapping).forEach(([name, canonical]) => {
+        claim(brandKey(name), canonical);
+        claim(brandKey(canonical), canonical);
+    });
+
+    const claims = new Map();
+    Object.entries(mapping).forEach(([name, canonical]) => {
+        brandNameParts(name).forEach(part => {
+            const key = brandKey(part);
+            if (!claims.has(key)) claims.set(key, new Set());
+            claims.get(key).add(canonical);
+        });
+    });
+    claims.forEach((canonicals, key) => {
+        if (key && canonicals.size === 1) claim(key, [...canonicals][0]);
+    });
+
+    aliases.delete('');
+    return aliases;
+}
+
+// Character trigrams of a key, padded so that word starts weigh more
+function brandTrigrams(key) {
+    const padded = `  ${key} `;
+    const grams = new Set();
+    for (let i = 0; i + 3 <= padded.length; i++) {
+        grams.add(padded.slice(i, i + 3));
+    }
+    return grams;
+}
+
+const BRAND_ALIASES = buildBrandAliases(BRAND_MAPPING);
+const BRAND_ALIAS_GRAMS = Array.from(BRAND_ALIASES.keys(), key => [key, brandTrigrams(key)]);
+const brandMemo = new Map();
+
+// Canonical brand of a raw name: alias table first, then the most similar alias if it
+// reaches FUZZY_THRESHOLD without tying with another brand; otherwise the name itself
+function resolveBrandName(name) {
+    if (brandMemo.has(name)) return brandMemo.get(name);
+
+    const key = brandKey(name);
+    let resolved = name;
+    if (BRAND_ALIASES.has(key)) {
+        resolved = BRAND_ALIASES.get(key);
+    } else if (key) {
+        const grams = brandTrigrams(key);
+        const candidates = BRAND_ALIAS_GRAMS
+            .map(([alias, aliasGrams]) => {
+                let shared = 0;
+                grams.forEach(gram => { if (aliasGrams.has(gram)) shared++; });
+                return { alias, shared, score: 2 * shared / (aliasGrams.size + grams.size) };
+            })
+            .sort((a, b) => b.score - a.score)
+            .slice(0, 5)
+            .filter(candidate => candidate.shared > 0);
+        if (candidates.length && candidates[0].score >= FUZZY_THRESHOLD) {
+            const best = BRAND_ALIASES.get(candidates[0].alias);
+            const tied = candidates.slice(1).filter(candidate => candidate.score === candidates[0].score);
+            if (tied.every(candidate => BRAND_ALIASES.get(candidate.alias) === best)) {
+                resolved = best;
+            }
+        }
+    }
+
+    brandMemo.set(name, resolved);
+    return resolved;
+}
+
 // Function to normalize brand names
 function normalizeBrandName(brandName) {
-    if (!brandName || brandName === '' || brandName === 'Unknown') {
-        return 'Unknown Brand';
-    }
-    
-    // Check if we have a direct mapping
-    if (BRAND_MAPPING[brandName]) {
-        return BRAND_MAPPING[brandName];
+    if (!brandName || String(brandName).trim() === '' || String(brandName).trim() === 'Unknown') {
+        return UNKNOWN_BRAND;
     }
     
-    // If no mapping found, return the original name
-    return brandName;
+    // Same resolution as the Python pipeline, so bubbles and their rows agree
+    return resolveBrandName(String(brandName));
 }
 
 // Data normalization layer for v2 compatibility
@@ -300,14 +398,32 @@ async function loadData() {
     console.log('Loading data for Bubble Chart Dashboard');
     
     try {
-        // Load all data sources
-        const [manufacturer, dme, instagram, tiktok] = await Promise.all([
+        // Start loading all data sources
+        const sourcesLoaded = Promise.all([
             d3.csv(config.dataPaths.manufacturer),
             d3.csv(config.dataPaths.dme),
             d3.csv(config.dataPaths.instagram),
             d3.csv(config.dataPaths.tiktok)
         ]);
         
+        // Draw the bubbles from the dashboard service, or else the pre-aggregated cube, while the raw rows load
+        if (config.apiEndpoint) {
+            state.layout = await loadBubbleLayout();
+            await renderFromService();
+        }
+        if (!config.apiEndpoint) {
+            [state.cube, state.layout] = await Promise.all([loadBubbleCube(), loadBubbleLayout()]);
+            if (!state.cube) {
+                const dataset = await loadColumnarDataset();
+                state.cube = dataset ? cubeFromColumns(dataset) : null;
+            }
+            if (state.cube) {
+                renderVisualizationOnly();
+            }
+        }
+        
+        const [manufacturer, dme, instagram, tiktok] = await sourcesLoaded;
+        
         // Normalize data using the new normalizer
         state.data.manufacturer = dataNormalizer.normalizeData(manufacturer, 'manufacturer');
         state.data.dme = dataNormalizer.normalizeData(dme, 'dme');
@@ -333,6 +449,173 @@ async function loadData() {
     }
 }
 
+// Load the bubble cube built by scripts/build_bubble_data.py
+async function loadBubbleCube() {
+    if (!config.dataPaths.bubbleCube) {
+        return null;
+    }
+    
+    try {
+        const cube = await d3.json(config.dataPaths.bubbleCube);
+        console.log(`Loaded bubble cube: ${cube.cells.length} cells`);
+        return cube;
+    } catch (error) {
+        console.warn('Bubble cube not available, aggregating raw rows instead:', error);
+        return null;
+    }
+}
+
+// Typed array constructors by the column types of scripts/columnar_export.py
+const COLUMN_ARRAYS = {
+    uint8: Uint8Array,
+    uint16: Uint16Array,
+    uint32: Uint32Array,
+    float64: Float64Array
+};
+
+// Load the normalized sources written by scripts/columnar_export.py.
+// Each column is a typed array viewed straight over the binary (no per-row
+// parsing); string columns are dictionary codes plus their dictionary.
+async function loadColumnarDataset() {
+    if (!config.dataPaths.columnar) {
+        return null;
+    }
+    
+    try {
+        const manifest = await d3.json(config.dataPaths.columnar);
+        const directory = config.dataPaths.columnar.replace(/[^/]*$/, '');
+        const buffer = await d3.buffer(directory + manifest.data);
+        
+        const columns = {};
+        manifest.columns.forEach(column => {
+            // Typed arrays use the platform byte order, which is little-endian in every browser
+            const values = new COLUMN_ARRAYS[column.type](buffer, column.offset, manifest.rows);
+            columns[column.name] = column.dictionary
+                ? { codes: values, dictionary: column.dictionary, separator: column.separator }
+                : values;
+        });
+        console.log(`Loaded columnar dataset: ${manifest.rows} rows, ${(buffer.byteLength / 1024).toFixed(1)} KB`);
+        return { rows: manifest.rows, columns };
+    } catch (error) {
+        console.warn('Columnar dataset not available, aggregating raw rows instead:', error);
+        return null;
+    }
+}
+
+// Aggregate a columnar dataset into the bubble cube layout of scripts/build_bubble_data.py.
+// Dictionaries are in first-appearance order there too, so the cells come out the same.
+function cubeFromColumns(dataset) {
+    const { rows, columns } = dataset;
+    const themes = columns.themes;
+    const brands = columns.brand;
+    const channels = columns.channel;
+    const sources = columns.source;
+    const productFocus = columns.product_focus;
+    const impressions = columns.impressions;
+    
+    const cells = new Map();
+    for (let i = 0; i < rows; i++) {
+        const key = `${themes.codes[i]},${brands.codes[i]},${channels.codes[i]},${sources.codes[i]},${productFocus.codes[i]}`;
+        let cell = cells.get(key);
+        if (!cell) {
+            cell = [themes.codes[i], brands.codes[i], channels.codes[i], sources.codes[i], productFocus.codes[i], 0, 0, 0];
+            cells.set(key, cell);
+        }
+        cell[5] += impressions[i];
+        cell[6] += 1;
+        if (impressions[i] === 0) cell[7] += 1;
+    }
+    
+    return {
+        dictionaries: {
+            themeSets: themes.dictionary.map(value => value.split(themes.separator)),
+            brands: brands.dictionary,
+            channels: channels.dictionary,
+            sources: sources.dictionary,
+            productFocus: productFocus.dictionary
+        },
+        cells: Array.from(cells.values())
+    };
+}
+
+// Load the precomputed bubble layout built by scripts/bubble_layout.py
+async function loadBubbleLayout() {
+    if (!config.dataPaths.bubbleLayout) {
+        return null;
+    }
+    
+    try {
+        const layout = await d3.json(config.dataPaths.bubbleLayout);
+        console.log(`Loaded bubble layout: ${Object.keys(layout.states).length} expansion states`);
+        return layout;
+    } catch (error) {
+        console.warn('Bubble layout not available, packing bubbles in the browser instead:', error);
+        return null;
+    }
+}
+
+// Current filters as the query string scripts/dashboard_service.py reads
+function serviceQuery() {
+    const params = new URLSearchParams();
+    ['marketingTheme', 'brandType', 'channel', 'advertiser', 'productFocus', 'dataSource'].forEach(name => {
+        params.set(name, state.filters[name]);
+    });
+    params.set('excludeNone', state.filters.excludeNone ? 'true' : 'false');
+    return params.toString();
+}
+
+// One query to the dashboard service; the browser revalidates repeats with its ETags
+async function fetchFromService(endpoint) {
+    const response = await fetch(`${config.apiEndpoint}/${endpoint}?${serviceQuery()}`);
+    if (!response.ok) {
+        throw new Error(`${endpoint}: HTTP ${response.status}`);
+    }
+    return response.json();
+}
+
+// Sequence number of the latest service query, so stale answers are dropped
+let serviceRequest = 0;
+
+// Draw the bubbles and headline totals the service aggregated for the current filters.
+// Returns false, and switches to aggregating in the browser, when the service can't be reached.
+async function renderFromService() {
+    const request = ++serviceRequest;
+    try {
+        const [bubbleData, totals] = await Promise.all([fetchFromService('bubbles'), fetchFromService('totals')]);
+        if (request !== serviceRequest) {
+            return true;
+        }
+        bubbleData.forEach(theme => {
+            theme.name = MARKETING_THEMES[theme.id] || theme.id;
+        });
+        state.serviceBubbles = bubbleData;
+        document.getElementById('bubble-visualization').innerHTML = '';
+        renderBubbleChart('bubble-visualization', bubbleData);
+        showServiceTotals(totals);
+        return true;
+    } catch (error) {
+        console.warn('Dashboard service not available, aggregating in the browser instead:', error);
+        config.apiEndpoint = null;
+        state.serviceBubbles = null;
+        return false;
+    }
+}
+
+// Overview metrics of the analysis panel from the service's totals
+function showServiceTotals(totals) {
+    const values = {
+        '#bp-spend .value': `$${totals.spend.toLocaleString()}`,
+        '#bp-impr .value': totals.impressions.toLocaleString(),
+        '#bp-eng .value': totals.engagement.toLocaleString(),
+        '#bp-ads-count .value': totals.ads.toLocaleString(),
+        '#bp-posts-count .value': totals.socialPosts.toLocaleString()
+    };
+    Object.entries(values).forEach(([selector, text]) => {
+        const element = document.querySelector(selector);
+        if (element) element.textContent = text;
+    });
+}
+
 // Setup filter options based on normalized data
 function setupFilters() {
     // Get all unique categories from all data sources
@@ -503,6 +786,145 @@ function applyFilters() {
     return filteredData;
 }
 
+// Check a cube cell against the current filters (same rules as applyFilters)
+function cubeCellMatchesFilters(cube, cell) {
+    const { marketingTheme, brandType, channel, advertiser, productFocus, dataSource, excludeNone } = state.filters;
+    const dictionaries = cube.dictionaries;
+    const themes = dictionaries.themeSets[cell[0]];
+    const sourceType = dictionaries.sources[cell[3]];
+    const isPaid = sourceType === 'manufacturer' || sourceType === 'dme';
+    const isSocial = sourceType === 'instagram' || sourceType === 'tiktok';
+    
+    if (excludeNone && (themes.length === 0 || themes.includes('NONE'))) return false;
+    if (marketingTheme !== 'all' && !themes.includes(marketingTheme)) return false;
+    if (brandType === 'manufacturer' && sourceType !== 'manufacturer') return false;
+    if (brandType === 'dme' && sourceType !== 'dme') return false;
+    if (brandType === 'social' && !isSocial) return false;
+    if (dataSource === 'pathmatics' && !isPaid) return false;
+    if (dataSource === 'social' && !isSocial) return false;
+    if (productFocus !== 'all' && dictionaries.productFocus[cell[4]] !== productFocus) return false;
+    if (channel !== 'all' && dictionaries.channels[cell[2]] !== channel) return false;
+    if (advertiser !== 'all' && dictionaries.brands[cell[1]] !== advertiser) return false;
+    return true;
+}
+
+// Build bubble chart data from the pre-aggregated cube.
+// Produces the same theme -> brand -> channel hierarchy as buildBubbleData;
+// node rows are filled in on click (see rowsForNode).
+function buildBubbleDataFromCube(cube) {
+    const dictionaries = cube.dictionaries;
+    const themeDataMap = new Map();
+    
+    cube.cells.forEach(cell => {
+        if (!cubeCellMatchesFilters(cube, cell)) {
+            return;
+        }
+        
+        const brand = dictionaries.brands[cell[1]];
+        const normalizedBrand = brand && brand !== 'Unknown Brand' ? brand : 'Unknown Brand';
+        const channel = dictionaries.channels[cell[2]] || 'Unspecified';
+        const isDME = dictionaries.sources[cell[3]] === 'dme';
+        const impressions = cell[5];
+        const rows = cell[6];
+        
+        dictionaries.themeSets[cell[0]].forEach(theme => {
+            if (!themeDataMap.has(theme)) {
+                themeDataMap.set(theme, {
+                    id: theme,
+                    name: MARKETING_THEMES[theme] || theme,
+                    totalImpressions: 0,
+                    rowCount: 0,
+                    brandData: new Map()
+                });
+            }
+            
+            const themeData = themeDataMap.get(theme);
+            themeData.totalImpressions += impressions;
+            themeData.rowCount += rows;
+            
+            if (!themeData.brandData.has(normalizedBrand)) {
+                themeData.brandData.set(normalizedBrand, {
+                    id: `${theme}.${normalizedBrand}`,
+                    name: normalizedBrand,
+                    totalImpressions: 0,
+                    rowCount: 0,
+                    hasDME: false,
+                    channelData: new Map()
+                });
+            }
+            
+            const brandData = themeData.brandData.get(normalizedBrand);
+            brandData.totalImpressions += impressions;
+            brandData.rowCount += rows;
+            brandData.hasDME = brandData.hasDME || isDME;
+            
+            if (!brandData.channelData.has(channel)) {
+                brandData.channelData.set(channel, {
+                    id: `${theme}.${normalizedBrand}.${channel}`,
+                    name: channel,
+                    totalImpressions: 0,
+                    rowCount: 0,
+                    hasDME: false
+                });
+            }
+            
+            const channelData = brandData.channelData.get(channel);
+            channelData.totalImpressions += impressions;
+            channelData.rowCount += rows;
+            channelData.hasDME = channelData.hasDME || isDME;
+        });
+    });
+    
+    return Array.from(themeDataMap.values()).map(themeData => ({
+        id: themeData.id,
+        name: themeData.name,
+        value: themeData.totalImpressions,
+        type: 'theme',
+        rowCount: themeData.rowCount,
+        children: Array.from(themeData.brandData.values()).map(brandData => ({
+            id: brandData.id,
+            name: brandData.name,
+            value: brandData.totalImpressions,
+            type: 'brand',
+            theme: themeData.id,
+            rowCount: brandData.rowCount,
+            hasDME: brandData.hasDME,
+            children: Array.from(brandData.channelData.values()).map(channelData => ({
+                id: channelData.id,
+                name: channelData.name,
+                value: channelData.totalImpressions,
+                type: 'channel',
+                theme: themeData.id,
+                brand: brandData.name,
+                rowCount: channelData.rowCount,
+                hasDME: channelData.hasDME,
+                data: []
+            })),
+            data: []
+        })),
+        data: []
+    }));
+}
+
+// Filtered rows behind a bubble node (used when the bubbles came from the cube)
+function rowsForNode(node) {
+    const theme = node.type === 'theme' ? node.id : node.theme;
+    const brand = node.type === 'brand' ? node.name : node.brand;
+    const channel = node.type === 'channel' ? node.name : null;
+    
+    return applyFilters().filter(row => {
+        const themes = row.themes || ['NONE'];
+        if (!themes.includes(theme)) return false;
+        
+        if (brand) {
+            const rowBrand = row['Brand Root'] || row.Advertiser || row.company;
+            if (normalizeBrandName(rowBrand) !== brand) return false;
+        }
+        
+        return !channel || (row.Channel || 'Unspecified') === channel;
+    });
+}
+
 // Build bubble chart data
 function buildBubbleData(data) {
     // Create a map to store theme data with impressions
@@ -658,20 +1080,26 @@ function render() {
     // Update analysis components
     updateAnalysisComponents(filteredData);
     
+    if (config.apiEndpoint) {
+        renderFromService().then(served => {
+            if (!served) renderVisualizationOnly();
+        });
+        return;
+    }
+    
     // Clear and render bubble chart
     document.getElementById('bubble-visualization').innerHTML = '';
-    const bubbleData = buildBubbleData(filteredData);
+    const bubbleData = state.cube ? buildBubbleDataFromCube(state.cube) : buildBubbleData(filteredData);
     console.log('Rendering bubble data:', bubbleData);
     renderBubbleChart('bubble-visualization', bubbleData);
 }
 
 // Render only the visualization without updating analysis components
 function renderVisualizationOnly() {
-    const filteredData = applyFilters();
-    
     // Clear and render bubble chart only
     document.getElementById('bubble-visualization').innerHTML = '';
-    const bubbleData = buildBubbleData(filteredData);
+    const bubbleData = state.serviceBubbles ||
+        (state.cube ? buildBubbleDataFromCube(state.cube) : buildBubbleData(applyFilters()));
     console.log('Rendering bubble data (visualization only):', bubbleData);
     renderBubbleChart('bubble-visualization', bubbleData);
 }
@@ -1353,6 +1781,7 @@ function getVisibleNodes(data) {
                     value: brand.value,
                     type: 'brand',
                     theme: theme.id,
+                    hasDME: brand.hasDME,
                     data: brand.data
                 });
                 
@@ -1366,6 +1795,7 @@ function getVisibleNodes(data) {
                             type: 'channel',
                             theme: theme.id,
                             brand: brand.name,
+                            hasDME: channel.hasDME,
                             data: channel.data
                         });
                     });
@@ -1377,6 +1807,82 @@ function getVisibleNodes(data) {
     return visibleNodes;
 }
 
+// Bubbles smaller than this (in pixels) are not drawn or hit-tested
+const MIN_BUBBLE_RADIUS = 1.5;
+
+// Key of the current expansion state in the precomputed layout
+function layoutStateKey() {
+    const expandedBrand = Array.from(state.expansionState.brands.entries())
+        .find(([id, state]) => state.expanded);
+    if (expandedBrand) return `brand:${expandedBrand[0]}`;
+    
+    const expandedTheme = Array.from(state.expansionState.themes.entries())
+        .find(([id, state]) => state.expanded);
+    if (expandedTheme) return `theme:${expandedTheme[0]}`;
+    
+    return 'all';
+}
+
+// Precomputed positions for these nodes, or null when the layout was built for
+// other nodes (e.g. with filters applied) or a pack area of another size
+function precomputedLayout(nodes, packWidth, packHeight) {
+    const layout = state.layout;
+    if (!layout || Math.min(packWidth, packHeight) !== layout.extent) {
+        return null;
+    }
+    
+    const entry = layout.states[layoutStateKey()];
+    if (!entry || entry.ids.length !== nodes.length ||
+        nodes.some((d, i) => d.id !== entry.ids[i] || d.value !== entry.values[i])) {
+        return null;
+    }
+    return entry;
+}
+
+// Index of the smallest drawn bubble under (x, y), or -1.
+// Walks one root-to-leaf path of the quadtree: a node is
+// [x0, y0, size, first child, first item, item count].
+function quadtreeHit(entry, x, y, minRadius) {
+    const { nodes, items } = entry.quadtree;
+    let found = -1;
+    let node = 0;
+    while (true) {
+        const [x0, y0, size, first, start, count] = nodes[node];
+        for (let k = start; k < start + count; k++) {
+            const i = items[k];
+            const dx = x - entry.x[i];
+            const dy = y - entry.y[i];
+            const r = entry.r[i];
+            if (r >= minRadius && dx * dx + dy * dy <= r * r && (found < 0 || r < entry.r[found])) {
+                found = i;
+            }
+        }
+        if (first < 0) return found;
+        const half = size / 2;
+        node = first + (x >= x0 + half ? 1 : 0) + (y >= y0 + half ? 2 : 0);
+    }
+}
+
+// Indices of bubbles of at least minRadius overlapping the rectangle, in node order
+function quadtreeQuery(entry, x0, y0, x1, y1, minRadius) {
+    const { nodes, items } = entry.quadtree;
+    const found = [];
+    const stack = [0];
+    while (stack.length) {
+        const [nx, ny, size, first, start, count] = nodes[stack.pop()];
+        if (nx > x1 || ny > y1 || nx + size < x0 || ny + size < y0) continue;
+        for (let k = start; k < start + count; k++) {
+            const i = items[k];
+            const x = entry.x[i], y = entry.y[i], r = entry.r[i];
+            if (r >= minRadius && x + r >= x0 && x - r <= x1 && y + r >= y0 && y - r <= y1) {
+                found.push(i);
+            }
+        }
+        if (first >= 0) stack.push(first, first + 1, first + 2, first + 3);
+    }
+    return found.sort((a, b) => a - b);
+}
+
 // Bubble Chart visualization
 function renderBubbleChart(containerId, data) {
     const containerElement = document.getElementById(containerId);
@@ -1434,14 +1940,35 @@ function renderBubbleChart(containerId, data) {
             scaledValue: sizeScale(d.value)
         }));
         
-        // Create the pack layout with scaled values
-        const pack = d3.pack()
-            .size([containerWidth - margin * 2, containerHeight - margin * 2])
-            .padding(5); // Increased padding
+        const packWidth = containerWidth - margin * 2;
+        const packHeight = containerHeight - margin * 2;
         
-        // Compute the hierarchy from the scaled data
-        const root = pack(d3.hierarchy({children: scaledData})
-            .sum(d => d.scaledValue));
+        // Use the positions precomputed by scripts/bubble_layout.py when they
+        // match these nodes; only bubbles big enough to see are drawn
+        const precomputed = precomputedLayout(flattenedData, packWidth, packHeight);
+        let leaves;
+        if (precomputed) {
+            leaves = quadtreeQuery(precomputed, -packWidth / 2, -packHeight / 2, packWidth / 2, packHeight / 2,
+                MIN_BUBBLE_RADIUS)
+                .map(i => ({
+                    index: i,
+                    data: scaledData[i],
+                    value: scaledData[i].scaledValue,
+                    x: precomputed.x[i] + packWidth / 2,
+                    y: precomputed.y[i] + packHeight / 2,
+                    r: precomputed.r[i]
+                }));
+        } else {
+            // Create the pack layout with scaled values
+            const pack = d3.pack()
+                .size([packWidth, packHeight])
+                .padding(5); // Increased padding
+            
+            // Compute the hierarchy from the scaled data
+            const root = pack(d3.hierarchy({children: scaledData})
+                .sum(d => d.scaledValue));
+            leaves = root.leaves();
+        }
         
         // Create the SVG container
         const svg = d3.select(containerElement)
@@ -1452,14 +1979,8 @@ function renderBubbleChart(containerId, data) {
             .attr("style", "max-width: 100%; height: auto; font: 10px sans-serif;")
             .attr("text-anchor", "middle");
         
-        // Place each (leaf) node according to the layout's x and y values
-        const node = svg.append("g")
-            .selectAll()
-            .data(root.leaves())
-            .join("g")
-            .attr("transform", d => `translate(${d.x + margin},${d.y + margin})`)
-            .style("cursor", "pointer")
-                                                    .on("click", (event, d) => {
+        // Node interaction, shared by the per-node listeners and the quadtree hit test
+        const onNodeClick = (event, d) => {
                    event.stopPropagation();
                    console.log('Clicked node:', d.data);
 
@@ -1485,13 +2006,19 @@ function renderBubbleChart(containerId, data) {
                        console.log('Channel clicked:', d.data.name);
                    }
 
+                   // Cube and service nodes carry totals only; pick up their rows now
+                   if (state.cube || state.serviceBubbles) {
+                       d.data.data = rowsForNode(d.data);
+                   }
+
                    // Update blended analysis components
                    handleBlendedNodeClick(d.data);
 
                    // Re-render visualization only (not analysis components)
                    renderVisualizationOnly();
-               })
-            .on("mouseover", function(event, d) {
+        };
+        
+        const onNodeOver = (event, d) => {
                                  // Create custom tooltip
                  const tooltip = d3.select("body").append("div")
                      .attr("class", "custom-tooltip")
@@ -1550,11 +2077,54 @@ function renderBubbleChart(containerId, data) {
                 
                 tooltip.style("left", left + "px")
                        .style("top", top + "px");
-            })
-            .on("mouseout", function() {
-                // Remove custom tooltip
-                d3.selectAll(".custom-tooltip").remove();
-            });
+        };
+        
+        const onNodeOut = () => {
+            // Remove custom tooltip
+            d3.selectAll(".custom-tooltip").remove();
+        };
+        
+        // Place each (leaf) node according to the layout's x and y values
+        const node = svg.append("g")
+            .selectAll()
+            .data(leaves)
+            .join("g")
+            .attr("transform", d => `translate(${d.x + margin},${d.y + margin})`)
+            .style("cursor", "pointer");
+        
+        if (precomputed) {
+            // One set of listeners on the SVG; the quadtree finds the bubble under the pointer
+            const leafByIndex = new Map(leaves.map(d => [d.index, d]));
+            const leafAt = event => {
+                const [x, y] = d3.pointer(event, svg.node());
+                const i = quadtreeHit(precomputed, x - margin - packWidth / 2, y - margin - packHeight / 2,
+                    MIN_BUBBLE_RADIUS);
+                return leafByIndex.get(i) || null;
+            };
+            let hovered = null;
+            
+            node.style("pointer-events", "none");
+            svg.on("mousemove", event => {
+                    const d = leafAt(event);
+                    if (d === hovered) return;
+                    onNodeOut();
+                    hovered = d;
+                    svg.style("cursor", d ? "pointer" : null);
+                    if (d) onNodeOver(event, d);
+                })
+                .on("mouseleave", () => {
+                    hovered = null;
+                    onNodeOut();
+                })
+                .on("click", event => {
+                    const d = leafAt(event);
+                    if (d) onNodeClick(event, d);
+                });
+        } else {
+            node.on("click", onNodeClick)
+                .on("mouseover", onNodeOver)
+                .on("mouseout", onNodeOut);
+        }
         
         // Add a filled circle with animation
         const circles = node.append("circle")
@@ -1599,11 +2169,11 @@ function renderBubbleChart(containerId, data) {
                 
                 if (d.data.type === 'brand') {
                     // Check if this brand has DME data
-                    const hasDMEData = d.data.data.some(row => row.sourceType === 'dme');
+                    const hasDMEData = d.data.hasDME !== undefined ? d.data.hasDME : d.data.data.some(row => row.sourceType === 'dme');
                     return hasDMEData ? "5,5" : "none"; // Dotted pattern for DME brands
                 } else if (d.data.type === 'channel') {
                     // Check if this channel has DME data
-                    const hasDMEData = d.data.data.some(row => row.sourceType === 'dme');
+                    const hasDMEData = d.data.hasDME !== undefined ? d.data.hasDME : d.data.data.some(row => row.sourceType === 'dme');
                     return hasDMEData ? "3,3" : "none"; // Smaller dotted pattern for DME channels
                 }
                 return "none"; // Solid stroke for themes
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import BREASTFEEDING_BRANDS, DATA_DIR, load_ads, parse_dates
+from dimension_index import Dictionary
+
+# Cube dimensions, in cell order; Month is derived from First Seen
+CUBE_DIMENSIONS = ['Brand Root', 'Main_Category', 'Product_Focus', 'Channel', 'Format', 'focus_vs_other', 'Month']
+
+# Additive measures stored per cell
+CUBE_MEASURES = ['ads', 'spend', 'impressions']
+
+# Export columns the cube is built from
+SOURCE_COLUMNS = [dimension for dimension in CUBE_DIMENSIONS if dimension != 'Month'] + [
+    'First Seen', 'Spend (USD)', 'Impressions'
+]
+
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'ad_cube.json')
+
+CUBE_VERSION = 1
+
+
+def month_of(dates):
+    """'YYYY-MM' month of export dates; missing when the date doesn't parse"""
+    return parse_dates(dates).dt.strftime('%Y-%m')
+
+
+class AdCube:
+    """Ad count, spend and impressions pre-aggregated over the report dimensions.
+
+    Every dimension is dictionary-encoded and each distinct combination of
+    codes is one cell, so slices and rollups only ever touch cells, never raw
+    rows. Missing values get code -1 and are left out of rollups, as groupby
+    and crosstab leave them out. Each cell also keeps the position of its
+    first row, so ties in ``value_counts`` come out in the same order as
+    pandas gives them.
+    """
+
+    def __init__(self, dictionaries, cells):
+        self.dictionaries = dictionaries
+        self.cells = cells
+        self.dimensions = list(dictionaries)
+
+    @classmethod
+    def from_frame(cls, df, dimensions=CUBE_DIMENSIONS):
+        """Aggregate an ads frame into cells"""
+        dictionaries = {}
+        codes = {}
+        for dimension in dimensions:
+            values = month_of(df['First Seen']) if dimension == 'Month' else df[dimension]
+            dictionaries[dimension] = Dictionary.from_series(values)
+            codes[dimension] = dictionaries[dimension].encode(values)
+
+        measures = pd.DataFrame(codes)
+        measures['ads'] = 1
+        measures['spend'] = pd.to_numeric(df['Spend (USD)'], errors='coerce').to_numpy()
+        measures['impressions'] = pd.to_numeric(df['Impressions'], errors='coerce').to_numpy()
+        measures['first_row'] = np.arange(len(df))
+
+        cells = measures.groupby(list(dimensions), sort=False).agg(
+            ads=('ads', 'sum'), spend=('spend', 'sum'), impressions=('impressions', 'sum'),
+            first_row=('first_row', 'min')
+        ).reset_index()
+        return cls(dictionaries, cells)
+
+    def _codes(self, dimension, selector):
+        """Codes picked by a value, a list of values or a predicate on values"""
+        dictionary = self.dictionaries[dimension]
+        if callable(selector):
+            return [code for code, value in enumerate(dictionary.values) if selector(value)]
+        if isinstance(selector, (list, tuple, set)):
+            return [dictionary.code(value) for value in selector]
+        return [dictionary.code(selector)]
+
+    def _where(self, where):
+        """Boolean mask over cells for a {dimension: selector} filter"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dimension, selector in (where or {}).items():
+            codes = [code for code in self._codes(dimension, selector) if code >= 0]
+            mask &= np.isin(self.cells[dimension].to_numpy(), codes)
+        return mask
+
+    def slice(self, where):
+        """A cube of only the cells matching ``where``, sharing the dictionaries"""
+        return AdCube(self.dictionaries, self.cells[self._where(where)].reset_index(drop=True))
+
+    def total(self, measure='ads', where=None):
+        """Sum of one measure over the matching cells, as a Python number"""
+        return self.cells.loc[self._where(where), measure].sum().item()
+
+    def rollup(self, dimensions, measures=CUBE_MEASURES, where=None):
+        """Measures summed per combination of ``dimensions``, labelled and sorted"""
+        dimensions = [dimensions] if isinstance(dimensions, str) else list(dimensions)
+        cells = self.cells[self._where(where)]
+        cells = cells[(cells[dimensions] >= 0).all(axis=1)]
+
+        # Dictionaries are sorted, so sorting by code sorts by label
+        grouped = cells.groupby(dimensions)[list(measures)].sum()
+        labels = [
+            self.dictionaries[dimension].values[grouped.index.get_level_values(dimension)]
+            for dimension in dimensions
+        ]
+        grouped.index = pd.MultiIndex.from_arrays(labels, names=dimensions) if len(dimensions) > 1 \
+            else pd.Index(labels[0], name=dimensions[0])
+        return grouped
+
+    def value_counts(self, dimension, where=None, measure='ads'):
+        """Like ``Series.value_counts`` on a dimension of the matching rows"""
+        cells = self.cells[self._where(where)]
+        cells = cells[cells[dimension] >= 0]
+        grouped = cells.groupby(dimension).agg(count=(measure, 'sum'), first_row=('first_row', 'min'))
+
+        # Largest first; ties in order of first appearance
+        grouped = grouped.sort_values('first_row').sort_values('count', ascending=False, kind='stable')
+        index = pd.Index(self.dictionaries[dimension].values[grouped.index], name=dimension)
+        return pd.Series(grouped['count'].to_numpy(), index=index, name='count')
+
+    def crosstab(self, rows, columns, where=None, measure='ads'):
+        """Like ``pd.crosstab`` of two dimensions over the matching rows"""
+        table = self.rollup([rows, columns], [measure], where)[measure]
+        return table.unstack(fill_value=0).rename_axis(index=rows, columns=columns)
+
+    def to_dict(self):
+        """Compact artifact: dictionaries plus one array of codes and measures per cell"""
+        columns = self.dimensions + CUBE_MEASURES + ['first_row']
+        return {
+            'version': CUBE_VERSION,
+            'dimensions': self.dimensions,
+            'measures': CUBE_MEASURES + ['first_row'],
+            'dictionaries': {
+                dimension: dictionary.values.tolist() for dimension, dictionary in self.dictionaries.items()
+            },
+            'cells': [
+                [_compact_number(value) for value in cell]
+                for cell in self.cells[columns].itertuples(index=False, name=None)
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, artifact):
+        if artifact.get('version') != CUBE_VERSION:
+            raise ValueError(f"Unsupported cube version {artifact.get('version')}")
+        dimensions = artifact['dimensions']
+        dictionaries = {dimension: Dictionary(artifact['dictionaries'][dimension]) for dimension in dimensions}
+        cells = pd.DataFrame(artifact['cells'], columns=dimensions + artifact['measures'])
+        cells[dimensions] = cells[dimensions].astype(np.int32)
+        cells['spend'] = cells['spend'].astype(float)
+        cells['impressions'] = cells['impressions'].astype(float)
+        return cls(dictionaries, cells)
+
+    def save(self, path):
+        """Write the cube as compact JSON"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def _compact_number(value):
+    """Write whole numbers as ints to keep the artifact small"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def main():
+    """Build and save the aggregate cube for the reports and dashboards"""
+    parser = argparse.ArgumentParser(description="Build the brand/category/channel/month aggregate cube")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the cube JSON")
+    parser.add_argument('--all-brands', action='store_true',
+                        help="aggregate every brand instead of the breastfeeding brands")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ads = load_ads(columns=SOURCE_COLUMNS, brands=None if args.all_brands else BREASTFEEDING_BRANDS)
+    cube = AdCube.from_frame(ads)
+    cube.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Wrote {len(cube.cells):,} cells from {len(ads):,} rows to {args.output} "
+          f"({size_kb:.1f} KB) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,129 +1,192 @@
 #!/usr/bin/env python3
 import pandas as pd
-import numpy as np
-from collections import Counter
-import re
 import json
+import math
+import argparse
+import os
 
-def load_and_analyze_ads_data():
-    """Load and analyze ads performance data"""
+from data_loader import BREASTFEEDING_BRANDS, CHUNK_SIZE, DEFAULT_CSV, iter_ads_chunks, load_ads, source_fingerprint
+from incremental_state import STATE_DIR, IncrementalState
+import instrumentation
+from instrumentation import Instrumentation
+from metrics import SPEND_WEIGHTED, aggregate, cpm, performance_score, weighted_cpm
+from near_duplicates import collapse_duplicates, duplicate_clusters
+import result_cache
+from result_cache import ResultCache
+import results_writer
+from results_writer import FORMATS, LAYOUTS, compact_results, output_path, write_results
+from stage_runner import Stage, StageRunner
+from streaming import StreamingAggregate, TopN
+from text_store import load_ads_with_text_store
+from theme_engine import THEME_RULES, THEME_TEXT_COLUMNS, detect_theme_matrix, summarize_theme_matrix
+from top_k import TOP_RANKINGS, TopK, ad_records
+
+# Per-brand aggregations shared by the in-memory and streaming paths
+BRAND_PERFORMANCE_AGG = {
+    'Impressions': ['sum', 'mean', 'max'],
+    'Spend (USD)': ['sum', 'mean'],
+    'Creative Id': 'count',
+    # Weighted by spend, like the summary's avg_cpm
+    'CPM': SPEND_WEIGHTED,
+    'Performance_Score': 'mean'
+}
+
+# Per-channel and per-format totals of the top ads, plus the CPM of those totals
+TOP_ADS_AGG = {'Impressions': 'sum', 'Spend (USD)': 'sum', 'Creative Id': 'count'}
+
+# Aggregates kept up to date by the incremental mode, per dimension
+INCREMENTAL_AGGREGATIONS = {
+    'Brand Root': BRAND_PERFORMANCE_AGG,
+    'Channel': {'Impressions': 'sum', 'Spend (USD)': 'sum', 'Creative Id': 'count'},
+    'Creative Type_x': {'Impressions': 'sum', 'Spend (USD)': 'sum', 'Creative Id': 'count'}
+}
+
+# Fields read for the sample ad content
+SAMPLE_COLUMNS = ['Brand Root', 'Impressions', 'Spend (USD)', 'CPM', 'Channel', 'Creative Type_x',
+                  'Text_x', 'value_proposition', 'Main_Category', 'Sub_Category']
+
+def clean_metric_columns(ads_data):
+    """Coerce the raw metric columns to numbers, treating blanks as zero"""
+    ads_data['Impressions'] = pd.to_numeric(ads_data['Impressions'], errors='coerce').fillna(0)
+    ads_data['Spend (USD)'] = pd.to_numeric(ads_data['Spend (USD)'], errors='coerce').fillna(0)
+    ads_data['Duration'] = pd.to_numeric(ads_data['Duration'], errors='coerce').fillna(0)
+    return ads_data
+
+def derive_performance_metrics(ads_data):
+    """Derive CPM and Performance_Score from cleaned metric columns"""
+    ads_data['CPM'] = cpm(ads_data['Spend (USD)'], ads_data['Impressions'])
+    ads_data['Performance_Score'] = performance_score(ads_data['Impressions'], ads_data['CPM'])
+    return ads_data
+
+def add_performance_metrics(ads_data):
+    """Clean metric columns and derive CPM and Performance_Score"""
+    return derive_performance_metrics(clean_metric_columns(ads_data))
+
+def load_and_analyze_ads_data(collapse=False, text_store=False, brands=BREASTFEEDING_BRANDS):
+    """Load and analyze ads performance data; returns the frame and its text store"""
     print("Loading ads data...")
     
-    # Load the main dataset with encoding handling
-    try:
-        df = pd.read_csv('Data/Pathmathics_Brand_Manufacturer_Classified.csv', encoding='utf-8')
-    except UnicodeDecodeError:
-        try:
-            df = pd.read_csv('Data/Pathmathics_Brand_Manufacturer_Classified.csv', encoding='latin-1')
-        except UnicodeDecodeError:
-            df = pd.read_csv('Data/Pathmathics_Brand_Manufacturer_Classified.csv', encoding='cp1252')
-    
-    # Define breastfeeding brands
-    breastfeeding_brands = [
-        'Medela Inc.',
-        'Elvie (Chiaro Technology Ltd)',
-        'Momcozy',
-        'Avent',
-        'Evenflo',
-        'Motif Medical',
-        "Dr. Brown's (Handi-Craft Company)",
-        'TOMMEE TIPPEE (Mayborn USA Inc.)',
-        'Pumpables',
-        'Freemie',
-        'Spectra Baby',
-        'Baby Buddha Products'
-    ]
-    
-    # Filter for breastfeeding brands and ads data
-    ads_data = df[df['Brand Root'].isin(breastfeeding_brands)].copy()
+    # Load the main dataset, keeping only ``brands`` while parsing
+    texts = None
+    if text_store:
+        # Free-text columns stay in a memory-mapped store until a stage needs them
+        ads_data, texts = load_ads_with_text_store(brands=brands)
+    else:
+        ads_data = load_ads(brands=brands)
     
     # Clean and prepare data
-    ads_data['Impressions'] = pd.to_numeric(ads_data['Impressions'], errors='coerce').fillna(0)
-    ads_data['Spend (USD)'] = pd.to_numeric(ads_data['Spend (USD)'], errors='coerce').fillna(0)
-    ads_data['Duration'] = pd.to_numeric(ads_data['Duration'], errors='coerce').fillna(0)
+    ads_data = clean_metric_columns(ads_data)
+    if collapse:
+        # One row per near-duplicate cluster, with its metrics summed
+        rows = len(ads_data)
+        ads_data = collapse_duplicates(ads_data, duplicate_clusters(ads_data))
+        print(f"Collapsed {rows:,} ads into {len(ads_data):,} near-duplicate clusters")
+    ads_data = derive_performance_metrics(ads_data)
+    
+    return ads_data, texts
+
+def summarize_ads(ads_data):
+    """Headline totals for the analyzed ads"""
+    # Exact float sums so streaming runs report the very same totals
+    return {
+        'total_ads': len(ads_data),
+        'total_impressions': int(ads_data['Impressions'].sum()),
+        'total_spend': math.fsum(ads_data['Spend (USD)']),
+        'avg_cpm': weighted_cpm(ads_data['CPM'], ads_data['Spend (USD)'], ads_data['Impressions']) if len(ads_data) else float('nan')
+    }
+
+def stream_ads_data(top_n=20, chunksize=CHUNK_SIZE, brands=BREASTFEEDING_BRANDS):
+    """Compute the summary, top ads and brand aggregates in one chunked pass.
+    
+    Memory stays flat: only mergeable partial aggregates and the current
+    top-N rows are kept while the export is read chunk by chunk.
+    """
+    print("Streaming ads data...")
+    
+    totals = StreamingAggregate('_all', {'Impressions': 'sum', 'Spend (USD)': 'sum', 'CPM': SPEND_WEIGHTED})
+    brand_aggregate = StreamingAggregate('Brand Root', BRAND_PERFORMANCE_AGG)
+    top_trackers = {
+        category: TopN(top_n, ranking.column, where=ranking.mask if ranking.above else None)
+        for category, ranking in TOP_RANKINGS.items()
+    }
     
-    # Calculate performance metrics
-    ads_data['CPM'] = np.where(ads_data['Impressions'] > 0, 
-                               (ads_data['Spend (USD)'] / ads_data['Impressions']) * 1000, 0)
-    ads_data['Performance_Score'] = ads_data['Impressions'] * (1 / (1 + ads_data['CPM']))
+    for chunk in iter_ads_chunks(brands=brands, chunksize=chunksize):
+        chunk = add_performance_metrics(chunk)
+        totals.update(chunk.assign(_all=0))
+        brand_aggregate.update(chunk)
+        for tracker in top_trackers.values():
+            tracker.update(chunk)
+    
+    total_row = totals.result()
+    summary = {
+        'total_ads': totals.rows,
+        'total_impressions': int(total_row['Impressions'].sum()),
+        'total_spend': float(total_row['Spend (USD)'].sum()),
+        'avg_cpm': float(total_row['CPM'].iloc[0]) if len(total_row) else float('nan')
+    }
+    top_ads_data = {category: tracker.result() for category, tracker in top_trackers.items()}
     
-    return ads_data, breastfeeding_brands
+    return summary, top_ads_data, brand_aggregate.result()
 
-def analyze_top_performing_ads(ads_data, top_n=20):
-    """Analyze the top performing ads by impressions and efficiency"""
+# Columns derive_creative_fields reads
+CREATIVE_FIELD_COLUMNS = ['Impressions', 'Spend (USD)'] + THEME_TEXT_COLUMNS
+
+def derive_creative_fields(rows):
+    """Per-row fields the incremental store keeps: CPM, Performance_Score and themes"""
+    metrics = derive_performance_metrics(rows[['Impressions', 'Spend (USD)']].copy())
+    return pd.concat([metrics[['CPM', 'Performance_Score']], detect_theme_matrix(rows)], axis=1)
+
+def incremental_ads_data(state_dir=STATE_DIR, source=DEFAULT_CSV, brands=BREASTFEEDING_BRANDS):
+    """Load the ads and refresh the persisted state for new or changed creatives only.
     
-    print(f"\n=== TOP {top_n} PERFORMING ADS ANALYSIS ===")
+    Returns the prepared ads, their theme matrix and the per-brand aggregates,
+    identical to what a full run computes.
+    """
+    print("Loading ads data (incremental)...")
     
-    # Top by impressions
-    top_by_impressions = ads_data.nlargest(top_n, 'Impressions')
+    ads_data = clean_metric_columns(load_ads(source, brands=brands))
     
-    # Top by efficiency (high impressions, low CPM)
-    top_by_efficiency = ads_data.nlargest(top_n, 'Performance_Score')
+    # Another brand subset starts from a fresh state
+    signature = json.dumps([THEME_RULES, INCREMENTAL_AGGREGATIONS, sorted(brands)], sort_keys=True)
+    state = IncrementalState(state_dir, signature=signature)
+    if not state.load(source):
+        print("No usable state found; processing every creative")
     
-    # Top by spend efficiency (low CPM)
-    efficient_ads = ads_data[ads_data['Impressions'] > 1000].nlargest(top_n, 'Impressions')
+    derived, aggregates = state.refresh(ads_data, derive_creative_fields, INCREMENTAL_AGGREGATIONS,
+                                        CREATIVE_FIELD_COLUMNS)
+    state.save(source)
     
-    return {
-        'top_by_impressions': top_by_impressions,
-        'top_by_efficiency': top_by_efficiency,
-        'efficient_ads': efficient_ads
-    }
+    stats = state.last_refresh
+    print(f"Reprocessed {stats['changed_creatives']:,} of {stats['creatives']:,} creatives "
+          f"({stats['reprocessed_rows']:,} of {stats['rows']:,} rows)")
+    
+    ads_data['CPM'] = derived['CPM']
+    ads_data['Performance_Score'] = derived['Performance_Score']
+    theme_matrix = derived.drop(columns=['CPM', 'Performance_Score']).astype(bool)
+    
+    return ads_data, theme_matrix, aggregates['Brand Root']
 
-def analyze_ad_themes_and_content(top_ads_data):
-    """Analyze themes and content of top performing ads"""
+def analyze_top_performing_ads(ads_data, top_n=20, texts=None):
+    """Analyze the top performing ads by impressions and efficiency"""
     
-    print("\n=== AD THEMES AND CONTENT ANALYSIS ===")
+    print(f"\n=== TOP {top_n} PERFORMING ADS ANALYSIS ===")
     
-    # Define theme detection rules
-    theme_rules = {
-        'Wearable/Portability': [
-            r'wearable', r'hands.?free', r'portable', r'on the go', r'discreet', 
-            r'quiet', r'wireless', r'compact', r'stealth', r'under clothes'
-        ],
-        'Comfort/Soothing': [
-            r'comfort', r'gentle', r'soft', r'fit', r'soothe', r'sore', 
-            r'lanolin', r'leak', r'pain.?free', r'gentle', r'cushion'
-        ],
-        'Performance/Suction': [
-            r'power', r'performance', r'strong', r'suction', r'hospital.?grade', 
-            r'efficiency', r'output', r'milk.?production', r'flow'
-        ],
-        'Education/How-to': [
-            r'how to', r'guide', r'tips?', r'tutorial', r'learn', r'explainer',
-            r'step.?by.?step', r'instructions', r'help'
-        ],
-        'Lifestyle/Motherhood': [
-            r'mom', r'mother', r'family', r'postpartum', r'journey', 
-            r'return to work', r'night', r'sleep', r'breastfeeding.?journey'
-        ],
-        'Value/Promotion': [
-            r'deal', r'discount', r'save', r'off\b', r'coupon', r'promo', 
-            r'bundle', r'free', r'gift', r'sale', r'offer'
-        ],
-        'Emotional Connection': [
-            r'love', r'care', r'support', r'confidence', r'empower', 
-            r'beautiful', r'special', r'moment', r'connection'
-        ],
-        'Convenience': [
-            r'easy', r'simple', r'quick', r'fast', r'convenient', 
-            r'time.?saving', r'effortless', r'one.?touch'
-        ]
-    }
+    # Top by impressions, by efficiency (high impressions, low CPM) and by
+    # spend efficiency, all from one partitioning pass
+    top_ads = TopK(ads_data, top_n).frames()
+    if texts is not None:
+        # Only the top ads get their text back from the store
+        top_ads = {category: texts.attach(ads_df) for category, ads_df in top_ads.items()}
+    return top_ads
+
+def detect_stored_theme_matrix(texts):
+    """Theme matrix over the text columns kept in a text store"""
+    return detect_theme_matrix(texts.frame(THEME_TEXT_COLUMNS))
+
+def analyze_ad_themes_and_content(top_ads_data, theme_matrix=None):
+    """Analyze themes and content of top performing ads"""
     
-    def detect_themes(text):
-        if pd.isna(text) or text == '':
-            return []
-        
-        text_lower = str(text).lower()
-        detected_themes = []
-        
-        for theme, patterns in theme_rules.items():
-            for pattern in patterns:
-                if re.search(pattern, text_lower):
-                    detected_themes.append(theme)
-                    break
-        
-        return detected_themes
+    print("\n=== AD THEMES AND CONTENT ANALYSIS ===")
     
     # Analyze themes in top ads
     theme_analysis = {}
@@ -131,20 +194,13 @@ def analyze_ad_themes_and_content(top_ads_data):
     for category, ads_df in top_ads_data.items():
         print(f"\n--- {category.replace('_', ' ').title()} ---")
         
-        themes_count = Counter()
-        brand_themes = {}
+        # Reuse a precomputed matrix for the full frame when one is given
+        if theme_matrix is not None:
+            category_matrix = theme_matrix.loc[ads_df.index]
+        else:
+            category_matrix = detect_theme_matrix(ads_df)
         
-        for _, ad in ads_df.iterrows():
-            # Combine all text fields
-            combined_text = f"{ad.get('Text_x', '')} {ad.get('Text_y', '')} {ad.get('overall_description', '')} {ad.get('value_proposition', '')}"
-            
-            themes = detect_themes(combined_text)
-            themes_count.update(themes)
-            
-            brand = ad['Brand Root']
-            if brand not in brand_themes:
-                brand_themes[brand] = Counter()
-            brand_themes[brand].update(themes)
+        themes_count, brand_themes = summarize_theme_matrix(category_matrix, ads_df['Brand Root'])
         
         theme_analysis[category] = {
             'overall_themes': themes_count,
@@ -155,6 +211,13 @@ def analyze_ad_themes_and_content(top_ads_data):
     
     return theme_analysis
 
+def summarize_top_ads_by(ads_df, dimension):
+    """Totals and CPM of the ads per value of ``dimension``, in one aggregation pass"""
+    performance = aggregate(ads_df, dimension, TOP_ADS_AGG, metrics=['CPM'])
+    performance.columns = ['Total_Impressions', 'Total_Spend', 'Ad_Count', 'CPM']
+    performance[['Total_Impressions', 'Total_Spend']] = performance[['Total_Impressions', 'Total_Spend']].round(2)
+    return performance.sort_values('Total_Impressions', ascending=False)
+
 def analyze_ad_formats_and_channels(top_ads_data):
     """Analyze formats and channels of top performing ads"""
     
@@ -165,25 +228,9 @@ def analyze_ad_formats_and_channels(top_ads_data):
     for category, ads_df in top_ads_data.items():
         print(f"\n--- {category.replace('_', ' ').title()} ---")
         
-        # Channel analysis
-        channel_performance = ads_df.groupby('Channel').agg({
-            'Impressions': 'sum',
-            'Spend (USD)': 'sum',
-            'Creative Id': 'count'
-        }).round(2)
-        channel_performance.columns = ['Total_Impressions', 'Total_Spend', 'Ad_Count']
-        channel_performance['CPM'] = (channel_performance['Total_Spend'] / channel_performance['Total_Impressions']) * 1000
-        channel_performance = channel_performance.sort_values('Total_Impressions', ascending=False)
-        
-        # Format analysis
-        format_performance = ads_df.groupby('Creative Type_x').agg({
-            'Impressions': 'sum',
-            'Spend (USD)': 'sum',
-            'Creative Id': 'count'
-        }).round(2)
-        format_performance.columns = ['Total_Impressions', 'Total_Spend', 'Ad_Count']
-        format_performance['CPM'] = (format_performance['Total_Spend'] / format_performance['Total_Impressions']) * 1000
-        format_performance = format_performance.sort_values('Total_Impressions', ascending=False)
+        # Channel and format analysis
+        channel_performance = summarize_top_ads_by(ads_df, 'Channel')
+        format_performance = summarize_top_ads_by(ads_df, 'Creative Type_x')
         
         format_channel_analysis[category] = {
             'channels': channel_performance,
@@ -195,18 +242,15 @@ def analyze_ad_formats_and_channels(top_ads_data):
     
     return format_channel_analysis
 
-def analyze_brand_performance_patterns(ads_data):
+def analyze_brand_performance_patterns(ads_data, brand_aggregates=None):
     """Analyze brand-specific performance patterns"""
     
     print("\n=== BRAND PERFORMANCE PATTERNS ===")
     
-    brand_analysis = ads_data.groupby('Brand Root').agg({
-        'Impressions': ['sum', 'mean', 'max'],
-        'Spend (USD)': ['sum', 'mean'],
-        'Creative Id': 'count',
-        'CPM': 'mean',
-        'Performance_Score': 'mean'
-    }).round(2)
+    # Streaming runs pass in aggregates already merged across chunks
+    if brand_aggregates is None:
+        brand_aggregates = aggregate(ads_data, 'Brand Root', BRAND_PERFORMANCE_AGG)
+    brand_analysis = brand_aggregates.round(2)
     
     brand_analysis.columns = [
         'Total_Impressions', 'Avg_Impressions', 'Max_Impressions',
@@ -230,7 +274,7 @@ def generate_sample_ad_content(top_ads_data):
         print(f"\n--- {category.replace('_', ' ').title()} ---")
         
         samples = []
-        for _, ad in ads_df.head(5).iterrows():
+        for ad in ad_records(ads_df.head(5), SAMPLE_COLUMNS):
             sample = {
                 'brand': ad['Brand Root'],
                 'impressions': ad['Impressions'],
@@ -259,42 +303,126 @@ def generate_sample_ad_content(top_ads_data):
     
     return sample_content
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze top performing breastfeeding brand ads")
+    parser.add_argument('--top-n', type=int, default=20,
+                        help="ads kept per top ranking")
+    parser.add_argument('--brands', nargs='+', default=BREASTFEEDING_BRANDS, metavar='BRAND',
+                        help="brands to analyze, in any spelling; defaults to the breastfeeding brands")
+    parser.add_argument('--stream', action='store_true',
+                        help="aggregate the export chunk by chunk instead of loading it into memory")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                        help="rows per chunk in streaming mode")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reuse the saved state and only reprocess new or changed creatives")
+    parser.add_argument('--state-dir', default=STATE_DIR,
+                        help="where the incremental state is kept")
+    parser.add_argument('--collapse-duplicates', action='store_true',
+                        help="merge near-identical creatives into one ad with summed metrics")
+    parser.add_argument('--text-store', action='store_true',
+                        help="keep free-text columns in a memory-mapped store, read only where needed")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes for running independent analysis stages concurrently")
+    parser.add_argument('--output', default='ads_performance_results.json',
+                        help="results file; the extension follows --format")
+    parser.add_argument('--layout', choices=LAYOUTS, default='legacy',
+                        help="legacy full records, or deduplicated projected creatives as rows or columns")
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help="serialization of the results file")
+    instrumentation.add_arguments(parser)
+    result_cache.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.check_arguments(parser, args)
+    if args.top_n < 1:
+        parser.error("--top-n must be at least 1")
+    if args.stream and args.incremental:
+        parser.error("--stream and --incremental cannot be combined")
+    if args.collapse_duplicates and (args.stream or args.incremental):
+        parser.error("--collapse-duplicates needs the full in-memory load")
+    if args.text_store and (args.stream or args.incremental or args.collapse_duplicates):
+        parser.error("--text-store only works with the default in-memory load")
+    if args.format == 'msgpack' and results_writer.msgpack is None:
+        parser.error("--format msgpack needs the msgpack package")
+    return args
+
+def main(argv=None):
     """Main analysis function"""
-    
-    # Load and prepare data
-    ads_data, breastfeeding_brands = load_and_analyze_ads_data()
-    
-    print(f"Total ads analyzed: {len(ads_data):,}")
-    print(f"Total impressions: {ads_data['Impressions'].sum():,}")
-    print(f"Total spend: ${ads_data['Spend (USD)'].sum():,.2f}")
-    
-    # Analyze top performing ads
-    top_ads_data = analyze_top_performing_ads(ads_data)
-    
-    # Analyze themes and content
-    theme_analysis = analyze_ad_themes_and_content(top_ads_data)
-    
-    # Analyze formats and channels
-    format_channel_analysis = analyze_ad_formats_and_channels(top_ads_data)
-    
-    # Analyze brand performance
-    brand_analysis = analyze_brand_performance_patterns(ads_data)
-    
-    # Generate sample content
-    sample_content = generate_sample_ad_content(top_ads_data)
+    args = parse_args(argv)
+    top_n = args.top_n
+    path = output_path(args.output, args.format)
+    # The stage report goes next to the results file
+    profile = Instrumentation.from_args('ads_performance_analysis', args, os.path.dirname(os.path.abspath(path)))
+    cache = ResultCache.from_args(args)
+    
+    texts = None
+    with profile.stage('load') as record:
+        if args.stream:
+            # Streaming mode keeps only partial aggregates and top-N rows in memory
+            summary, top_ads_data, brand_aggregates = stream_ads_data(top_n, args.chunksize, args.brands)
+            ads_data, theme_matrix = None, None
+            record.rows_out = summary['total_ads']
+        elif args.incremental:
+            # Only new or changed creatives go through metric and theme derivation
+            ads_data, theme_matrix, brand_aggregates = incremental_ads_data(args.state_dir, brands=args.brands)
+        else:
+            # Load and prepare data; with --result-cache a rerun on the same export and brands reads it back
+            brands = sorted(args.brands)
+            source = source_fingerprint(DEFAULT_CSV) if cache.enabled else None
+            ads_data, texts = cache.call(load_and_analyze_ads_data, args.collapse_duplicates, args.text_store,
+                                         brands, depends_on=source)
+            # Stage keys then use the export's fingerprint instead of hashing the frame
+            cache.tag(ads_data, source, brands, args.collapse_duplicates, args.text_store)
+            brand_aggregates, theme_matrix = None, None
+        if ads_data is not None:
+            record.rows_out = len(ads_data)
+    
+    if ads_data is not None:
+        with profile.stage('summary', len(ads_data)):
+            summary = summarize_ads(ads_data)
+    
+    print(f"Total ads analyzed: {summary['total_ads']:,}")
+    print(f"Total impressions: {summary['total_impressions']:,}")
+    print(f"Total spend: ${summary['total_spend']:,.2f}")
+    
+    # Independent stages run concurrently with --workers > 1
+    stages = []
+    if ads_data is not None:
+        stages.append(Stage('top_ads', analyze_top_performing_ads, ['ads_data', 'top_n', 'texts']))
+        if texts is not None:
+            # Decode only the theme text columns from the store
+            stages.append(Stage('theme_matrix', detect_stored_theme_matrix, ['texts']))
+        elif theme_matrix is None:
+            # Detect themes once over the full dataset, sharded by row range
+            stages.append(Stage('theme_matrix', detect_theme_matrix, ['ads_data'],
+                                shards=True, columns=THEME_TEXT_COLUMNS))
+    else:
+        print(f"\n=== TOP {top_n} PERFORMING ADS ANALYSIS ===")
+    
+    stages.extend([
+        Stage('theme_analysis', analyze_ad_themes_and_content, ['top_ads', 'theme_matrix']),
+        Stage('format_channel_analysis', analyze_ad_formats_and_channels, ['top_ads']),
+        Stage('brand_analysis', analyze_brand_performance_patterns, ['ads_data', 'brand_aggregates'],
+              columns=['Brand Root'] + list(BRAND_PERFORMANCE_AGG)),
+        Stage('sample_content', generate_sample_ad_content, ['top_ads'])
+    ])
+    
+    initial = {'ads_data': ads_data, 'top_n': top_n, 'brand_aggregates': brand_aggregates, 'texts': texts}
+    if ads_data is None:
+        initial['top_ads'] = top_ads_data
+    if theme_matrix is not None or ads_data is None:
+        initial['theme_matrix'] = theme_matrix
+    
+    runner = StageRunner(stages, workers=args.workers, instrumentation=profile, cache=cache)
+    stage_results = runner.run(initial)
+    top_ads_data = stage_results['top_ads']
+    theme_analysis = stage_results['theme_analysis']
+    format_channel_analysis = stage_results['format_channel_analysis']
+    brand_analysis = stage_results['brand_analysis']
+    sample_content = stage_results['sample_content']
     
     # Save results to JSON for use in the dashboard
     results = {
-        'summary': {
-            'total_ads': len(ads_data),
-            'total_impressions': int(ads_data['Impressions'].sum()),
-            'total_spend': float(ads_data['Spend (USD)'].sum()),
-            'avg_cpm': float(ads_data['CPM'].mean())
-        },
-        'top_ads': {
-            category: df.to_dict('records') for category, df in top_ads_data.items()
-        },
+        'summary': summary,
         'theme_analysis': {
             category: {
                 'overall_themes': dict(data['overall_themes']),
@@ -311,11 +439,25 @@ def main():
         'sample_content': sample_content
     }
     
-    with open('ads_performance_results.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    with profile.stage('build_results', sum(len(df) for df in top_ads_data.values())):
+        if args.layout == 'legacy':
+            # Every column of every top ad, pretty-printed
+            top_ads = {category: df.to_dict('records') for category, df in top_ads_data.items()}
+            results = {'summary': summary, 'top_ads': top_ads, **results}
+            indent = 2
+        else:
+            results = compact_results(results, top_ads_data, args.layout)
+            indent = None
+    
+    with profile.stage('write_results'):
+        size, elapsed = write_results(results, path, args.format, indent)
     
     print("\n=== ANALYSIS COMPLETE ===")
-    print("Results saved to ads_performance_results.json")
+    print(f"Results saved to {path} ({size / 1024:,.1f} KB, serialized in {elapsed:.3f}s)")
+    
+    runner.report()
+    cache.report()
+    profile.finish()
     
     return results
 
@@ -2,93 +2,109 @@
 import pandas as pd
 import numpy as np
 from collections import Counter
+import argparse
+
+from data_loader import BREASTFEEDING_BRANDS, load_ads
+from dimension_index import DimensionIndex
+import instrumentation
+from instrumentation import Instrumentation
+
+parser = argparse.ArgumentParser(description="Overview of the breastfeeding brand ads")
+instrumentation.add_arguments(parser)
+args = instrumentation.check_arguments(parser, parser.parse_args())
+profile = Instrumentation.from_args('analyze_data', args)
+
+with profile.stage('load') as record:
+    # Read only the columns this report uses, keeping breastfeeding brands while parsing
+    print("Loading CSV file...")
+    bf_data = load_ads(
+        columns=['Brand Root', 'Main_Category', 'Product_Focus', 'focus_vs_other', 'Text_x',
+                 'value_proposition', 'overall_description', 'target_audience'],
+        brands=BREASTFEEDING_BRANDS
+    )
+    record.rows_in, record.rows_out = bf_data.attrs['source_rows'], len(bf_data)
+
+print(f"Total rows: {bf_data.attrs['source_rows']}")
+print(f"Total columns: {len(bf_data.attrs['source_columns'])}")
 
-# Read the CSV file
-print("Loading CSV file...")
-df = pd.read_csv('/mnt/d/TBWA/Philips/Breastfeeding_Pumps_Dashboard/Data/Brand_Manufacturer_with_downloads_analyzed_with_focus_tag_rows_321_end_classified_media.csv')
-
-print(f"Total rows: {len(df)}")
-print(f"Total columns: {len(df.columns)}")
-
-# Define breastfeeding brands
-breastfeeding_brands = [
-    'Medela Inc.',
-    'Elvie (Chiaro Technology Ltd)',
-    'Momcozy',
-    'Avent',
-    'Evenflo',
-    'Motif Medical',
-    "Dr. Brown's (Handi-Craft Company)",
-    'TOMMEE TIPPEE (Mayborn USA Inc.)',
-    'Pumpables',
-    'Freemie',
-    'Spectra Baby',
-    'Baby Buddha Products'
-]
-
-# Filter for breastfeeding brands
-bf_data = df[df['Brand Root'].isin(breastfeeding_brands)]
 print(f"\nBreastfeeding brand entries: {len(bf_data)}")
 
-# 1. Brand Root Distribution
-print("\n=== BRAND ROOT DISTRIBUTION ===")
-brand_counts = bf_data['Brand Root'].value_counts()
-print(brand_counts)
-
-# 2. Main_Category Distribution for breastfeeding brands
-print("\n=== MAIN CATEGORY DISTRIBUTION (Breastfeeding Brands) ===")
-main_cat_counts = bf_data['Main_Category'].value_counts()
-print(main_cat_counts.head(15))
-
-# 3. Product_Focus Distribution for breastfeeding brands
-print("\n=== PRODUCT FOCUS DISTRIBUTION (Breastfeeding Brands) ===")
-product_focus_counts = bf_data['Product_Focus'].value_counts()
-print(product_focus_counts.head(20))
-
-# 4. Focus vs Other Distribution
-print("\n=== FOCUS VS OTHER DISTRIBUTION (Breastfeeding Brands) ===")
-focus_counts = bf_data['focus_vs_other'].value_counts()
-print(focus_counts)
-
-# 5. Brand-Category Analysis
-print("\n=== BRAND VS MAIN CATEGORY ANALYSIS ===")
-brand_category = pd.crosstab(bf_data['Brand Root'], bf_data['Main_Category'])
-print(brand_category.iloc[:, :10])  # Show first 10 categories
-
-# 6. Sample text content analysis
-print("\n=== SAMPLE TEXT CONTENT ANALYSIS ===")
-# Get non-empty text samples
-text_samples = bf_data[bf_data['Text_x'].notna() & (bf_data['Text_x'] != '')]
-print(f"Entries with text content: {len(text_samples)}")
-
-# Show sample texts for each major brand
-for brand in ['Momcozy', 'Elvie (Chiaro Technology Ltd)', 'Medela Inc.']:
-    brand_texts = text_samples[text_samples['Brand Root'] == brand]['Text_x'].head(3)
-    print(f"\n--- {brand} Sample Texts ---")
-    for i, text in enumerate(brand_texts, 1):
-        print(f"{i}. {text[:100]}...")
-
-# 7. Value Proposition Analysis
-print("\n=== VALUE PROPOSITION ANALYSIS ===")
-value_props = bf_data[bf_data['value_proposition'].notna() & (bf_data['value_proposition'] != '')]
-print(f"Entries with value propositions: {len(value_props)}")
-
-# Show sample value propositions
-for brand in ['Momcozy', 'Elvie (Chiaro Technology Ltd)', 'Medela Inc.']:
-    brand_values = value_props[value_props['Brand Root'] == brand]['value_proposition'].head(2)
-    print(f"\n--- {brand} Value Propositions ---")
-    for i, prop in enumerate(brand_values, 1):
-        print(f"{i}. {prop[:150]}...")
-
-# 8. Communication themes analysis
-print("\n=== COMMUNICATION THEMES ANALYSIS ===")
-
-# Extract key themes from descriptions
-descriptions = bf_data[bf_data['overall_description'].notna() & (bf_data['overall_description'] != '')]
-print(f"Entries with descriptions: {len(descriptions)}")
-
-# Target audience analysis
-audiences = bf_data[bf_data['target_audience'].notna() & (bf_data['target_audience'] != '')]
-print(f"Entries with target audience data: {len(audiences)}")
-
-print("\n=== ANALYSIS COMPLETE ===")
\ No newline at end of file
+with profile.stage('brand_distribution', len(bf_data)) as record:
+    # 1. Brand Root Distribution
+    print("\n=== BRAND ROOT DISTRIBUTION ===")
+    brand_counts = bf_data['Brand Root'].value_counts()
+    print(brand_counts)
+    record.rows_out = len(brand_counts)
+
+with profile.stage('main_category_distribution', len(bf_data)) as record:
+    # 2. Main_Category Distribution for breastfeeding brands
+    print("\n=== MAIN CATEGORY DISTRIBUTION (Breastfeeding Brands) ===")
+    main_cat_counts = bf_data['Main_Category'].value_counts()
+    print(main_cat_counts.head(15))
+    record.rows_out = len(main_cat_counts)
+
+with profile.stage('product_focus_distribution', len(bf_data)) as record:
+    # 3. Product_Focus Distribution for breastfeeding brands
+    print("\n=== PRODUCT FOCUS DISTRIBUTION (Breastfeeding Brands) ===")
+    product_focus_counts = bf_data['Product_Focus'].value_counts()
+    print(product_focus_counts.head(20))
+    record.rows_out = len(product_focus_counts)
+
+with profile.stage('focus_vs_other', len(bf_data)) as record:
+    # 4. Focus vs Other Distribution
+    print("\n=== FOCUS VS OTHER DISTRIBUTION (Breastfeeding Brands) ===")
+    focus_counts = bf_data['focus_vs_other'].value_counts()
+    print(focus_counts)
+    record.rows_out = len(focus_counts)
+
+with profile.stage('brand_category', len(bf_data)) as record:
+    # 5. Brand-Category Analysis
+    print("\n=== BRAND VS MAIN CATEGORY ANALYSIS ===")
+    brand_category = DimensionIndex(bf_data, ['Brand Root', 'Main_Category']).crosstab('Brand Root', 'Main_Category')
+    print(brand_category.iloc[:, :10])  # Show first 10 categories
+    record.rows_out = len(brand_category)
+
+with profile.stage('text_samples', len(bf_data)) as record:
+    # 6. Sample text content analysis
+    print("\n=== SAMPLE TEXT CONTENT ANALYSIS ===")
+    # Get non-empty text samples
+    text_samples = bf_data[bf_data['Text_x'].notna() & (bf_data['Text_x'] != '')]
+    print(f"Entries with text content: {len(text_samples)}")
+
+    # Show sample texts for each major brand
+    for brand in ['Momcozy', 'Elvie', 'Medela']:
+        brand_texts = text_samples[text_samples['Brand Root'] == brand]['Text_x'].head(3)
+        print(f"\n--- {brand} Sample Texts ---")
+        for i, text in enumerate(brand_texts, 1):
+            print(f"{i}. {text[:100]}...")
+    record.rows_out = len(text_samples)
+
+with profile.stage('value_propositions', len(bf_data)) as record:
+    # 7. Value Proposition Analysis
+    print("\n=== VALUE PROPOSITION ANALYSIS ===")
+    value_props = bf_data[bf_data['value_proposition'].notna() & (bf_data['value_proposition'] != '')]
+    print(f"Entries with value propositions: {len(value_props)}")
+
+    # Show sample value propositions
+    for brand in ['Momcozy', 'Elvie', 'Medela']:
+        brand_values = value_props[value_props['Brand Root'] == brand]['value_proposition'].head(2)
+        print(f"\n--- {brand} Value Propositions ---")
+        for i, prop in enumerate(brand_values, 1):
+            print(f"{i}. {prop[:150]}...")
+    record.rows_out = len(value_props)
+
+with profile.stage('communication_themes', len(bf_data)):
+    # 8. Communication themes analysis
+    print("\n=== COMMUNICATION THEMES ANALYSIS ===")
+
+    # Extract key themes from descriptions
+    descriptions = bf_data[bf_data['overall_description'].notna() & (bf_data['overall_description'] != '')]
+    print(f"Entries with descriptions: {len(descriptions)}")
+
+    # Target audience analysis
+    audiences = bf_data[bf_data['target_audience'].notna() & (bf_data['target_audience'] != '')]
+    print(f"Entries with target audience data: {len(audiences)}")
+
+print("\n=== ANALYSIS COMPLETE ===")
+
+profile.finish()
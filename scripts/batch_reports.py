@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+
+from ad_cube import SOURCE_COLUMNS, AdCube
+from data_loader import BREASTFEEDING_BRANDS, REPO_ROOT, load_ads
+import instrumentation
+from instrumentation import Instrumentation
+from keyword_index import KeywordIndex
+from metrics import share_of_voice
+
+# Entities reported on, by report kind
+REPORT_DIMENSIONS = {'brands': 'Brand Root', 'categories': 'Main_Category'}
+
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, 'reports', 'generated')
+
+# Common breastfeeding terms, as counted by messaging_analysis.py
+KEY_TERMS = ['pump', 'breast', 'milk', 'comfort', 'easy', 'free', 'mom', 'baby', 'wireless', 'portable']
+
+# Rows listed per section of an entity report
+TOP_ROWS = 5
+SAMPLE_MESSAGES = 3
+
+
+def ranked_counts(cube, dimension, other, n=TOP_ROWS):
+    """``cube.value_counts(other, where={dimension: value}).head(n)`` for every value at once.
+
+    One groupby over the cells; ties keep pandas' first-appearance order.
+    Returns {value: Series of counts}.
+    """
+    cells = cube.cells[(cube.cells[dimension] >= 0) & (cube.cells[other] >= 0)]
+    grouped = cells.groupby([dimension, other]).agg(count=('ads', 'sum'), first_row=('first_row', 'min')).reset_index()
+    grouped = grouped.sort_values([dimension, 'count', 'first_row'], ascending=[True, False, True])
+    grouped = grouped.groupby(dimension, sort=False).head(n)
+
+    labels = cube.dictionaries[dimension].values
+    other_labels = cube.dictionaries[other].values
+    return {
+        labels[code]: pd.Series(rows['count'].to_numpy(), index=pd.Index(other_labels[rows[other]], name=other),
+                                name='count')
+        for code, rows in grouped.groupby(dimension, sort=False)
+    }
+
+
+def sample_messages(df, dimension, n=SAMPLE_MESSAGES):
+    """First ``n`` non-empty messages of every value of ``dimension``, as (brand, text) pairs"""
+    texted = df[df['Text_x'].notna() & (df['Text_x'] != '')]
+    first = texted.groupby(dimension, sort=False).head(n)
+    return {
+        value: list(zip(rows['Brand Root'], rows['Text_x']))
+        for value, rows in first.groupby(dimension, sort=False)
+    }
+
+
+def focus_ratios(cube, dimension):
+    """Share of ads marked 'focus' among focus and other ads, per value"""
+    table = cube.crosstab(dimension, 'focus_vs_other')
+    focus = table['focus'] if 'focus' in table.columns else pd.Series(0, index=table.index)
+    other = table['other'] if 'other' in table.columns else pd.Series(0, index=table.index)
+    total = focus + other
+    return (focus / total.where(total > 0)).dropna()
+
+
+def compute_sections(df, cube, keywords, kind):
+    """Every section of every entity report of one kind, each computed once for all entities"""
+    dimension = REPORT_DIMENSIONS[kind]
+    # Brand reports break down by category and the other way round
+    counterpart = 'Main_Category' if dimension == 'Brand Root' else 'Brand Root'
+
+    landscape = cube.rollup(dimension, ['ads', 'spend', 'impressions'])
+    landscape['share'] = share_of_voice(landscape['ads'])
+    return {
+        'dimension': dimension,
+        'counterpart': counterpart,
+        'landscape': landscape.sort_values('ads', ascending=False, kind='stable'),
+        'positioning': ranked_counts(cube, dimension, counterpart),
+        'product_focus': ranked_counts(cube, dimension, 'Product_Focus'),
+        'channels': ranked_counts(cube, dimension, 'Channel'),
+        'samples': sample_messages(df, dimension),
+        'key_terms': keywords.counts_by(df[dimension]),
+        'focus_ratio': focus_ratios(cube, dimension)
+    }
+
+
+def _lines(counts):
+    return [f"  {label}: {int(count):,}" for label, count in counts.items()] or ["  (none)"]
+
+
+def render_report(entity, sections):
+    """The text report of one entity"""
+    totals = sections['landscape'].loc[entity]
+    rank = sections['landscape'].index.get_loc(entity) + 1
+    empty = pd.Series(dtype=int)
+
+    lines = [f"=== {entity.upper()} ===", ""]
+    lines.append("--- Landscape ---")
+    lines.append(f"  Ads: {int(totals['ads']):,} ({totals['share']:.1%} of all ads, "
+                 f"#{rank} of {len(sections['landscape'])})")
+    lines.append(f"  Spend: ${totals['spend']:,.2f}")
+    lines.append(f"  Impressions: {totals['impressions']:,.0f}")
+
+    counterpart = 'Categories' if sections['counterpart'] == 'Main_Category' else 'Brands'
+    lines += ["", f"--- Top {counterpart} ---"] + _lines(sections['positioning'].get(entity, empty))
+    lines += ["", "--- Product Focus ---"] + _lines(sections['product_focus'].get(entity, empty))
+    lines += ["", "--- Channels ---"] + _lines(sections['channels'].get(entity, empty))
+
+    lines += ["", "--- Sample Messages ---"]
+    samples = sections['samples'].get(entity, [])
+    for i, (brand, text) in enumerate(samples, 1):
+        clean_text = str(text).replace('\n', ' ').strip()
+        prefix = '' if sections['dimension'] == 'Brand Root' else f"{brand}: "
+        lines.append(f"  {i}. {prefix}{clean_text[:150]}...")
+    if not samples:
+        lines.append("  (none)")
+
+    lines += ["", "--- Key Terms ---"]
+    key_terms = sections['key_terms']
+    terms = key_terms.loc[entity] if entity in key_terms.index else empty
+    top_terms = terms[terms > 0].sort_values(ascending=False, kind='stable').head(TOP_ROWS)
+    lines += _lines(top_terms)
+
+    lines += ["", "--- Focus Ratio ---"]
+    ratio = sections['focus_ratio'].get(entity)
+    lines.append(f"  {ratio:.1%} of ads focus on breastfeeding products" if ratio is not None
+                 else "  (no focus/other labels)")
+    return '\n'.join(lines) + '\n'
+
+
+def slugify(name):
+    """File-name-safe form of an entity name"""
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'unnamed'
+
+
+def write_reports(sections, kind, output_dir):
+    """Write one report per entity plus an index of them; returns the number written"""
+    directory = os.path.join(output_dir, kind)
+    os.makedirs(directory, exist_ok=True)
+
+    index = [f"=== {kind.upper()} ({len(sections['landscape'])}) ===", ""]
+    used = set()
+    for entity, totals in sections['landscape'].iterrows():
+        name = slugify(entity)
+        while name in used:
+            name += '-'
+        used.add(name)
+        with open(os.path.join(directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(render_report(entity, sections))
+        index.append(f"{int(totals['ads']):>8,} ads  {kind}/{name}.txt  {entity}")
+
+    with open(os.path.join(output_dir, f"{kind}_index.txt"), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(index) + '\n')
+    return len(sections['landscape'])
+
+
+def main():
+    """Write a report for every brand and every category from one load and one aggregation pass"""
+    parser = argparse.ArgumentParser(description="Write per-brand and per-category reports in one pass")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help="directory the report files are written to")
+    parser.add_argument('--kind', choices=list(REPORT_DIMENSIONS), action='append',
+                        help="report kinds to write (default: all)")
+    parser.add_argument('--all-brands', action='store_true',
+                        help="report on every brand in the export, not only the breastfeeding brands")
+    instrumentation.add_arguments(parser)
+    args = instrumentation.check_arguments(parser, parser.parse_args())
+    profile = Instrumentation.from_args('batch_reports', args)
+    kinds = args.kind or list(REPORT_DIMENSIONS)
+
+    start = time.perf_counter()
+    with profile.stage('load') as record:
+        df = load_ads(columns=list(dict.fromkeys(SOURCE_COLUMNS + ['Text_x'])),
+                      brands=None if args.all_brands else BREASTFEEDING_BRANDS)
+        record.rows_out = len(df)
+
+    with profile.stage('aggregate', len(df)) as record:
+        # One cube and one keyword index serve every section of every report
+        cube = AdCube.from_frame(df)
+        keywords = KeywordIndex(df['Text_x'], KEY_TERMS)
+        sections = {kind: compute_sections(df, cube, keywords, kind) for kind in kinds}
+        record.rows_out = len(cube.cells)
+
+    print("=== BATCH REPORTS ===")
+    with profile.stage('write', len(df)) as record:
+        written = 0
+        for kind in kinds:
+            count = write_reports(sections[kind], kind, args.output_dir)
+            print(f"{kind.title()}: {count} reports")
+            written += count
+        record.rows_out = written
+
+    print(f"Wrote {written} reports to {args.output_dir} in {time.perf_counter() - start:.2f}s")
+    profile.finish()
+
+
+if __name__ == "__main__":
+    main()
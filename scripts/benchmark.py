@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from data_loader import REPO_ROOT, load_ads
+from instrumentation import DEFAULT_REPORT
+from synthetic_data import DEFAULT_OUTPUT, generate_csv
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Saved runs, one JSON file per label, compared across commits
+BASELINE_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'baselines')
+
+# Slowdown (relative to the baseline) reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# Analysis scripts and the extra options each runs with; {scratch} is a temporary directory
+SCRIPTS = {
+    'ads_performance_analysis': ['--output', os.path.join('{scratch}', 'ads_performance_results.json')],
+    'detailed_analysis': [],
+    'messaging_analysis': []
+}
+
+
+def run_script_benchmark(script, path):
+    """Run one script on ``path`` in a fresh process and read back its instrumented stages.
+
+    The script itself runs with --instrument, so the timings always cover
+    the code it actually executes, and its peak RSS is its own.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        report_path = os.path.join(scratch, DEFAULT_REPORT)
+        command = [sys.executable, os.path.join(SCRIPT_DIR, f"{script}.py"), '--instrument',
+                   '--profile-report', report_path] + [option.format(scratch=scratch) for option in SCRIPTS[script]]
+        completed = subprocess.run(command, cwd=scratch, env=dict(os.environ, PATHMATICS_CSV=os.path.abspath(path)),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode:
+            raise RuntimeError(f"{script} exited with code {completed.returncode}:\n{completed.stderr[-2000:]}")
+        with open(report_path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+    stages = {}
+    for record in records:
+        if record['stage'] == 'total':
+            continue
+        timing = stages.setdefault(record['stage'], {'seconds': 0.0, 'peak_rss_mb': 0.0})
+        timing['seconds'] += record['wall_s']
+        timing['peak_rss_mb'] = max(timing['peak_rss_mb'], record['peak_rss_mb'] or 0.0)
+    total = next(record for record in records if record['stage'] == 'total')
+    return {
+        'stages': stages,
+        'total_seconds': total['wall_s'],
+        'peak_rss_mb': max(record['peak_rss_mb'] or 0.0 for record in records)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(row_counts, scripts=SCRIPTS, repeat=1, seed=0):
+    """Benchmark every script on synthetic data of each size, keeping the best of ``repeat`` runs"""
+    report = {
+        'commit': git_revision(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'runs': {}
+    }
+
+    for rows in row_counts:
+        path = DEFAULT_OUTPUT.format(rows=rows)
+        if not os.path.exists(path):
+            print(f"Generating {rows:,} synthetic rows...")
+            generate_csv(rows, path, seed)
+        # Every script then reads the columnar cache, whichever runs first
+        load_ads(path, verbose=False)
+
+        for script in scripts:
+            best = None
+            for _ in range(repeat):
+                result = run_script_benchmark(script, path)
+                if best is None:
+                    best = result
+                    continue
+                for stage, timing in result['stages'].items():
+                    best['stages'][stage]['seconds'] = min(best['stages'][stage]['seconds'], timing['seconds'])
+                best['total_seconds'] = min(best['total_seconds'], result['total_seconds'])
+                best['peak_rss_mb'] = max(best['peak_rss_mb'], result['peak_rss_mb'])
+
+            report['runs'][f"{script}@{rows}"] = best
+            print_run(script, rows, best)
+
+    return report
+
+
+def print_run(script, rows, run, baseline=None):
+    """Print one script's stage timings, with the change against a baseline run"""
+    print(f"\n=== {script} ({rows:,} rows) ===")
+    for stage, timing in run['stages'].items():
+        line = f"{stage:<24} {timing['seconds']:9.3f}s  peak RSS {timing['peak_rss_mb']:8.1f} MB"
+        if baseline and stage in baseline['stages']:
+            line += _delta(timing['seconds'], baseline['stages'][stage]['seconds'])
+        print(line)
+
+    line = f"{'total':<24} {run['total_seconds']:9.3f}s  peak RSS {run['peak_rss_mb']:8.1f} MB"
+    if baseline:
+        line += _delta(run['total_seconds'], baseline['total_seconds'])
+    print(line)
+
+
+def _delta(current, previous):
+    if previous <= 0:
+        return ''
+    change = current / previous - 1
+    flag = '  REGRESSION' if change > REGRESSION_THRESHOLD else ''
+    return f"  ({change:+.1%} vs baseline){flag}"
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(report, name):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved baseline {name} to {baseline_path(name)}")
+
+
+def compare_with_baseline(report, name):
+    """Print every run next to the same run in a saved baseline; returns the regressions"""
+    with open(baseline_path(name), 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n=== COMPARISON WITH {name} (commit {baseline.get('commit')}) ===")
+    regressions = []
+    for key, run in report['runs'].items():
+        previous = baseline['runs'].get(key)
+        if previous is None:
+            print(f"\n{key}: not in baseline")
+            continue
+        script, rows = key.rsplit('@', 1)
+        print_run(script, int(rows), run, previous)
+        if run['total_seconds'] > previous['total_seconds'] * (1 + REGRESSION_THRESHOLD):
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    """Benchmark the analysis scripts on synthetic Pathmatics-shaped data"""
+    parser = argparse.ArgumentParser(description="Benchmark the analysis scripts on synthetic data")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help="synthetic dataset sizes (10k to 10M rows)")
+    parser.add_argument('--scripts', nargs='+', choices=list(SCRIPTS), default=list(SCRIPTS))
+    parser.add_argument('--repeat', type=int, default=1, help="runs per script; the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='NAME', help="save the results as baseline NAME")
+    parser.add_argument('--compare', metavar='NAME', help="compare against baseline NAME")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.rows, args.scripts, args.repeat, args.seed)
+
+    regressions = []
+    if args.compare:
+        regressions = compare_with_baseline(report, args.compare)
+    if args.save:
+        save_baseline(report, args.save)
+
+    if regressions:
+        print(f"\nRegressions over {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+from data_loader import DATA_DIR
+
+DEFAULT_CUBE = os.path.join(DATA_DIR, 'bubble_cube.json')
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'bubble_layout.json')
+
+# Chart geometry of renderBubbleChart: container width fallback, height and margin
+CHART_WIDTH = 928
+CHART_HEIGHT = 800
+CHART_MARGIN = 20
+
+# d3.pack padding and the d3.scaleSqrt radius range used by renderBubbleChart
+PACK_PADDING = 5
+RADIUS_RANGE = (8, 60)
+
+# Circles kept per quadtree node before it splits
+QUADTREE_CAPACITY = 8
+QUADTREE_MAX_DEPTH = 16
+
+LAYOUT_VERSION = 1
+
+
+class _Circle:
+    __slots__ = ('x', 'y', 'r')
+
+    def __init__(self, x=0.0, y=0.0, r=0.0):
+        self.x, self.y, self.r = x, y, r
+
+
+class _Chain:
+    """Node of the front chain of packed circles"""
+    __slots__ = ('circle', 'next', 'previous')
+
+    def __init__(self, circle):
+        self.circle = circle
+        self.next = self.previous = None
+
+
+def _lcg():
+    """d3's linear congruential generator, so enclosing circles are found in the same order"""
+    state = [1]
+
+    def random():
+        state[0] = (1664525 * state[0] + 1013904223) % 4294967296
+        return state[0] / 4294967296
+    return random
+
+
+def _shuffle(items, random):
+    m = len(items)
+    while m:
+        i = int(random() * m)
+        m -= 1
+        items[m], items[i] = items[i], items[m]
+    return items
+
+
+def _encloses_not(a, b):
+    dr, dx, dy = a.r - b.r, b.x - a.x, b.y - a.y
+    return dr < 0 or dr * dr < dx * dx + dy * dy
+
+
+def _encloses_weak(a, b):
+    dr, dx, dy = a.r - b.r + max(a.r, b.r, 1) * 1e-9, b.x - a.x, b.y - a.y
+    return dr > 0 and dr * dr > dx * dx + dy * dy
+
+
+def _encloses_weak_all(a, basis):
+    return all(_encloses_weak(a, b) for b in basis)
+
+
+def _enclose_basis2(a, b):
+    x21, y21, r21 = b.x - a.x, b.y - a.y, b.r - a.r
+    length = math.sqrt(x21 * x21 + y21 * y21)
+    return _Circle((a.x + b.x + x21 / length * r21) / 2, (a.y + b.y + y21 / length * r21) / 2,
+                   (length + a.r + b.r) / 2)
+
+
+def _enclose_basis3(a, b, c):
+    x1, y1, r1 = a.x, a.y, a.r
+    a2, a3, b2, b3 = x1 - b.x, x1 - c.x, y1 - b.y, y1 - c.y
+    c2, c3 = b.r - r1, c.r - r1
+    d1 = x1 * x1 + y1 * y1 - r1 * r1
+    d2 = d1 - b.x * b.x - b.y * b.y + b.r * b.r
+    d3 = d1 - c.x * c.x - c.y * c.y + c.r * c.r
+    ab = a3 * b2 - a2 * b3
+    xa = (b2 * d3 - b3 * d2) / (ab * 2) - x1
+    xb = (b3 * c2 - b2 * c3) / ab
+    ya = (a3 * d2 - a2 * d3) / (ab * 2) - y1
+    yb = (a2 * c3 - a3 * c2) / ab
+    qa = xb * xb + yb * yb - 1
+    qb = 2 * (r1 + xa * xb + ya * yb)
+    qc = xa * xa + ya * ya - r1 * r1
+    r = -((qb + math.sqrt(qb * qb - 4 * qa * qc)) / (2 * qa) if abs(qa) > 1e-6 else qc / qb)
+    return _Circle(x1 + xa + xb * r, y1 + ya + yb * r, r)
+
+
+def _enclose_basis(basis):
+    if len(basis) == 1:
+        return _Circle(basis[0].x, basis[0].y, basis[0].r)
+    if len(basis) == 2:
+        return _enclose_basis2(*basis)
+    return _enclose_basis3(*basis)
+
+
+def _extend_basis(basis, p):
+    if _encloses_weak_all(p, basis):
+        return [p]
+    for b in basis:
+        if _encloses_not(p, b) and _encloses_weak_all(_enclose_basis2(b, p), basis):
+            return [b, p]
+    for i in range(len(basis) - 1):
+        for j in range(i + 1, len(basis)):
+            bi, bj = basis[i], basis[j]
+            if (_encloses_not(_enclose_basis2(bi, bj), p) and _encloses_not(_enclose_basis2(bi, p), bj)
+                    and _encloses_not(_enclose_basis2(bj, p), bi)
+                    and _encloses_weak_all(_enclose_basis3(bi, bj, p), basis)):
+                return [bi, bj, p]
+    raise ValueError("No enclosing basis found")
+
+
+def enclose(circles, random):
+    """Smallest circle enclosing ``circles`` (Welzl's algorithm, as d3.packEnclose)"""
+    circles = _shuffle(list(circles), random)
+    basis, enclosing, i = [], None, 0
+    while i < len(circles):
+        p = circles[i]
+        if enclosing is not None and _encloses_weak(enclosing, p):
+            i += 1
+        else:
+            basis = _extend_basis(basis, p)
+            enclosing, i = _enclose_basis(basis), 0
+    return enclosing
+
+
+def _place(b, a, c):
+    dx, dy = b.x - a.x, b.y - a.y
+    d2 = dx * dx + dy * dy
+    if d2:
+        a2, b2 = (a.r + c.r) ** 2, (b.r + c.r) ** 2
+        if a2 > b2:
+            x = (d2 + b2 - a2) / (2 * d2)
+            y = math.sqrt(max(0, b2 / d2 - x * x))
+            c.x, c.y = b.x - x * dx - y * dy, b.y - x * dy + y * dx
+        else:
+            x = (d2 + a2 - b2) / (2 * d2)
+            y = math.sqrt(max(0, a2 / d2 - x * x))
+            c.x, c.y = a.x + x * dx - y * dy, a.y + x * dy + y * dx
+    else:
+        c.x, c.y = a.x + c.r, a.y
+
+
+def _intersects(a, b):
+    dr, dx, dy = a.r + b.r - 1e-6, b.x - a.x, b.y - a.y
+    return dr > 0 and dr * dr > dx * dx + dy * dy
+
+
+def _score(node):
+    a, b = node.circle, node.next.circle
+    ab = a.r + b.r
+    dx, dy = (a.x * b.r + b.x * a.r) / ab, (a.y * b.r + b.y * a.r) / ab
+    return dx * dx + dy * dy
+
+
+def pack_siblings(circles, random):
+    """Place circles tangent to each other around the origin; returns the enclosing radius.
+
+    The front-chain algorithm of Wang et al., as in d3.packSiblings: each
+    circle is placed next to the pair closest to the centroid, backtracking
+    along the chain past any circle it would overlap.
+    """
+    n = len(circles)
+    if not n:
+        return 0
+    a = circles[0]
+    a.x = a.y = 0
+    if n == 1:
+        return a.r
+    b = circles[1]
+    a.x, b.x, b.y = -b.r, a.r, 0
+    if n == 2:
+        return a.r + b.r
+    _place(b, a, circles[2])
+
+    a, b, c = _Chain(a), _Chain(b), _Chain(circles[2])
+    a.next = c.previous = b
+    b.next = a.previous = c
+    c.next = b.previous = a
+
+    i = 3
+    while i < n:
+        _place(a.circle, b.circle, circles[i])
+        c = _Chain(circles[i])
+
+        # Closest overlapping circle along the front chain, ahead or behind
+        j, k, sj, sk = b.next, a.previous, b.circle.r, a.circle.r
+        overlapped = False
+        while True:
+            if sj <= sk:
+                if _intersects(j.circle, c.circle):
+                    b, a.next, b.previous = j, j, a
+                    overlapped = True
+                    break
+                sj, j = sj + j.circle.r, j.next
+            else:
+                if _intersects(k.circle, c.circle):
+                    a = k
+                    a.next, b.previous = b, a
+                    overlapped = True
+                    break
+                sk, k = sk + k.circle.r, k.previous
+            if j is k.next:
+                break
+        if overlapped:
+            continue
+
+        c.previous, c.next = a, b
+        a.next = b.previous = b = c
+
+        # The pair closest to the centroid is where the next circle goes
+        best, best_score = a, _score(a)
+        c = c.next
+        while c is not b:
+            score = _score(c)
+            if score < best_score:
+                best, best_score = c, score
+            c = c.next
+        a, b = best, best.next
+        i += 1
+
+    chain = [b.circle]
+    c = b.next
+    while c is not b:
+        chain.append(c.circle)
+        c = c.next
+    enclosing = enclose(chain, random)
+    for circle in circles:
+        circle.x -= enclosing.x
+        circle.y -= enclosing.y
+    return enclosing.r
+
+
+def pack_leaves(values, width, height, padding=PACK_PADDING):
+    """(x, y, r) of ``d3.pack().size([width, height]).padding(padding)`` over one level of leaves.
+
+    Radii start as sqrt(value); siblings are packed once without padding to
+    learn the scale, then again with the padding in pixels, and the result is
+    fitted to the smaller side, centred in the rectangle.
+    """
+    random = _lcg()
+    circles = [_Circle(r=math.sqrt(value)) for value in values]
+    if not circles:
+        return []
+
+    radius = pack_siblings(circles, random)
+    pad = padding * radius / min(width, height)
+    if pad:
+        for circle in circles:
+            circle.r += pad
+    radius = pack_siblings(circles, random) + pad
+    if pad:
+        for circle in circles:
+            circle.r -= pad
+
+    k = min(width, height) / (2 * radius)
+    return [(width / 2 + k * circle.x, height / 2 + k * circle.y, k * circle.r) for circle in circles]
+
+
+def scaled_values(values, low=RADIUS_RANGE[0], high=RADIUS_RANGE[1]):
+    """``d3.scaleSqrt().domain([min, max]).range([low, high])`` applied to ``values``"""
+    roots = [math.copysign(math.sqrt(abs(value)), value) for value in values]
+    lo, hi = min(roots), max(roots)
+    if hi == lo:
+        return [(low + high) / 2] * len(values)
+    return [low + (root - lo) / (hi - lo) * (high - low) for root in roots]
+
+
+class CircleQuadtree:
+    """Quadtree over circles for point hit tests and viewport queries.
+
+    Each circle sits in the deepest square that holds its whole bounding box,
+    so a hit test walks one root-to-leaf path and checks only the circles
+    stored along it. ``to_dict`` flattens the tree into arrays the dashboard
+    walks the same way: a node is [x0, y0, size, first child, first item,
+    item count], and its four children are stored next to each other.
+    """
+
+    def __init__(self, xs, ys, rs, capacity=QUADTREE_CAPACITY, max_depth=QUADTREE_MAX_DEPTH):
+        self.xs, self.ys, self.rs = xs, ys, rs
+        self.capacity = capacity
+        self.max_depth = max_depth
+        self.nodes = []
+        self.items = []
+
+        if xs:
+            x0 = min(x - r for x, r in zip(xs, rs))
+            y0 = min(y - r for y, r in zip(ys, rs))
+            size = max(max(x + r for x, r in zip(xs, rs)) - x0, max(y + r for y, r in zip(ys, rs)) - y0) or 1.0
+        else:
+            x0, y0, size = 0.0, 0.0, 1.0
+        self.nodes.append([x0, y0, size, -1, 0, 0])
+        self._build(0, list(range(len(xs))), 0)
+
+    def _quadrant(self, node, i):
+        """Child quadrant (0-3) wholly holding circle ``i``, or None when it straddles"""
+        x0, y0, size = self.nodes[node][:3]
+        mid_x, mid_y = x0 + size / 2, y0 + size / 2
+        x, y, r = self.xs[i], self.ys[i], self.rs[i]
+        if x + r < mid_x:
+            column = 0
+        elif x - r >= mid_x:
+            column = 1
+        else:
+            return None
+        if y + r < mid_y:
+            return column
+        if y - r >= mid_y:
+            return column + 2
+        return None
+
+    def _build(self, node, members, depth):
+        if len(members) > self.capacity and depth < self.max_depth:
+            quadrants = [[], [], [], []]
+            kept = []
+            for i in members:
+                quadrant = self._quadrant(node, i)
+                (kept if quadrant is None else quadrants[quadrant]).append(i)
+            if any(quadrants):
+                x0, y0, size = self.nodes[node][:3]
+                half = size / 2
+                first = len(self.nodes)
+                self.nodes[node][3] = first
+                for quadrant in range(4):
+                    self.nodes.append([x0 + half * (quadrant % 2), y0 + half * (quadrant // 2), half, -1, 0, 0])
+                members = kept
+                for quadrant in range(4):
+                    self._build(first + quadrant, quadrants[quadrant], depth + 1)
+        self.nodes[node][4] = len(self.items)
+        self.nodes[node][5] = len(members)
+        self.items.extend(members)
+
+    def _contains(self, i, x, y):
+        dx, dy = x - self.xs[i], y - self.ys[i]
+        return dx * dx + dy * dy <= self.rs[i] * self.rs[i]
+
+    def hit(self, x, y, min_radius=0.0):
+        """Index of the circle under (x, y), or None; the smallest one if circles nest"""
+        found = None
+        node = 0
+        while True:
+            x0, y0, size, first, start, count = self.nodes[node]
+            for i in self.items[start:start + count]:
+                if self.rs[i] >= min_radius and self._contains(i, x, y) and (found is None or self.rs[i] < self.rs[found]):
+                    found = i
+            if first < 0:
+                return found
+            half = size / 2
+            node = first + (x >= x0 + half) + 2 * (y >= y0 + half)
+
+    def query(self, x0, y0, x1, y1, min_radius=0.0):
+        """Indices of circles at least ``min_radius`` across that overlap the rectangle"""
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            nx, ny, size, first, start, count = self.nodes[node]
+            if nx > x1 or ny > y1 or nx + size < x0 or ny + size < y0:
+                continue
+            for i in self.items[start:start + count]:
+                x, y, r = self.xs[i], self.ys[i], self.rs[i]
+                if r >= min_radius and x + r >= x0 and x - r <= x1 and y + r >= y0 and y - r <= y1:
+                    found.append(i)
+            if first >= 0:
+                stack.extend(range(first, first + 4))
+        return sorted(found)
+
+    def to_dict(self, digits=3):
+        return {
+            'nodes': [[round(value, digits) for value in node[:3]] + node[3:] for node in self.nodes],
+            'items': self.items
+        }
+
+
+def bubble_hierarchy(cube):
+    """Theme -> brand -> channel hierarchy of a bubble cube artifact, as buildBubbleDataFromCube builds it.
+
+    Uses the dashboard's default filters (everything, NONE themes excluded).
+    Returns an ordered {theme: (value, {brand id: (value, {channel id: value})})}.
+    """
+    dictionaries = cube['dictionaries']
+    themes = OrderedDict()
+    for cell in cube['cells']:
+        theme_set = dictionaries['themeSets'][cell[0]]
+        if not theme_set or 'NONE' in theme_set:
+            continue
+        brand = dictionaries['brands'][cell[1]] or 'Unknown Brand'
+        channel = dictionaries['channels'][cell[2]] or 'Unspecified'
+        impressions = cell[5]
+
+        for theme in theme_set:
+            theme_node = themes.setdefault(theme, [0, OrderedDict()])
+            theme_node[0] += impressions
+            brand_node = theme_node[1].setdefault(f"{theme}.{brand}", [0, OrderedDict()])
+            brand_node[0] += impressions
+            channel_id = f"{theme}.{brand}.{channel}"
+            brand_node[1][channel_id] = brand_node[1].get(channel_id, 0) + impressions
+    return themes
+
+
+def expansion_states(themes):
+    """(key, [(node id, value)]) for every expansion state, in getVisibleNodes' node order.
+
+    'all' shows the themes; 'theme:<id>' a theme with its brands; 'brand:<id>'
+    a brand with its theme and channels.
+    """
+    yield 'all', [(theme, value) for theme, (value, _) in themes.items()]
+    for theme, (value, brands) in themes.items():
+        yield f"theme:{theme}", [(theme, value)] + [(brand, brand_value) for brand, (brand_value, _) in brands.items()]
+    for theme, (value, brands) in themes.items():
+        for brand, (brand_value, channels) in brands.items():
+            yield f"brand:{brand}", [(theme, value), (brand, brand_value)] + list(channels.items())
+
+
+def layout_state(nodes, width, height, digits=3):
+    """Packed positions (relative to the pack centre) and quadtree of one expansion state"""
+    ids = [node_id for node_id, _ in nodes]
+    values = [value for _, value in nodes]
+    placed = pack_leaves(scaled_values(values), width, height)
+    xs = [x - width / 2 for x, _, _ in placed]
+    ys = [y - height / 2 for _, y, _ in placed]
+    rs = [r for _, _, r in placed]
+    return {
+        'ids': ids,
+        'values': values,
+        'x': [round(x, digits) for x in xs],
+        'y': [round(y, digits) for y in ys],
+        'r': [round(r, digits) for r in rs],
+        'quadtree': CircleQuadtree(xs, ys, rs).to_dict(digits)
+    }
+
+
+def build_layout(cube, width=CHART_WIDTH, height=CHART_HEIGHT, margin=CHART_MARGIN):
+    """Layout of every expansion state of a bubble cube for a chart of this size"""
+    pack_width, pack_height = width - margin * 2, height - margin * 2
+    states = {
+        key: layout_state(nodes, pack_width, pack_height)
+        for key, nodes in expansion_states(bubble_hierarchy(cube))
+    }
+    return {
+        'version': LAYOUT_VERSION,
+        'generatedAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cubeGeneratedAt': cube.get('generatedAt'),
+        # Positions hold for any pack area whose smaller side is this long
+        'extent': min(pack_width, pack_height),
+        'padding': PACK_PADDING,
+        'radiusRange': list(RADIUS_RANGE),
+        'states': states
+    }
+
+
+def write_layout(layout, output_path):
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(layout, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def main():
+    """Precompute the packed-circle layout of every expansion state of the bubble cube"""
+    parser = argparse.ArgumentParser(description="Precompute bubble chart layouts and hit-test quadtrees")
+    parser.add_argument('--cube', default=DEFAULT_CUBE, help="bubble cube written by build_bubble_data.py")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the layout JSON")
+    parser.add_argument('--width', type=int, default=CHART_WIDTH, help="chart width the layout is computed for")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.cube, 'r', encoding='utf-8') as f:
+        cube = json.load(f)
+    layout = build_layout(cube, args.width)
+    write_layout(layout, args.output)
+
+    nodes = sum(len(state['ids']) for state in layout['states'].values())
+    print(f"Wrote {len(layout['states']):,} expansion states ({nodes:,} nodes) to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.1f} KB) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
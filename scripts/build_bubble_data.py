@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from bubble_layout import DEFAULT_OUTPUT as DEFAULT_LAYOUT, build_layout, write_layout
+from data_loader import DATA_DIR, detect_encoding
+from source_normalizer import (CANONICAL_SCHEMA, IMPRESSION_FALLBACK, THEME_SEPARATOR, load_canonical,
+                               normalize_source, to_canonical)
+
+# Dashboard sources in the order the browser concatenates them (config.dataPathsV2)
+SOURCE_FILES = {
+    'manufacturer': 'Pathmathics_Brand_Manufacturer_Classified_v2.csv',
+    'dme': 'Pathmatics_DME_classified_v2.csv',
+    'instagram': 'SM_IG_Breast_Pump_Brands_analyzed_v2.csv',
+    'tiktok': 'SM_TikTok_Breast_Pump_Brands_analyzed_v2.csv'
+}
+
+# Raw columns the normalization needs; everything else is skipped while parsing
+SOURCE_COLUMNS = set(IMPRESSION_FALLBACK) | {
+    'Brand Root', 'Advertiser', 'company', 'Channel', 'focus_vs_other', 'Product_Focus',
+    'Spend (USD)', 'MARKETING_THEMES',
+    'SUPPORT FOR WORKING MOMS', 'EMOTIONAL SUPPORT & WELLNESS',
+    'AUTHENTIC COMMUNITY & PEER VALIDATION', 'MEDICAL ENDORSEMENT & CLINICAL TRUST',
+    'EVERYDAY PRACTICALITY', 'PORTABILITY & DISCREET DESIGN', 'PRICE VS VALUE'
+}
+
+# Cube dimensions, in cell order
+CUBE_DIMENSIONS = ['themeSet', 'brand', 'channel', 'source', 'productFocus']
+
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'bubble_cube.json')
+
+
+def read_raw_source(path):
+    """Read a dashboard CSV as raw strings, the way d3.csv sees it"""
+    return pd.read_csv(path, encoding=detect_encoding(path), dtype=str, keep_default_na=False,
+                       usecols=lambda column: column in SOURCE_COLUMNS)
+
+
+def load_normalized_sources(source_paths):
+    """Normalize every available source to the canonical schema, stacked in dashboard order"""
+    frames = []
+    stats = {}
+    for source_type, path in source_paths.items():
+        if not os.path.exists(path):
+            print(f"Skipping {source_type}: {path} not found")
+            continue
+
+        frame = to_canonical(normalize_source(read_raw_source(path), source_type))
+        frames.append(frame)
+        stats[source_type] = {'path': os.path.basename(path), 'rows': len(frame)}
+        print(f"Normalized {len(frame):,} {source_type} rows")
+
+    if not frames:
+        raise FileNotFoundError("None of the dashboard sources were found")
+
+    # Categories differ per source, so types are restored after stacking
+    normalized = pd.concat(frames, ignore_index=True)
+    return normalized.astype(CANONICAL_SCHEMA), stats
+
+
+def build_cube(normalized):
+    """Aggregate canonical rows into (theme set, brand, channel, source, focus) cells.
+
+    Cells keep the order in which their first row appears, so the dashboard
+    rebuilds themes, brands and channels in the same order as from raw rows.
+    """
+    keys = pd.DataFrame({
+        'themeSet': normalized['themes'],
+        'brand': normalized['brand'],
+        'channel': normalized['channel'],
+        'source': normalized['source'],
+        'productFocus': normalized['product_focus']
+    })
+
+    dictionaries = {}
+    codes = {}
+    for dimension in CUBE_DIMENSIONS:
+        # Plain values, so codes follow first appearance rather than category order
+        codes[dimension], uniques = pd.factorize(keys[dimension].to_numpy(dtype=object))
+        dictionaries[dimension] = list(uniques)
+    dictionaries['themeSet'] = [value.split(THEME_SEPARATOR) for value in dictionaries['themeSet']]
+
+    measures = pd.DataFrame(codes)
+    measures['impressions'] = normalized['impressions']
+    measures['rows'] = 1
+    measures['zeroImpressionRows'] = (normalized['impressions'] == 0).astype(int)
+
+    cells = measures.groupby(CUBE_DIMENSIONS, sort=False).sum().reset_index()
+
+    return dictionaries, cells
+
+
+def _compact_number(value):
+    """Write whole numbers as ints to keep the artifact small"""
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def write_cube(dictionaries, cells, stats, output_path):
+    """Write the cube as compact JSON: dictionaries plus one array per cell"""
+    artifact = {
+        'version': 1,
+        'generatedAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sources': stats,
+        'dimensions': CUBE_DIMENSIONS,
+        'dictionaries': {
+            'themeSets': dictionaries['themeSet'],
+            'brands': dictionaries['brand'],
+            'channels': dictionaries['channel'],
+            'sources': dictionaries['source'],
+            'productFocus': dictionaries['productFocus']
+        },
+        'measures': ['impressions', 'rows', 'zeroImpressionRows'],
+        'cells': [
+            codes + [_compact_number(impressions), rows, zero_rows]
+            for codes, impressions, rows, zero_rows in zip(
+                cells[CUBE_DIMENSIONS].to_numpy().tolist(), cells['impressions'],
+                cells['rows'].tolist(), cells['zeroImpressionRows'].tolist()
+            )
+        ]
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(',', ':'))
+
+    return artifact
+
+
+def main():
+    """Build the pre-aggregated bubble cube for the dashboards"""
+    parser = argparse.ArgumentParser(description="Build the dashboard bubble-hierarchy cube")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the cube JSON")
+    parser.add_argument('--normalized', help="build from a dataset written by normalize_sources.py instead of the CSVs")
+    parser.add_argument('--layout', default=DEFAULT_LAYOUT, help="where to write the precomputed bubble layout")
+    parser.add_argument('--no-layout', action='store_true', help="skip the precomputed bubble layout")
+    for source_type in SOURCE_FILES:
+        parser.add_argument(f'--{source_type}', help=f"override the {source_type} CSV path")
+    args = parser.parse_args()
+
+    source_paths = {
+        source_type: getattr(args, source_type) or os.path.join(args.data_dir, filename)
+        for source_type, filename in SOURCE_FILES.items()
+    }
+
+    start = time.perf_counter()
+    if args.normalized:
+        normalized = load_canonical(args.normalized)
+        stats = {
+            source_type: {'path': os.path.basename(args.normalized), 'rows': int(rows)}
+            for source_type, rows in normalized['source'].astype(str).value_counts(sort=False).items()
+        }
+    else:
+        normalized, stats = load_normalized_sources(source_paths)
+    dictionaries, cells = build_cube(normalized)
+    artifact = write_cube(dictionaries, cells, stats, args.output)
+    elapsed = time.perf_counter() - start
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Wrote {len(cells):,} cells from {len(normalized):,} rows to {args.output} "
+          f"({size_kb:.1f} KB) in {elapsed:.2f}s")
+
+    if not args.no_layout:
+        start = time.perf_counter()
+        layout = build_layout(artifact)
+        write_layout(layout, args.layout)
+        print(f"Wrote {len(layout['states']):,} bubble layouts to {args.layout} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
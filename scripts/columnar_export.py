@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR
+from source_normalizer import CANONICAL_SCHEMA, THEME_SEPARATOR
+
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'normalized_sources.json')
+
+# Column buffers start on multiples of this, so Float64Array views need no copy
+ALIGNMENT = 8
+
+# Smallest unsigned code type per dictionary size
+CODE_TYPES = [(2 ** 8, 'uint8'), (2 ** 16, 'uint16'), (2 ** 32, 'uint32')]
+
+# Columns holding lists, stored as joined strings; the manifest names the separator
+LIST_SEPARATORS = {'themes': THEME_SEPARATOR}
+
+FORMAT_VERSION = 1
+
+
+def encode_dictionary(series):
+    """(codes, dictionary, type) of a string column; dictionary in first-appearance order.
+
+    First appearance matches the order build_bubble_data.py gives its cube
+    dictionaries, so cubes built from either agree code for code.
+    """
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object), use_na_sentinel=False)
+    dictionary = [None if pd.isna(value) else str(value) for value in uniques]
+    code_type = next(name for size, name in CODE_TYPES if len(dictionary) <= size)
+    return codes.astype(code_type), dictionary, code_type
+
+
+def encode_numbers(series):
+    """(values, type) of a numeric column: uint32 when every value is a whole number that fits, else float64"""
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    whole = np.isfinite(values).all() and (values == np.floor(values)).all()
+    if whole and (not len(values) or (values.min() >= 0 and values.max() < 2 ** 32)):
+        return values.astype('uint32'), 'uint32'
+    return values, 'float64'
+
+
+def write_columnar(df, manifest_path):
+    """Write ``df`` as one little-endian binary of column buffers plus a JSON manifest.
+
+    Numeric columns become plain typed arrays; string and categorical columns
+    become dictionary codes with their dictionary kept in the manifest. The
+    binary sits next to the manifest with the same name and a .bin suffix.
+    Returns the manifest.
+    """
+    data_path = os.path.splitext(manifest_path)[0] + '.bin'
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+
+    columns = []
+    offset = 0
+    with open(data_path, 'wb') as f:
+        for name in df.columns:
+            series = df[name]
+            entry = {'name': name, 'dtype': str(series.dtype)}
+            if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+                values, entry['type'] = encode_numbers(series)
+            else:
+                values, entry['dictionary'], entry['type'] = encode_dictionary(series)
+                if name in LIST_SEPARATORS:
+                    entry['separator'] = LIST_SEPARATORS[name]
+
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            data = values.astype(values.dtype.newbyteorder('<'), copy=False).tobytes()
+            entry['offset'] = offset
+            f.write(data)
+            offset += len(data)
+            columns.append(entry)
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'generatedAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': len(df),
+        'byteOrder': 'little',
+        'data': os.path.basename(data_path),
+        'columns': columns
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    return manifest
+
+
+def read_columnar(manifest_path):
+    """Read a dataset written by ``write_columnar`` back into a DataFrame with its original dtypes"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    data_path = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), manifest['data'])
+    # np.memmap can't map an empty file, as written for a dataset without rows
+    if os.path.getsize(data_path):
+        buffer = np.memmap(data_path, dtype='uint8', mode='r')
+    else:
+        buffer = np.empty(0, dtype='uint8')
+
+    data = {}
+    for entry in manifest['columns']:
+        dtype = np.dtype(entry['type']).newbyteorder('<')
+        values = np.frombuffer(buffer, dtype=dtype, count=manifest['rows'], offset=entry['offset'])
+        if 'dictionary' in entry:
+            dictionary = np.array(entry['dictionary'], dtype=object)
+            values = dictionary[values] if len(dictionary) else np.array([], dtype=object)
+        data[entry['name']] = pd.Series(values).astype(entry['dtype'])
+    return pd.DataFrame(data)
+
+
+def main():
+    """Export the normalized sources in the columnar layout the dashboards load as typed arrays"""
+    from normalize_sources import find_sources, normalize_files
+    from source_normalizer import load_canonical
+
+    parser = argparse.ArgumentParser(description="Write the normalized sources as typed column buffers")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument('--normalized', help="export a dataset written by normalize_sources.py instead of the CSVs")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the manifest; the .bin goes next to it")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    canonical = load_canonical(args.normalized) if args.normalized else normalize_files(find_sources(args.data_dir))
+    canonical = canonical[list(CANONICAL_SCHEMA)]
+    manifest = write_columnar(canonical, args.output)
+    elapsed = time.perf_counter() - start
+
+    data_path = os.path.join(os.path.dirname(os.path.abspath(args.output)), manifest['data'])
+    print("\n=== COLUMNAR EXPORT ===")
+    for entry in manifest['columns']:
+        detail = f"{len(entry['dictionary']):,} values" if 'dictionary' in entry else ''
+        print(f"{entry['name']:<20} {entry['type']:<8} {detail}")
+    print(f"\nWrote {manifest['rows']:,} rows to {manifest['data']} ({os.path.getsize(data_path) / 1024:.1f} KB) "
+          f"and {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR
+from normalize_sources import find_sources, normalize_files
+from source_normalizer import THEME_SEPARATOR, load_canonical
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Cell dimensions: every distinct combination is aggregated once at startup
+CELL_DIMENSIONS = ['themes', 'brand', 'channel', 'source', 'product_focus']
+
+# Summed per cell
+CELL_MEASURES = ['impressions', 'spend', 'engagement']
+
+# Dashboard filter names (state.filters in the dashboards); 'all' means unfiltered
+FILTERS = ['marketingTheme', 'brandType', 'channel', 'advertiser', 'productFocus', 'dataSource', 'excludeNone']
+
+# Dimensions a rollup can group by, as named in query strings
+ROLLUP_DIMENSIONS = {'theme': 'theme', 'brand': 'brand', 'channel': 'channel', 'source': 'source',
+                     'productFocus': 'product_focus'}
+
+PAID_SOURCES = ['manufacturer', 'dme']
+SOCIAL_SOURCES = ['instagram', 'tiktok']
+
+# Matches cacheTimeout in config/environment.js for production
+CACHE_SECONDS = 60
+
+# Serialized responses kept in memory, by ETag
+MAX_CACHED_RESPONSES = 256
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class QueryError(ValueError):
+    """A request the service can't answer; reported as 400"""
+
+
+class DashboardData:
+    """Canonical rows aggregated once into cells that every query is answered from.
+
+    A cell is one distinct (theme set, brand, channel, source, product focus)
+    combination. Filters become boolean masks over cells, and theme rollups
+    use (cell, theme) pairs expanded once at startup, so a query touches
+    cells rather than raw rows. Only top-ad queries look at rows, through
+    each row's cell.
+    """
+
+    def __init__(self, canonical):
+        self.rows = canonical.reset_index(drop=True)
+        keys = pd.DataFrame({
+            dimension: self.rows[dimension].astype(str).replace({'': 'Unspecified'} if dimension == 'channel' else {})
+            for dimension in CELL_DIMENSIONS
+        })
+
+        codes = {}
+        self.labels = {}
+        for dimension in CELL_DIMENSIONS:
+            # First-appearance order, so hierarchies come out in the dashboards' order
+            codes[dimension], uniques = pd.factorize(keys[dimension].to_numpy(dtype=object))
+            self.labels[dimension] = np.asarray(uniques, dtype=object)
+
+        codes = pd.DataFrame(codes)
+        self.row_cell = codes.groupby(CELL_DIMENSIONS, sort=False).ngroup().to_numpy()
+        measures = self.rows[CELL_MEASURES].astype(float)
+        measures['rows'] = 1
+        self.cells = pd.concat([codes.groupby(self.row_cell).first(), measures.groupby(self.row_cell).sum()], axis=1)
+
+        # (cell, theme) pairs for theme filters and rollups
+        theme_sets = [value.split(THEME_SEPARATOR) for value in self.labels['themes']]
+        self.theme_names, theme_codes = np.unique(
+            np.concatenate(theme_sets) if theme_sets else np.empty(0, dtype=object), return_inverse=True)
+        set_themes = np.split(theme_codes, np.cumsum([len(themes) for themes in theme_sets])[:-1])
+        per_cell = [set_themes[code] for code in self.cells['themes']]
+        self.pair_cell = np.repeat(np.arange(len(self.cells)), [len(themes) for themes in per_cell])
+        self.pair_theme = np.concatenate(per_cell) if per_cell else np.empty(0, dtype=int)
+        self.theme_order = pd.unique(self.theme_names[self.pair_theme])
+
+        self.version = hashlib.sha1(pd.util.hash_pandas_object(self.rows, index=False).to_numpy().tobytes()).hexdigest()
+
+    def _column(self, dimension):
+        """Label of ``dimension`` for every cell"""
+        return self.labels[dimension][self.cells[dimension].to_numpy()]
+
+    def cell_mask(self, filters):
+        """Cells passing the dashboard filters, with the rules of cubeCellMatchesFilters"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        source = self._column('source')
+
+        def has_theme(theme):
+            flagged = np.zeros(len(self.cells), dtype=bool)
+            flagged[self.pair_cell[self.theme_names[self.pair_theme] == theme]] = True
+            return flagged
+
+        if filters.get('excludeNone') in ('true', '1'):
+            mask &= ~has_theme('NONE')
+        theme = filters.get('marketingTheme', 'all')
+        if theme != 'all':
+            mask &= has_theme(theme)
+
+        brand_type = filters.get('brandType', 'all')
+        if brand_type in ('manufacturer', 'dme'):
+            mask &= source == brand_type
+        elif brand_type == 'social':
+            mask &= np.isin(source, SOCIAL_SOURCES)
+
+        data_source = filters.get('dataSource', 'all')
+        if data_source == 'pathmatics':
+            mask &= np.isin(source, PAID_SOURCES)
+        elif data_source == 'social':
+            mask &= np.isin(source, SOCIAL_SOURCES)
+
+        for name, dimension in [('productFocus', 'product_focus'), ('channel', 'channel'), ('advertiser', 'brand')]:
+            value = filters.get(name, 'all')
+            if value != 'all':
+                mask &= self._column(dimension) == value
+        return mask
+
+    def _pairs(self, mask):
+        """Theme, brand, channel and measures of every (cell, theme) pair of the masked cells"""
+        keep = mask[self.pair_cell]
+        cells = self.cells.iloc[self.pair_cell[keep]]
+        pairs = pd.DataFrame({
+            'theme': self.theme_names[self.pair_theme[keep]],
+            'brand': self.labels['brand'][cells['brand'].to_numpy()],
+            'channel': self.labels['channel'][cells['channel'].to_numpy()],
+            'source': self.labels['source'][cells['source'].to_numpy()],
+            'product_focus': self.labels['product_focus'][cells['product_focus'].to_numpy()]
+        })
+        for measure in CELL_MEASURES + ['rows']:
+            pairs[measure] = cells[measure].to_numpy()
+        pairs['dme'] = pairs['source'] == 'dme'
+        return pairs
+
+    def bubbles(self, filters):
+        """Theme -> brand -> channel hierarchy shaped like buildBubbleDataFromCube's output"""
+        pairs = self._pairs(self.cell_mask(filters))
+        grouped = pairs.groupby(['theme', 'brand', 'channel'], sort=False).agg(
+            impressions=('impressions', 'sum'), rows=('rows', 'sum'), dme=('dme', 'any'))
+
+        themes = OrderedDict()
+        for (theme, brand, channel), impressions, rows, dme in zip(
+                grouped.index, grouped['impressions'], grouped['rows'], grouped['dme']):
+            theme_node = themes.setdefault(theme, {
+                'id': theme, 'name': theme, 'value': 0, 'type': 'theme', 'rowCount': 0, 'children': OrderedDict()
+            })
+            brand_node = theme_node['children'].setdefault(brand, {
+                'id': f"{theme}.{brand}", 'name': brand, 'value': 0, 'type': 'brand', 'theme': theme,
+                'rowCount': 0, 'hasDME': False, 'children': []
+            })
+            brand_node['children'].append({
+                'id': f"{theme}.{brand}.{channel}", 'name': channel, 'value': _number(impressions),
+                'type': 'channel', 'theme': theme, 'brand': brand, 'rowCount': int(rows), 'hasDME': bool(dme)
+            })
+            for node in (theme_node, brand_node):
+                node['value'] = _number(node['value'] + impressions)
+                node['rowCount'] += int(rows)
+            brand_node['hasDME'] = brand_node['hasDME'] or bool(dme)
+
+        for theme_node in themes.values():
+            theme_node['children'] = list(theme_node['children'].values())
+        return list(themes.values())
+
+    def rollup(self, by, filters):
+        """Impressions, spend, engagement and rows per combination of ``by`` dimensions"""
+        dimensions = []
+        for name in by:
+            if name not in ROLLUP_DIMENSIONS:
+                raise QueryError(f"Unknown rollup dimension {name!r}; use {', '.join(ROLLUP_DIMENSIONS)}")
+            dimensions.append(ROLLUP_DIMENSIONS[name])
+        if not dimensions:
+            raise QueryError("Give at least one 'by' dimension")
+
+        mask = self.cell_mask(filters)
+        if 'theme' in dimensions:
+            frame = self._pairs(mask)
+        else:
+            frame = self.cells[mask]
+            frame = frame.assign(**{dimension: self._column(dimension)[mask] for dimension in dimensions})
+
+        grouped = frame.groupby(dimensions, sort=False)[CELL_MEASURES + ['rows']].sum()
+        grouped = grouped.sort_values('impressions', ascending=False, kind='stable')
+        return [
+            dict(zip(by, key if isinstance(key, tuple) else (key,)),
+                 **{measure: _number(value) for measure, value in zip(grouped.columns, values)})
+            for key, values in zip(grouped.index, grouped.to_numpy())
+        ]
+
+    def totals(self, filters):
+        """Metric totals for the analysis panel"""
+        cells = self.cells[self.cell_mask(filters)]
+        source = self.labels['source'][cells['source'].to_numpy()]
+        totals = {measure: _number(cells[measure].sum()) for measure in CELL_MEASURES}
+        totals['rows'] = int(cells['rows'].sum())
+        totals['ads'] = int(cells['rows'][np.isin(source, PAID_SOURCES)].sum())
+        totals['socialPosts'] = int(cells['rows'][np.isin(source, SOCIAL_SOURCES)].sum())
+        return totals
+
+    def top(self, filters, metric='impressions', n=10):
+        """The ``n`` rows with the largest ``metric`` among the filtered rows"""
+        if metric not in CELL_MEASURES:
+            raise QueryError(f"Unknown metric {metric!r}; use {', '.join(CELL_MEASURES)}")
+        rows = np.flatnonzero(self.cell_mask(filters)[self.row_cell])
+        top = self.rows.iloc[rows].nlargest(n, metric)
+        return [
+            {'row': int(row), **{column: _json_value(value) for column, value in record.items()}}
+            for row, record in zip(top.index, top.to_dict('records'))
+        ]
+
+    def filter_values(self):
+        """Values each dashboard filter can take"""
+        return {
+            'marketingTheme': [str(theme) for theme in self.theme_order],
+            'advertiser': sorted(self.labels['brand']),
+            'channel': sorted(self.labels['channel']),
+            'productFocus': sorted(self.labels['product_focus']),
+            'sources': list(self.labels['source'])
+        }
+
+
+def _number(value):
+    """Whole numbers as ints to keep responses compact"""
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+
+def _json_value(value):
+    if isinstance(value, (float, np.floating)):
+        return _number(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class DashboardService:
+    """Answer dashboard queries over HTTP from one pre-aggregated DashboardData.
+
+    The data never changes while the service runs, so a response's ETag is a
+    hash of the data version and the request, known before any work is done:
+    a matching If-None-Match gets a 304 straight away, and recent bodies are
+    served from memory. Queries run in a worker thread so slow ones don't
+    hold up other connections, and concurrent requests for the same view
+    share one computation.
+    """
+
+    ROUTES = {
+        '/api/bubbles': lambda data, query: data.bubbles(_filters(query)),
+        '/api/rollup': lambda data, query: data.rollup(query.get('by', []), _filters(query)),
+        '/api/totals': lambda data, query: data.totals(_filters(query)),
+        '/api/top': lambda data, query: data.top(_filters(query), _single(query, 'metric', 'impressions'),
+                                                 _count(query)),
+        '/api/filters': lambda data, query: data.filter_values(),
+        '/health': lambda data, query: {'status': 'ok', 'rows': len(data.rows), 'cells': len(data.cells)}
+    }
+
+    def __init__(self, data, cache_seconds=CACHE_SECONDS, max_cached=MAX_CACHED_RESPONSES):
+        self.data = data
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self.responses = OrderedDict()
+        self.in_flight = {}
+        self.stats = {'requests': 0, 'not_modified': 0, 'memory_hits': 0, 'computed': 0}
+
+    def etag(self, path, query):
+        canonical = json.dumps([path, sorted(query.items())], separators=(',', ':'))
+        return '"' + hashlib.sha1(f"{self.data.version}:{canonical}".encode('utf-8')).hexdigest()[:20] + '"'
+
+    async def answer(self, method, target, headers):
+        """(status, headers, body) for one request"""
+        self.stats['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b''
+
+        url = urlsplit(target)
+        route = self.ROUTES.get(url.path.rstrip('/') or '/')
+        if route is None:
+            return 404, {}, _json_bytes({'error': f"No such endpoint {url.path}"})
+
+        query = parse_qs(url.query)
+        etag = self.etag(url.path, query)
+        cache_headers = {'ETag': etag, 'Cache-Control': f"max-age={self.cache_seconds}"}
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            self.stats['not_modified'] += 1
+            return 304, cache_headers, b''
+
+        body = self.responses.get(etag)
+        if body is not None:
+            self.responses.move_to_end(etag)
+            self.stats['memory_hits'] += 1
+        else:
+            try:
+                body = await self._compute(etag, route, query)
+            except QueryError as error:
+                return 400, {}, _json_bytes({'error': str(error)})
+
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in headers.get('accept-encoding', ''):
+            return 200, dict(cache_headers, **{'Content-Encoding': 'gzip'}), gzip.compress(body, 5)
+        return 200, cache_headers, body
+
+    async def _compute(self, etag, route, query):
+        """Serialized result of ``route``, computed once however many requests wait for it"""
+        if etag in self.in_flight:
+            return await asyncio.shield(self.in_flight[etag])
+
+        loop = asyncio.get_running_loop()
+        self.in_flight[etag] = loop.run_in_executor(None, lambda: _json_bytes(route(self.data, query)))
+        try:
+            body = await self.in_flight[etag]
+        finally:
+            del self.in_flight[etag]
+        self.stats['computed'] += 1
+        self.responses[etag] = body
+        if len(self.responses) > self.max_cached:
+            self.responses.popitem(last=False)
+        return body
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                status, response_headers, body = await self.answer(method, target, headers)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = {
+                    'Content-Type': 'application/json',
+                    'Content-Length': str(len(body)),
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Expose-Headers': 'ETag',
+                    'Connection': 'keep-alive' if keep_alive else 'close',
+                    **response_headers
+                }
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n".encode('latin-1'))
+                writer.write(''.join(f"{name}: {value}\r\n" for name, value in head.items()).encode('latin-1'))
+                writer.write(b'\r\n')
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _filters(query):
+    """Dashboard filters from a query string; one value each"""
+    return {name: query[name][-1] for name in FILTERS if name in query}
+
+
+def _single(query, name, default):
+    return query[name][-1] if name in query else default
+
+
+def _count(query, default=10, limit=500):
+    try:
+        return max(0, min(int(_single(query, 'n', default)), limit))
+    except ValueError:
+        raise QueryError("'n' must be a whole number") from None
+
+
+def _json_bytes(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Load and aggregate the dashboard data once, then serve queries"""
+    parser = argparse.ArgumentParser(description="Serve pre-aggregated dashboard queries over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument('--normalized', help="serve a dataset written by normalize_sources.py instead")
+    parser.add_argument('--cache-seconds', type=int, default=CACHE_SECONDS,
+                        help="max-age sent with every response")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    canonical = load_canonical(args.normalized) if args.normalized else normalize_files(find_sources(args.data_dir))
+    data = DashboardData(canonical)
+    service = DashboardService(data, args.cache_seconds)
+    # Pre-warm the unfiltered views every dashboard opens with
+    for path in ('/api/bubbles', '/api/totals', '/api/filters'):
+        asyncio.run(service.answer('GET', path, {}))
+    print(f"Loaded {len(data.rows):,} rows into {len(data.cells):,} cells in {time.perf_counter() - start:.2f}s")
+    print(f"Serving on http://{args.host}:{args.port}/api (set apiEndpoint in the bubble chart config.js)")
+
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\nServed {service.stats['requests']:,} requests "
+              f"({service.stats['not_modified']:,} not modified, {service.stats['memory_hits']:,} from memory)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+import codecs
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from brand_resolver import brand_mask, brand_resolver, brand_variants
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_ROOT, 'Data')
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Default Pathmatics manufacturer export, resolved from the repo root; the
+# PATHMATICS_CSV environment variable points every script at another export
+DEFAULT_CSV = os.environ.get('PATHMATICS_CSV') or os.path.join(DATA_DIR, 'Pathmathics_Brand_Manufacturer_Classified.csv')
+
+# Breastfeeding brands tracked across all analysis scripts, in any spelling the
+# brand resolver maps to them
+BREASTFEEDING_BRANDS = [
+    'Medela Inc.',
+    'Elvie (Chiaro Technology Ltd)',
+    'Momcozy',
+    'Avent',
+    'Evenflo',
+    'Motif Medical',
+    "Dr. Brown's (Handi-Craft Company)",
+    'TOMMEE TIPPEE (Mayborn USA Inc.)',
+    'Pumpables',
+    'Freemie',
+    'Spectra Baby',
+    'Baby Buddha Products'
+]
+
+# Encodings tried in order when reading a CSV export
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252']
+
+# Column dtypes fixed once when the cache is built
+NUMERIC_COLUMNS = ['Spend (USD)', 'Impressions', 'Duration']
+CATEGORICAL_COLUMNS = ['Brand Root', 'Channel', 'Main_Category']
+
+# Parse dimension columns as plain strings; they become categoricals afterwards
+PARSE_DTYPES = {column: 'str' for column in CATEGORICAL_COLUMNS}
+
+# Rows per chunk when streaming a CSV with brand pre-filtering
+CHUNK_SIZE = 100_000
+
+# Pathmatics exports write First Seen / Last Seen as day/month/year
+DATE_FORMAT = '%d/%m/%Y'
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    # Without a Parquet engine the cache still skips CSV parsing, just not column reads
+    CACHE_FORMAT = 'pickle'
+
+
+def detect_encoding(path, encodings=ENCODINGS):
+    """Return the first encoding that decodes the whole file"""
+    for encoding in encodings:
+        # Decode incrementally so large exports are never held in memory at once
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    raise ValueError(f"Could not decode {path} with any of {encodings}")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path=DEFAULT_CSV, cache_dir=CACHE_DIR):
+    """SHA-256 of an export, from the cache manifest when the cache is current"""
+    if cache_is_valid(path, cache_dir):
+        return _read_manifest(cache_paths(path, cache_dir)[1])['sha256']
+    return file_hash(path)
+
+
+def fix_dtypes(df, categorical=True):
+    """Coerce metric columns to numbers and dimension columns to categoricals"""
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    if not categorical:
+        return df
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    return df
+
+
+def parse_dates(series, date_format=DATE_FORMAT):
+    """Parse an export date column; unparseable values become NaT"""
+    return pd.to_datetime(series, format=date_format, errors='coerce')
+
+
+def read_source_csv(path, encoding=None):
+    """Parse a CSV export once with a detected encoding and fixed dtypes"""
+    encoding = encoding or detect_encoding(path)
+    df = pd.read_csv(path, encoding=encoding, low_memory=False)
+    return fix_dtypes(df), encoding
+
+
+def cache_paths(path, cache_dir=CACHE_DIR):
+    """Return the (data, manifest) cache file paths for a source CSV"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Include the source directory so same-named exports don't collide
+    tag = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    base = os.path.join(cache_dir, f"{stem}-{tag}")
+    return f"{base}.{CACHE_FORMAT}", f"{base}.json"
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cache_is_valid(path, cache_dir=CACHE_DIR):
+    """Check the cache against the source mtime, falling back to the content hash"""
+    data_path, manifest_path = cache_paths(path, cache_dir)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(data_path):
+        return False
+
+    stat = os.stat(path)
+    if manifest.get('mtime') == stat.st_mtime and manifest.get('size') == stat.st_size:
+        return True
+
+    # The file was touched; reuse the cache if the content is unchanged
+    if manifest.get('sha256') == file_hash(path):
+        manifest['mtime'] = stat.st_mtime
+        manifest['size'] = stat.st_size
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return True
+
+    return False
+
+
+def source_header(path, cache_dir=CACHE_DIR):
+    """Column names of an export, from the cache manifest when it is current"""
+    if cache_is_valid(path, cache_dir):
+        return _read_manifest(cache_paths(path, cache_dir)[1])['columns']
+    return list(pd.read_csv(path, encoding=detect_encoding(path), nrows=0).columns)
+
+
+def build_cache(path, cache_dir=CACHE_DIR):
+    """Parse the source CSV and write the columnar cache and its manifest"""
+    df, encoding = read_source_csv(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, manifest_path = cache_paths(path, cache_dir)
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(data_path, index=False)
+    else:
+        df.to_pickle(data_path)
+
+    stat = os.stat(path)
+    manifest = {
+        'source': os.path.abspath(path),
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha256': file_hash(path),
+        'encoding': encoding,
+        'format': CACHE_FORMAT,
+        'rows': len(df),
+        'columns': list(df.columns)
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return df
+
+
+def load_dataset(path, columns=None, use_cache=True, cache_dir=CACHE_DIR, verbose=True):
+    """Load a CSV export through the columnar cache, reading only the requested columns"""
+    start = time.perf_counter()
+
+    if not use_cache:
+        df, _ = read_source_csv(path)
+        source = 'csv'
+    elif cache_is_valid(path, cache_dir):
+        data_path, _ = cache_paths(path, cache_dir)
+        if CACHE_FORMAT == 'parquet':
+            df = pd.read_parquet(data_path, columns=columns)
+        else:
+            df = pd.read_pickle(data_path)
+        source = 'warm cache'
+    else:
+        df = build_cache(path, cache_dir)
+        source = 'cold cache build'
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    if verbose:
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {len(df):,} rows x {len(df.columns)} columns from "
+              f"{os.path.basename(path)} ({source}) in {elapsed:.3f}s")
+
+    return df
+
+
+def _plain_dimensions(df):
+    """Turn categorical columns back into plain string columns"""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+def canonical_brands(df, column='Brand Root'):
+    """Replace the brand column with canonical names, so 'Medela' and 'Medela Inc.' are one brand"""
+    if column in df.columns:
+        df[column] = brand_resolver().resolve_series(df[column])
+    return df
+
+
+def _finish(df, source_rows, source_columns, categorical, canonical):
+    """Settle brand names and dimension dtypes for the kept rows and record the source shape"""
+    if canonical:
+        df = canonical_brands(df)
+
+    if categorical:
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].cat.remove_unused_categories()
+    else:
+        # Plain strings keep value_counts/crosstab output free of empty categories
+        df = _plain_dimensions(df)
+
+    df = df.reset_index(drop=True)
+    df.attrs['source_rows'] = source_rows
+    df.attrs['source_columns'] = source_columns
+    return df
+
+
+def _read_columns(columns, brands):
+    """Columns to read so that the brand filter can still be applied"""
+    if columns is None:
+        return None
+    return list(dict.fromkeys(list(columns) + (['Brand Root'] if brands is not None else [])))
+
+
+def _csv_chunks(path, usecols, chunksize):
+    """Yield raw CSV chunks parsed with the detected encoding and explicit dtypes"""
+    encoding = detect_encoding(path)
+    dtypes = {column: dtype for column, dtype in PARSE_DTYPES.items() if usecols is None or column in usecols}
+    yield from pd.read_csv(path, encoding=encoding, usecols=usecols, dtype=dtypes,
+                           chunksize=chunksize, low_memory=False)
+
+
+def read_projected_csv(path, columns=None, brands=None, chunksize=CHUNK_SIZE):
+    """Stream a CSV in chunks, parsing only ``columns`` and keeping only ``brands``"""
+    header = list(pd.read_csv(path, encoding=detect_encoding(path), nrows=0).columns)
+    usecols = _read_columns(columns, brands)
+
+    chunks = []
+    source_rows = 0
+    for chunk in _csv_chunks(path, usecols, chunksize):
+        source_rows += len(chunk)
+        if brands is not None:
+            # Drop non-target brands before the chunk is kept
+            chunk = chunk[brand_mask(chunk['Brand Root'], brands)]
+        chunks.append(chunk)
+
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=usecols or header)
+    if columns is not None:
+        df = df[list(columns)]
+
+    return fix_dtypes(df), source_rows, header
+
+
+def iter_ads_chunks(path=DEFAULT_CSV, columns=None, brands=None, chunksize=CHUNK_SIZE,
+                    use_cache=True, cache_dir=CACHE_DIR, canonical=True):
+    """Yield brand-filtered chunks with fixed dtypes for streaming aggregation.
+
+    Reads Parquet row batches when a cache exists, CSV chunks otherwise. Each
+    chunk is indexed by position among the kept rows and carries canonical
+    brand names, matching ``load_ads``.
+    """
+    usecols = _read_columns(columns, brands)
+
+    if use_cache and CACHE_FORMAT == 'parquet' and cache_is_valid(path, cache_dir):
+        import pyarrow.parquet as pq
+        data_path, _ = cache_paths(path, cache_dir)
+        batches = (
+            batch.to_pandas()
+            for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunksize, columns=usecols)
+        )
+    else:
+        batches = _csv_chunks(path, usecols, chunksize)
+
+    offset = 0
+    for chunk in batches:
+        if brands is not None:
+            chunk = chunk[brand_mask(chunk['Brand Root'], brands)]
+        if columns is not None:
+            chunk = chunk[list(columns)]
+
+        chunk = fix_dtypes(chunk.copy(), categorical=False)
+        if canonical:
+            chunk = canonical_brands(chunk)
+        chunk = _plain_dimensions(chunk)
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def load_ads(path=DEFAULT_CSV, columns=None, brands=None, categorical=False,
+             use_cache=True, cache_dir=CACHE_DIR, verbose=True, canonical=True):
+    """Load an export with column projection and brand pre-filtering.
+
+    A valid cache is read directly (only ``columns``, only ``brands``). A full
+    read without a cache builds it; projected reads without one stream the CSV
+    in chunks so memory scales with the columns and brands actually used.
+    Dimension columns come back as plain strings unless ``categorical`` is set.
+    ``brands`` match in any spelling the brand resolver maps to them, so
+    'Medela Inc.' also keeps rows filed under 'Medela'. Unless ``canonical``
+    is cleared, 'Brand Root' then holds the canonical name of every row
+    ('Medela' for both), so group-bys and brand lookups see one brand.
+    """
+    start = time.perf_counter()
+    data_path, manifest_path = cache_paths(path, cache_dir)
+
+    if use_cache and cache_is_valid(path, cache_dir):
+        manifest = _read_manifest(manifest_path)
+        if CACHE_FORMAT == 'parquet':
+            filters = None
+            if brands is not None:
+                # Push the filter down with every spelling of the brands this export uses
+                names = pd.unique(pd.read_parquet(data_path, columns=['Brand Root'])['Brand Root'].dropna())
+                filters = [('Brand Root', 'in', list(dict.fromkeys(list(brands) + brand_variants(names, brands))))]
+            df = pd.read_parquet(data_path, columns=columns, filters=filters)
+        else:
+            df = pd.read_pickle(data_path)
+            if brands is not None:
+                df = df[brand_mask(df['Brand Root'], brands)]
+            if columns is not None:
+                df = df[list(columns)]
+        source_rows, header = manifest['rows'], manifest['columns']
+        source = 'warm cache'
+    elif use_cache and columns is None:
+        df = build_cache(path, cache_dir)
+        source_rows, header = len(df), list(df.columns)
+        if brands is not None:
+            df = df[brand_mask(df['Brand Root'], brands)]
+        source = 'cold cache build'
+    else:
+        df, source_rows, header = read_projected_csv(path, columns, brands)
+        source = 'projected csv'
+
+    df = _finish(df, source_rows, header, categorical, canonical)
+
+    if verbose:
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {len(df):,} of {source_rows:,} rows x {len(df.columns)} columns from "
+              f"{os.path.basename(path)} ({source}) in {elapsed:.3f}s")
+
+    return df
+
+
+def main():
+    """Report cold and warm load times for the given CSV exports"""
+    paths = sys.argv[1:] or [os.path.join(DATA_DIR, 'Pathmatics_DME_classified.csv')]
+
+    for path in paths:
+        print(f"\n=== {os.path.basename(path)} ===")
+        _, manifest_path = cache_paths(path)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        load_dataset(path)
+        load_dataset(path)
+        load_dataset(path, columns=['Brand Root', 'Spend (USD)', 'Impressions'])
+
+
+if __name__ == "__main__":
+    main()
@@ -3,47 +3,22 @@ import pandas as pd
 import numpy as np
 from collections import Counter
 import re
-
-# Read the CSV file
-df = pd.read_csv('/mnt/d/TBWA/Philips/Breastfeeding_Pumps_Dashboard/Data/Brand_Manufacturer_with_downloads_analyzed_with_focus_tag_rows_321_end_classified_media.csv')
-
-# Define breastfeeding brands
-breastfeeding_brands = [
-    'Medela Inc.',
-    'Elvie (Chiaro Technology Ltd)',
-    'Momcozy',
-    'Avent',
-    'Evenflo',
-    'Motif Medical',
-    "Dr. Brown's (Handi-Craft Company)",
-    'TOMMEE TIPPEE (Mayborn USA Inc.)',
-    'Pumpables',
-    'Freemie',
-    'Spectra Baby',
-    'Baby Buddha Products'
-]
-
-# Filter for breastfeeding brands
-bf_data = df[df['Brand Root'].isin(breastfeeding_brands)].copy()
-
-print("=== COMPREHENSIVE BREASTFEEDING PUMP MARKET ANALYSIS ===")
-print(f"Total dataset: {len(df):,} entries")
-print(f"Breastfeeding brand entries: {len(bf_data):,} entries")
-print(f"Analysis period: {df['First Seen'].min()} to {df['Last Seen'].max()}")
-
-print("\n=== 1. BRAND LANDSCAPE ===")
-brand_summary = bf_data.groupby('Brand Root').agg({
-    'Creative Id': 'count',
-    'Spend (USD)': 'sum',
-    'Impressions': 'sum'
-}).round(2)
-brand_summary.columns = ['Total_Ads', 'Total_Spend_USD', 'Total_Impressions']
-brand_summary = brand_summary.sort_values('Total_Ads', ascending=False)
-print(brand_summary)
-
-print("\n=== 2. CATEGORY POSITIONING BY BRAND ===")
-# Focus on meaningful categories
-meaningful_cats = [
+import argparse
+
+from ad_cube import AdCube
+from brand_resolver import brand_variants
+from data_loader import BREASTFEEDING_BRANDS, CHUNK_SIZE, DEFAULT_CSV, iter_ads_chunks, load_ads, source_fingerprint
+from dimension_index import DimensionIndex
+import instrumentation
+from instrumentation import Instrumentation
+from keyword_index import KeywordIndex
+import result_cache
+from result_cache import ResultCache
+from streaming import StreamingAggregate
+from trend_engine import TrendEngine
+
+# Meaningful categories shown per brand, unless --categories says otherwise
+MEANINGFUL_CATEGORIES = [
     'Comfort & Pain-Free Use',
     'Price vs. Value', 
     'Portability & Discreet Design',
@@ -55,84 +30,185 @@ meaningful_cats = [
     'Hospital Grade or Doctor Recommended'
 ]
 
-cat_by_brand = pd.crosstab(bf_data['Brand Root'], bf_data['Main_Category'])
-if len([col for col in meaningful_cats if col in cat_by_brand.columns]) > 0:
-    meaningful_subset = cat_by_brand[[col for col in meaningful_cats if col in cat_by_brand.columns]]
-    print(meaningful_subset)
-
-print("\n=== 3. PRODUCT FOCUS ANALYSIS ===")
-product_focus_clean = bf_data[bf_data['Product_Focus'].notna() & 
-                             (bf_data['Product_Focus'] != '') & 
-                             (~bf_data['Product_Focus'].str.contains('Other: Unclear|Not Recognizable', na=False))]
-
-print("Product Focus Distribution (excluding unclear):")
-print(product_focus_clean['Product_Focus'].value_counts().head(10))
-
-print("\n=== 4. COMMUNICATION THEMES ===")
-
-# Analyze text content for themes
-text_data = bf_data[bf_data['Text_x'].notna() & (bf_data['Text_x'] != '')]
-all_text = ' '.join(text_data['Text_x'].astype(str).tolist())
-
-# Key themes to search for
-themes = {
-    'Freedom/Liberation': ['free', 'freedom', 'hands-free', 'wireless', 'untethered'],
-    'Comfort': ['comfort', 'soft', 'gentle', 'pain-free', 'soothe'],
-    'Convenience': ['easy', 'simple', 'convenient', 'quick', 'effortless'],
-    'Efficiency': ['efficient', 'powerful', 'fast', 'boost', 'maximize'],
-    'Support': ['support', 'help', 'assist', 'guidance', 'care'],
-    'Emotion/Connection': ['love', 'bond', 'journey', 'beautiful', 'special', 'precious'],
-    'Medical/Professional': ['doctor', 'pediatrician', 'clinical', 'medical', 'professional', 'hospital'],
-    'Working Moms': ['work', 'office', 'career', 'busy', 'on-the-go', 'travel'],
-    'Technology': ['smart', 'app', 'connected', 'track', 'monitor', 'digital']
-}
+# Brands whose positioning is shown, unless --top-brands says otherwise
+TOP_BRANDS = ['Momcozy', 'Elvie', 'Avent', 'Evenflo']
 
-print("Communication Themes Found:")
-for theme, keywords in themes.items():
-    count = sum(all_text.lower().count(keyword) for keyword in keywords)
-    print(f"{theme}: {count} mentions")
 
-print("\n=== 5. BRAND POSITIONING INSIGHTS ===")
+def category_positioning(cube, categories):
+    """Ads per brand in each of ``categories``; returns the full brand x category table"""
+    cat_by_brand = cube.crosstab('Brand Root', 'Main_Category')
+    if len([col for col in categories if col in cat_by_brand.columns]) > 0:
+        meaningful_subset = cat_by_brand[[col for col in categories if col in cat_by_brand.columns]]
+        print(meaningful_subset)
+    return cat_by_brand
 
-# Analyze by top brands
-top_brands = ['Momcozy', 'Elvie (Chiaro Technology Ltd)', 'Avent', 'Evenflo']
 
-for brand in top_brands:
-    brand_data = bf_data[bf_data['Brand Root'] == brand]
-    print(f"\n--- {brand} ({len(brand_data)} ads) ---")
+def brand_positioning(cube, dimensions, brands):
+    """Top categories, product focus and a sample message of each brand"""
+    for brand in brands:
+        print(f"\n--- {brand} ({cube.total('ads', where={'Brand Root': brand})} ads) ---")
     
-    # Top categories for this brand
-    top_cats = brand_data['Main_Category'].value_counts().head(3)
-    print(f"Top Categories: {list(top_cats.index)}")
+        # Top categories for this brand
+        top_cats = cube.value_counts('Main_Category', where={'Brand Root': brand}).head(3)
+        print(f"Top Categories: {list(top_cats.index)}")
     
-    # Product focus
-    product_focus = brand_data['Product_Focus'].value_counts().head(3)
-    print(f"Product Focus: {list(product_focus.index)}")
+        # Product focus
+        product_focus = cube.value_counts('Product_Focus', where={'Brand Root': brand}).head(3)
+        print(f"Product Focus: {list(product_focus.index)}")
     
-    # Sample messaging
-    sample_text = brand_data[brand_data['Text_x'].notna() & (brand_data['Text_x'] != '')]
-    if len(sample_text) > 0:
-        sample = sample_text['Text_x'].iloc[0]
-        print(f"Sample Message: {sample[:100]}...")
-
-print("\n=== 6. MARKET GAPS AND OPPORTUNITIES ===")
-
-# Analyze focus vs other distribution
-focus_breakdown = bf_data.groupby(['Brand Root', 'focus_vs_other']).size().unstack(fill_value=0)
-if 'focus' in focus_breakdown.columns and 'other' in focus_breakdown.columns:
-    focus_breakdown['focus_ratio'] = focus_breakdown['focus'] / (focus_breakdown['focus'] + focus_breakdown['other'])
-    print("Focus on Breastfeeding vs Other Products by Brand:")
-    print(focus_breakdown.sort_values('focus_ratio', ascending=False))
-
-# Category gaps
-print("\nUnderrepresented Categories:")
-low_categories = bf_data['Main_Category'].value_counts().tail(5)
-print(low_categories)
-
-print("\n=== 7. PREMIUM VS VALUE POSITIONING ===")
-price_value_brands = bf_data[bf_data['Main_Category'] == 'Price vs. Value']['Brand Root'].value_counts()
-if len(price_value_brands) > 0:
-    print("Brands emphasizing Price/Value:")
-    print(price_value_brands)
-
-print("\n=== ANALYSIS COMPLETE ===")
\ No newline at end of file
+        # Sample messaging
+        brand_data = dimensions.select('Brand Root', brand)
+        sample_text = brand_data[brand_data['Text_x'].notna() & (brand_data['Text_x'] != '')]
+        if len(sample_text) > 0:
+            sample = sample_text['Text_x'].iloc[0]
+            print(f"Sample Message: {sample[:100]}...")
+
+
+parser = argparse.ArgumentParser(description="Detailed breastfeeding pump market analysis")
+parser.add_argument('--stream', action='store_true',
+                    help="build the brand landscape chunk by chunk instead of from the loaded frame")
+parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                    help="rows per chunk in streaming mode")
+parser.add_argument('--brands', nargs='+', default=BREASTFEEDING_BRANDS, metavar='BRAND',
+                    help="brands to analyze, in any spelling; defaults to the breastfeeding brands")
+parser.add_argument('--top-brands', nargs='+', default=TOP_BRANDS, metavar='BRAND',
+                    help="brands whose positioning is shown")
+parser.add_argument('--categories', nargs='+', default=MEANINGFUL_CATEGORIES, metavar='CATEGORY',
+                    help="categories shown per brand")
+instrumentation.add_arguments(parser)
+result_cache.add_arguments(parser)
+args = instrumentation.check_arguments(parser, parser.parse_args())
+profile = Instrumentation.from_args('detailed_analysis', args)
+cache = ResultCache.from_args(args)
+
+BRAND_SUMMARY_AGG = {
+    'Creative Id': 'count',
+    'Spend (USD)': 'sum',
+    'Impressions': 'sum'
+}
+
+with profile.stage('load') as record:
+    # Read only the columns this report uses
+    df = load_ads(columns=[
+        'Brand Root', 'Creative Id', 'Spend (USD)', 'Impressions', 'First Seen', 'Last Seen', 'Duration',
+        'Main_Category', 'Product_Focus', 'Text_x', 'focus_vs_other', 'Channel', 'Format'
+    ])
+
+    # Filter for the chosen brands on the brand codes, resolving each distinct name once
+    brands = DimensionIndex(df, ['Brand Root'])
+    tracked = brand_variants(brands.dictionaries['Brand Root'].values, args.brands)
+    bf_data = df[brands.mask('Brand Root', tracked)].copy()
+
+    # Counts and totals come from the cube; raw rows are only read for text
+    cube = AdCube.from_frame(bf_data)
+    dimensions = DimensionIndex(bf_data, ['Brand Root'], dictionaries=brands.dictionaries)
+    if cache.enabled:
+        # Section keys use the export's fingerprint instead of hashing the cube and indexes
+        source = (source_fingerprint(DEFAULT_CSV), sorted(args.brands))
+        for name, value in [('cube', cube), ('dimensions', dimensions)]:
+            cache.tag(value, source, name)
+    record.rows_out = len(bf_data)
+
+print("=== COMPREHENSIVE BREASTFEEDING PUMP MARKET ANALYSIS ===")
+print(f"Total dataset: {len(df):,} entries")
+print(f"Breastfeeding brand entries: {len(bf_data):,} entries")
+print(f"Analysis period: {df['First Seen'].min()} to {df['Last Seen'].max()}")
+
+with profile.stage('brand_landscape', len(bf_data)) as record:
+    print("\n=== 1. BRAND LANDSCAPE ===")
+    if args.stream:
+        # Mergeable per-chunk partials keep memory flat on exports larger than RAM
+        brand_aggregate = StreamingAggregate('Brand Root', BRAND_SUMMARY_AGG)
+        for chunk in iter_ads_chunks(columns=['Brand Root'] + list(BRAND_SUMMARY_AGG),
+                                     brands=args.brands, chunksize=args.chunksize):
+            brand_aggregate.update(chunk)
+        brand_summary = brand_aggregate.result().round(2)
+    else:
+        brand_summary = cube.rollup('Brand Root', ['ads', 'spend', 'impressions']).round(2)
+    brand_summary.columns = ['Total_Ads', 'Total_Spend_USD', 'Total_Impressions']
+    brand_summary = brand_summary.sort_values('Total_Ads', ascending=False)
+    print(brand_summary)
+    record.rows_out = len(brand_summary)
+
+with profile.stage('category_positioning', len(bf_data)) as record:
+    print("\n=== 2. CATEGORY POSITIONING BY BRAND ===")
+    cat_by_brand = cache.call(category_positioning, cube, args.categories)
+    record.rows_out = len(cat_by_brand)
+
+with profile.stage('product_focus', len(bf_data)) as record:
+    print("\n=== 3. PRODUCT FOCUS ANALYSIS ===")
+    clear_focus = {'Product_Focus': lambda focus: focus != '' and not re.search('Other: Unclear|Not Recognizable', focus)}
+
+    print("Product Focus Distribution (excluding unclear):")
+    print(cube.value_counts('Product_Focus', where=clear_focus).head(10))
+    record.rows_out = cube.total('ads', where=clear_focus)
+
+with profile.stage('communication_themes', len(bf_data)):
+    print("\n=== 4. COMMUNICATION THEMES ===")
+
+    # Index keyword counts per row once; rows without text count zero
+    keyword_index = KeywordIndex(bf_data['Text_x'])
+
+    # Key themes to search for
+    themes = {
+        'Freedom/Liberation': ['free', 'freedom', 'hands-free', 'wireless', 'untethered'],
+        'Comfort': ['comfort', 'soft', 'gentle', 'pain-free', 'soothe'],
+        'Convenience': ['easy', 'simple', 'convenient', 'quick', 'effortless'],
+        'Efficiency': ['efficient', 'powerful', 'fast', 'boost', 'maximize'],
+        'Support': ['support', 'help', 'assist', 'guidance', 'care'],
+        'Emotion/Connection': ['love', 'bond', 'journey', 'beautiful', 'special', 'precious'],
+        'Medical/Professional': ['doctor', 'pediatrician', 'clinical', 'medical', 'professional', 'hospital'],
+        'Working Moms': ['work', 'office', 'career', 'busy', 'on-the-go', 'travel'],
+        'Technology': ['smart', 'app', 'connected', 'track', 'monitor', 'digital']
+    }
+
+    print("Communication Themes Found:")
+    for theme, count in keyword_index.theme_counts(themes).items():
+        print(f"{theme}: {count} mentions")
+
+with profile.stage('brand_positioning', len(bf_data)):
+    print("\n=== 5. BRAND POSITIONING INSIGHTS ===")
+    cache.call(brand_positioning, cube, dimensions, args.top_brands)
+
+with profile.stage('market_gaps', len(bf_data)) as record:
+    print("\n=== 6. MARKET GAPS AND OPPORTUNITIES ===")
+
+    # Analyze focus vs other distribution
+    focus_breakdown = cube.crosstab('Brand Root', 'focus_vs_other')
+    if 'focus' in focus_breakdown.columns and 'other' in focus_breakdown.columns:
+        focus_breakdown['focus_ratio'] = focus_breakdown['focus'] / (focus_breakdown['focus'] + focus_breakdown['other'])
+        print("Focus on Breastfeeding vs Other Products by Brand:")
+        print(focus_breakdown.sort_values('focus_ratio', ascending=False))
+
+    # Category gaps
+    print("\nUnderrepresented Categories:")
+    low_categories = cube.value_counts('Main_Category').tail(5)
+    print(low_categories)
+    record.rows_out = len(focus_breakdown)
+
+with profile.stage('premium_vs_value', len(bf_data)) as record:
+    print("\n=== 7. PREMIUM VS VALUE POSITIONING ===")
+    price_value_brands = cube.value_counts('Brand Root', where={'Main_Category': 'Price vs. Value'})
+    if len(price_value_brands) > 0:
+        print("Brands emphasizing Price/Value:")
+        print(price_value_brands)
+    record.rows_out = len(price_value_brands)
+
+with profile.stage('spend_trends', len(bf_data)) as record:
+    print("\n=== 8. SPEND TRENDS ===")
+    # Spend spread evenly over each ad's active days, First Seen to Last Seen
+    trends = TrendEngine.from_frame(bf_data, bf_data['Brand Root'])
+    if len(trends.dates) > 0:
+        print("Monthly Spend by Brand (last 6 months):")
+        print(trends.series('monthly', 'spend').tail(6).round(2))
+
+        last_day = trends.dates[-1]
+        recent = pd.Series(trends.window(last_day - pd.Timedelta(days=29), last_day), index=trends.groups)
+        print(f"\nSpend in the 30 days to {last_day.date()}:")
+        print(recent.round(2).sort_values(ascending=False))
+    record.rows_out = len(trends.dates)
+
+print("\n=== ANALYSIS COMPLETE ===")
+
+cache.report()
+profile.finish()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import numpy as np
+import pandas as pd
+
+# Dimension columns the reports filter, group and cross-tabulate on
+DIMENSION_COLUMNS = ['Brand Root', 'Channel', 'Main_Category', 'Product_Focus', 'focus_vs_other']
+
+
+class Dictionary:
+    """Sorted distinct values of one dimension; a value's code is its position"""
+
+    def __init__(self, values):
+        self.values = pd.Index(values)
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+
+    @classmethod
+    def from_series(cls, series):
+        return cls(np.sort(series.dropna().unique()))
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """Code of ``value``, or -1 when it never occurs"""
+        return self.lookup.get(value, -1)
+
+    def encode(self, series):
+        """Integer codes for ``series`` (-1 for missing or unknown values)"""
+        return pd.Categorical(series, categories=self.values).codes.astype(np.int32)
+
+
+class DimensionIndex:
+    """Integer-coded dimension columns of a frame, with group positions built once.
+
+    Each dimension is encoded against a sorted dictionary. The first lookup on
+    a dimension sorts its codes once. After that, the rows of any value are a
+    slice of that order, so selecting one brand costs O(rows of that brand)
+    instead of a string comparison over the whole column. Dictionaries can be
+    shared so that several frames use the same codes.
+    """
+
+    def __init__(self, df, columns=DIMENSION_COLUMNS, dictionaries=None):
+        self.frame = df
+        self.dictionaries = dict(dictionaries or {})
+        self.codes = {}
+        self._groups = {}
+
+        for column in columns:
+            if column not in df.columns:
+                continue
+            if column not in self.dictionaries:
+                self.dictionaries[column] = Dictionary.from_series(df[column])
+            self.codes[column] = self.dictionaries[column].encode(df[column])
+
+    def groups(self, column):
+        """(order, offsets): rows of code ``c`` are ``order[offsets[c]:offsets[c + 1]]``"""
+        if column not in self._groups:
+            # Shift by one so missing values (-1) form group 0 and stay out of the way
+            shifted = self.codes[column] + 1
+            order = np.argsort(shifted, kind='stable')
+            counts = np.bincount(shifted, minlength=len(self.dictionaries[column]) + 1)
+            offsets = np.concatenate([[0], np.cumsum(counts)])[1:]
+            self._groups[column] = (order, offsets)
+        return self._groups[column]
+
+    def positions(self, column, value):
+        """Row positions holding ``value``, in frame order"""
+        code = self.dictionaries[column].code(value)
+        if code < 0:
+            return np.empty(0, dtype=np.intp)
+        order, offsets = self.groups(column)
+        return order[offsets[code]:offsets[code + 1]]
+
+    def select(self, column, value):
+        """Rows of the frame where ``column`` equals ``value``"""
+        return self.frame.iloc[self.positions(column, value)]
+
+    def size(self, column, value):
+        """Number of rows where ``column`` equals ``value``"""
+        return len(self.positions(column, value))
+
+    def mask(self, column, values):
+        """Boolean row mask for ``column`` in ``values`` (the coded ``isin``)"""
+        codes = [self.dictionaries[column].code(value) for value in values]
+        return np.isin(self.codes[column], [code for code in codes if code >= 0])
+
+    def crosstab(self, rows, columns):
+        """Row counts for every observed pair of values, like ``pd.crosstab``"""
+        row_codes, column_codes = self.codes[rows], self.codes[columns]
+        width = len(self.dictionaries[columns])
+        present = (row_codes >= 0) & (column_codes >= 0)
+        pairs = row_codes[present].astype(np.int64) * width + column_codes[present]
+        table = np.bincount(pairs, minlength=len(self.dictionaries[rows]) * width).reshape(-1, width)
+
+        # Like pd.crosstab, keep only values seen together with a non-missing partner
+        kept_rows, kept_columns = table.sum(axis=1) > 0, table.sum(axis=0) > 0
+        return pd.DataFrame(
+            table[kept_rows][:, kept_columns],
+            index=pd.Index(self.dictionaries[rows].values[kept_rows], name=rows),
+            columns=pd.Index(self.dictionaries[columns].values[kept_columns], name=columns)
+        )
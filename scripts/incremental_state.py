@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from data_loader import CACHE_FORMAT, DATA_DIR
+from metrics import aggregate
+
+# Persisted analysis state lives next to the exports, outside version control
+STATE_DIR = os.path.join(DATA_DIR, '.state')
+
+# Columns identifying a creative row and telling whether it changed
+KEY_COLUMN = 'Creative Id'
+VERSION_COLUMN = 'Last Seen'
+ROW_COLUMN = '_row'
+HASH_COLUMN = '_hash'
+
+# Layout of the stored state; older states are rebuilt
+STATE_VERSION = 3
+
+# Separates column and aggregation names when aggregates are stored flat
+AGG_SEPARATOR = '|'
+
+
+def _write_frame(df, path):
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(path)
+    else:
+        df.to_pickle(path)
+
+
+def _read_frame(path):
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _flatten_columns(aggregate):
+    """Store (column, func) aggregate columns under plain string names"""
+    flat = aggregate.copy()
+    flat.columns = [
+        AGG_SEPARATOR.join(column) if isinstance(column, tuple) else column
+        for column in aggregate.columns
+    ]
+    return flat
+
+
+def _restore_columns(flat, spec):
+    """Undo ``_flatten_columns`` for an aggregate built from ``spec``"""
+    if not any(isinstance(funcs, list) for funcs in spec.values()):
+        return flat
+    restored = flat.copy()
+    restored.columns = pd.MultiIndex.from_tuples(
+        [tuple(column.split(AGG_SEPARATOR, 1)) for column in flat.columns]
+    )
+    return restored
+
+
+def creative_keys(ads_data, hash_columns=()):
+    """Key every row by creative id and its position among that creative's rows.
+
+    Each row also carries its ``Last Seen`` and a hash of ``hash_columns``,
+    so a restated metric or edited text shows even when ``Last Seen`` doesn't move.
+    """
+    hash_columns = [column for column in hash_columns if column in ads_data.columns]
+    return pd.DataFrame({
+        KEY_COLUMN: ads_data[KEY_COLUMN].to_numpy(),
+        ROW_COLUMN: ads_data.groupby(KEY_COLUMN, sort=False).cumcount().to_numpy(),
+        VERSION_COLUMN: ads_data[VERSION_COLUMN].astype(str).to_numpy(),
+        HASH_COLUMN: pd.util.hash_pandas_object(ads_data[hash_columns], index=False).to_numpy()
+    }, index=ads_data.index)
+
+
+class IncrementalState:
+    """Per-creative derived fields and per-group aggregates persisted between runs.
+
+    A creative is reprocessed when it is new, gone, has a different number of
+    rows, a different ``Last Seen`` or different values in any column the
+    derived fields and aggregates read; everything else is reused from the
+    store. Aggregates are rebuilt only for the groups those creatives touch,
+    so results match a full recomputation exactly.
+    """
+
+    def __init__(self, state_dir=STATE_DIR, name='ads_performance', signature=''):
+        self.state_dir = state_dir
+        self.name = name
+        # Derivation settings (theme rules, aggregation specs); a change forces a rebuild
+        self.signature = hashlib.sha1(signature.encode('utf-8')).hexdigest()
+        self.creatives = None
+        self.aggregates = {}
+        self.manifest = None
+        self.last_refresh = {}
+
+    def _path(self, part, extension=CACHE_FORMAT):
+        return os.path.join(self.state_dir, f"{self.name}-{part}.{extension}")
+
+    def load(self, source):
+        """Read the stored state for ``source``; returns False when it has to be rebuilt"""
+        try:
+            with open(self._path('manifest', 'json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if (manifest.get('version') != STATE_VERSION
+                or manifest.get('signature') != self.signature
+                or manifest.get('source') != os.path.abspath(source)
+                or manifest.get('format') != CACHE_FORMAT):
+            return False
+
+        try:
+            self.creatives = _read_frame(self._path('creatives'))
+            self.aggregates = {
+                dimension: _read_frame(self._path(f"by-{index}"))
+                for index, dimension in enumerate(manifest['dimensions'])
+            }
+        except OSError:
+            self.creatives, self.aggregates = None, {}
+            return False
+
+        self.manifest = manifest
+        return True
+
+    def changed_creatives(self, keys):
+        """Creative ids that are new, removed or changed since the stored run"""
+        if self.creatives is None:
+            return pd.Index(keys[KEY_COLUMN].unique())
+
+        stored = self.creatives[[KEY_COLUMN, ROW_COLUMN, VERSION_COLUMN, HASH_COLUMN]]
+        merged = keys.merge(stored, on=[KEY_COLUMN, ROW_COLUMN], how='outer',
+                            suffixes=('', '_stored'), indicator=True)
+        changed = merged['_merge'] != 'both'
+        for column in (VERSION_COLUMN, HASH_COLUMN):
+            changed |= merged[column] != merged[f'{column}_stored']
+        return pd.Index(merged.loc[changed, KEY_COLUMN].unique())
+
+    def refresh(self, ads_data, derive, aggregations, derive_columns=()):
+        """Bring derived fields and aggregates up to date with ``ads_data``.
+
+        ``derive(rows)`` returns the per-row derived columns for the given rows;
+        it only ever sees rows of changed creatives and must read no columns
+        besides ``derive_columns``. ``aggregations`` maps a dimension column to
+        a ``groupby(...).agg`` spec. Returns the derived columns aligned to
+        ``ads_data`` and the aggregate frame per dimension.
+        """
+        hash_columns = list(derive_columns)
+        for dimension, spec in aggregations.items():
+            hash_columns += [dimension] + list(spec)
+        keys = creative_keys(ads_data, list(dict.fromkeys(hash_columns)))
+        changed_ids = self.changed_creatives(keys)
+        changed_rows = keys[KEY_COLUMN].isin(changed_ids).to_numpy()
+
+        fresh = derive(ads_data[changed_rows])
+        derived_columns = list(fresh.columns)
+
+        if changed_rows.all() or self.creatives is None:
+            derived = fresh
+        else:
+            # Unchanged rows take their derived fields straight from the store
+            reused = keys[~changed_rows].merge(
+                self.creatives[[KEY_COLUMN, ROW_COLUMN] + derived_columns],
+                on=[KEY_COLUMN, ROW_COLUMN], how='left'
+            )
+            reused.index = keys.index[~changed_rows]
+            derived = pd.concat([fresh, reused[derived_columns]]).loc[ads_data.index]
+
+        rows = pd.concat([ads_data, derived.drop(columns=ads_data.columns, errors='ignore')], axis=1)
+        stored_rows = self.creatives if self.creatives is not None else rows.iloc[:0]
+        previous_changed = stored_rows[stored_rows[KEY_COLUMN].isin(changed_ids)]
+
+        aggregates = {}
+        for dimension, spec in aggregations.items():
+            touched = pd.Index(rows.loc[changed_rows, dimension].unique()).union(
+                pd.Index(previous_changed[dimension].unique())
+            )
+            recomputed = aggregate(rows[rows[dimension].isin(touched)], dimension, spec)
+
+            stored = self.aggregates.get(dimension)
+            if stored is not None and self.creatives is not None:
+                kept = _restore_columns(stored, spec)
+                kept = kept[~kept.index.isin(touched)]
+                recomputed = pd.concat([kept, recomputed]).sort_index()
+            aggregates[dimension] = recomputed
+
+        stored_columns = list(dict.fromkeys(
+            [KEY_COLUMN, ROW_COLUMN, VERSION_COLUMN, HASH_COLUMN] + list(aggregations) + derived_columns
+        ))
+        self.creatives = pd.concat([keys, rows.drop(columns=keys.columns, errors='ignore')], axis=1)[stored_columns]
+        self.creatives = self.creatives.reset_index(drop=True)
+        self.aggregates = {dimension: _flatten_columns(frame) for dimension, frame in aggregates.items()}
+        self.last_refresh = {
+            'rows': len(ads_data),
+            'creatives': int(keys[KEY_COLUMN].nunique()),
+            'changed_creatives': len(changed_ids),
+            'reprocessed_rows': int(changed_rows.sum())
+        }
+
+        return derived, aggregates
+
+    def save(self, source):
+        """Persist the current state and its manifest"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        _write_frame(self.creatives, self._path('creatives'))
+        dimensions = list(self.aggregates)
+        for index, dimension in enumerate(dimensions):
+            _write_frame(self.aggregates[dimension], self._path(f"by-{index}"))
+
+        manifest = {
+            'version': STATE_VERSION,
+            'source': os.path.abspath(source),
+            'signature': self.signature,
+            'format': CACHE_FORMAT,
+            'dimensions': dimensions,
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **self.last_refresh
+        }
+        with open(self._path('manifest', 'json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        self.manifest = manifest
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import uuid
+
+try:
+    import pyinstrument
+except ImportError:
+    # pyinstrument capture is optional; cProfile ships with Python
+    pyinstrument = None
+
+# Stage report written next to ads_performance_results.json
+DEFAULT_REPORT = 'analysis_profile.jsonl'
+
+PROFILERS = ['cprofile', 'pyinstrument']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    # VmHWM belongs to this process image; ru_maxrss on Linux carries over the
+    # parent's peak through fork and exec
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def reset_peak_rss():
+    """Restart the peak RSS count where the platform allows it (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def count_rows(value):
+    """Rows in a frame, or in every frame of a dict of frames; None otherwise"""
+    if hasattr(value, 'shape') and getattr(value, 'ndim', 0) >= 1:
+        return int(value.shape[0])
+    if isinstance(value, dict) and value and all(hasattr(item, 'shape') for item in value.values()):
+        return sum(int(item.shape[0]) for item in value.values())
+    return None
+
+
+class StageRecord:
+    """Measurements for one stage; callers fill in the row counts"""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+
+class Instrumentation:
+    """Per-stage wall/CPU time, row counts and peak memory, written as JSON lines.
+
+    Disabled instances cost next to nothing, so scripts can wrap their stages
+    unconditionally. With ``profiler`` set, every stage is also captured with
+    cProfile (``.prof`` files) or pyinstrument (``.html`` pages) next to the report.
+    """
+
+    def __init__(self, script, enabled=False, report_path=DEFAULT_REPORT, profiler=None):
+        self.script = script
+        self.enabled = enabled
+        self.report_path = report_path
+        self.profiler = profiler if enabled else None
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+
+    @classmethod
+    def from_args(cls, script, args, report_dir=None):
+        """Build from the options added by ``add_arguments``"""
+        report_path = args.profile_report
+        if report_path is None:
+            report_path = os.path.join(report_dir or os.getcwd(), DEFAULT_REPORT)
+        return cls(script, args.instrument, report_path, args.profiler)
+
+    def _profile_path(self, name, extension):
+        directory = os.path.join(os.path.dirname(os.path.abspath(self.report_path)), 'profiles')
+        os.makedirs(directory, exist_ok=True)
+        safe_name = ''.join(char if char.isalnum() else '_' for char in name)
+        return os.path.join(directory, f"{self.script}-{self.run_id}-{safe_name}.{extension}")
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """Measure the enclosed block as stage ``name``"""
+        record = StageRecord(name, rows_in)
+        if not self.enabled:
+            yield record
+            return
+
+        profiler = None
+        if self.profiler == 'cprofile':
+            profiler = cProfile.Profile()
+        elif self.profiler == 'pyinstrument':
+            profiler = pyinstrument.Profiler()
+
+        per_stage_peak = reset_peak_rss()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.start() if self.profiler == 'pyinstrument' else profiler.enable()
+        try:
+            yield record
+        finally:
+            profile_path = None
+            if profiler is not None:
+                if self.profiler == 'pyinstrument':
+                    profiler.stop()
+                    profile_path = self._profile_path(name, 'html')
+                    with open(profile_path, 'w', encoding='utf-8') as f:
+                        f.write(profiler.output_html())
+                else:
+                    profiler.disable()
+                    profile_path = self._profile_path(name, 'prof')
+                    profiler.dump_stats(profile_path)
+
+            self.record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start,
+                        record.rows_in, record.rows_out, peak_rss_mb(), per_stage_peak, profile_path)
+
+    def record(self, name, wall, cpu, rows_in=None, rows_out=None, peak_mb=None,
+               per_stage_peak=False, profile_path=None):
+        """Add a stage measured elsewhere (e.g. in a worker process)"""
+        if not self.enabled:
+            return
+        self.records.append({
+            'run_id': self.run_id,
+            'script': self.script,
+            'stage': name,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows_in': int(rows_in) if rows_in is not None else None,
+            'rows_out': int(rows_out) if rows_out is not None else None,
+            'peak_rss_mb': round(peak_mb, 1) if peak_mb is not None else None,
+            # False when the platform can't reset the peak, i.e. the value is the process peak
+            'peak_is_per_stage': per_stage_peak,
+            'profile': profile_path
+        })
+
+    def finish(self):
+        """Append the stage records and a run total to the report, then summarize them"""
+        if not self.enabled:
+            return
+        self.record('total', time.perf_counter() - self.started, time.process_time() - self.cpu_started,
+                    peak_mb=peak_rss_mb())
+
+        directory = os.path.dirname(os.path.abspath(self.report_path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.report_path, 'a', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        width = max(len(record['stage']) for record in self.records)
+        print(f"\n=== STAGE PROFILE ({self.script}) ===")
+        for record in self.records:
+            rows = ''
+            if record['rows_in'] is not None or record['rows_out'] is not None:
+                rows = f"  rows {record['rows_in'] if record['rows_in'] is not None else '-'}"
+                rows += f" -> {record['rows_out'] if record['rows_out'] is not None else '-'}"
+            print(f"{record['stage']:<{width}}  wall {record['wall_s']:8.3f}s  cpu {record['cpu_s']:8.3f}s"
+                  f"  peak {record['peak_rss_mb'] or 0:8.1f} MB{rows}")
+        print(f"Stage report appended to {self.report_path}")
+
+
+def add_arguments(parser):
+    """Add the instrumentation options shared by the analysis scripts"""
+    parser.add_argument('--instrument', action='store_true',
+                        help="record wall/CPU time, rows and peak memory per stage")
+    parser.add_argument('--profiler', choices=PROFILERS,
+                        help="also capture each stage with cProfile or pyinstrument")
+    parser.add_argument('--profile-report', metavar='PATH',
+                        help=f"JSON lines report to append to (default: {DEFAULT_REPORT} "
+                             "next to the results)")
+    return parser
+
+
+def check_arguments(parser, args):
+    """Reject profiler options that can't be honoured"""
+    if args.profiler and not args.instrument:
+        args.instrument = True
+    if args.profiler == 'pyinstrument' and pyinstrument is None:
+        parser.error("--profiler pyinstrument needs the pyinstrument package")
+    return args
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordIndex:
+    """Per-row keyword counts over a text column, built once and sliced by summing rows.
+
+    Counts follow the same substring semantics as ``str.lower().count(term)``
+    on the space-joined text, so 'free' also counts inside 'hands-free'.
+    """
+
+    def __init__(self, texts, terms=()):
+        # Lowercase once; missing and empty texts simply count zero
+        self.index = texts.index
+        self.text = texts.fillna('').astype(str).str.lower()
+        self.terms = []
+        self.matrix = np.zeros((len(self.text), 0), dtype=np.int32)
+        self.add_terms(terms)
+
+    def add_terms(self, terms):
+        """Count any terms not yet indexed"""
+        new_terms = [term for term in dict.fromkeys(terms) if term not in self.terms]
+        if not new_terms:
+            return self
+
+        columns = [
+            self.text.str.count(re.escape(term)).to_numpy(dtype=np.int32)
+            for term in new_terms
+        ]
+        self.matrix = np.column_stack([self.matrix] + columns)
+        self.terms.extend(new_terms)
+        return self
+
+    def frame(self):
+        """Return the per-row counts as a DataFrame (rows x terms)"""
+        return pd.DataFrame(self.matrix, index=self.index, columns=self.terms)
+
+    def counts(self, mask=None, terms=None):
+        """Total count of each term, optionally over a boolean row mask"""
+        terms = list(terms) if terms is not None else self.terms
+        self.add_terms(terms)
+
+        rows = self.matrix if mask is None else self.matrix[np.asarray(mask, dtype=bool)]
+        totals = rows.sum(axis=0)
+        return {term: int(totals[self.terms.index(term)]) for term in terms}
+
+    def counts_by(self, keys, terms=None):
+        """Term counts for every group of ``keys`` in one pass (groups x terms)"""
+        terms = list(terms) if terms is not None else self.terms
+        self.add_terms(terms)
+
+        keys = pd.Series(np.asarray(keys), index=self.index)
+        return self.frame()[terms].groupby(keys, sort=False).sum()
+
+    def theme_counts(self, themes, mask=None):
+        """Sum keyword counts per theme from a {theme: [keywords]} mapping"""
+        self.add_terms(term for keywords in themes.values() for term in keywords)
+        term_counts = self.counts(mask)
+        return {
+            theme: sum(term_counts[keyword] for keyword in keywords)
+            for theme, keywords in themes.items()
+        }
@@ -1,147 +1,200 @@
 #!/usr/bin/env python3
-import pandas as pd
 import re
-
-# Read the CSV file
-df = pd.read_csv('/mnt/d/TBWA/Philips/Breastfeeding_Pumps_Dashboard/Data/Brand_Manufacturer_with_downloads_analyzed_with_focus_tag_rows_321_end_classified_media.csv')
-
-# Define breastfeeding brands
-breastfeeding_brands = [
-    'Medela Inc.',
-    'Elvie (Chiaro Technology Ltd)',
-    'Momcozy',
-    'Avent',
-    'Evenflo',
-    'Motif Medical',
-    "Dr. Brown's (Handi-Craft Company)",
-    'TOMMEE TIPPEE (Mayborn USA Inc.)',
-    'Pumpables',
-    'Freemie',
-    'Spectra Baby',
-    'Baby Buddha Products'
-]
-
-# Filter for breastfeeding brands
-bf_data = df[df['Brand Root'].isin(breastfeeding_brands)].copy()
-
-print("=== MESSAGING AND POSITIONING ANALYSIS ===")
-
-print("\n=== KEY MESSAGING THEMES BY CATEGORY ===")
-
-categories_to_analyze = [
+import argparse
+
+from ad_cube import SOURCE_COLUMNS, AdCube
+from data_loader import BREASTFEEDING_BRANDS, DEFAULT_CSV, load_ads, source_fingerprint
+from dimension_index import DimensionIndex
+import instrumentation
+from instrumentation import Instrumentation
+from keyword_index import KeywordIndex
+from near_duplicates import collapse_duplicates, duplicate_clusters
+import result_cache
+from result_cache import ResultCache
+
+# Categories whose messaging is sampled, unless --categories says otherwise
+CATEGORIES_TO_ANALYZE = [
     'Comfort & Pain-Free Use',
-    'Portability & Discreet Design', 
+    'Portability & Discreet Design',
     'Convenience Features',
     'Efficiency',
     'Emotional Connection',
     'Real Mom Testimonials'
 ]
 
-for category in categories_to_analyze:
-    cat_data = bf_data[bf_data['Main_Category'] == category]
-    if len(cat_data) > 0:
-        print(f"\n--- {category} ({len(cat_data)} ads) ---")
-        
-        # Get sample messages
-        text_samples = cat_data[cat_data['Text_x'].notna() & (cat_data['Text_x'] != '')]
-        if len(text_samples) > 0:
-            print("Sample Messages:")
-            for i, (brand, text) in enumerate(zip(text_samples['Brand Root'].head(3), text_samples['Text_x'].head(3)), 1):
-                clean_text = str(text).replace('\n', ' ').strip()
-                print(f"{i}. {brand}: {clean_text[:120]}...")
+# Brands whose messaging patterns are shown, unless --top-brands says otherwise
+TOP_BRANDS = ['Momcozy', 'Elvie', 'Medela', 'Avent']
 
-print("\n=== BRAND-SPECIFIC MESSAGING PATTERNS ===")
+# Common breastfeeding terms, counted once per row
+KEY_TERMS = ['pump', 'breast', 'milk', 'comfort', 'easy', 'free', 'mom', 'baby', 'wireless', 'portable']
 
-top_brands = ['Momcozy', 'Elvie (Chiaro Technology Ltd)', 'Medela Inc.', 'Avent']
 
-for brand in top_brands:
-    brand_data = bf_data[bf_data['Brand Root'] == brand]
-    text_data = brand_data[brand_data['Text_x'].notna() & (brand_data['Text_x'] != '')]
-    
-    if len(text_data) > 0:
-        print(f"\n--- {brand} Messaging Analysis ---")
+def category_messaging(cube, dimensions, categories):
+    """Ad count and sample messages of each category"""
+    for category in categories:
+        cat_count = cube.total('ads', where={'Main_Category': category})
+        if cat_count > 0:
+            print(f"\n--- {category} ({cat_count} ads) ---")
         
-        # Sample messages
-        print("Sample Messages:")
-        for i, text in enumerate(text_data['Text_x'].head(3), 1):
-            clean_text = str(text).replace('\n', ' ').strip()
-            print(f"{i}. {clean_text[:150]}...")
+            # Get sample messages
+            cat_data = dimensions.select('Main_Category', category)
+            text_samples = cat_data[cat_data['Text_x'].notna() & (cat_data['Text_x'] != '')]
+            if len(text_samples) > 0:
+                print("Sample Messages:")
+                for i, (brand, text) in enumerate(zip(text_samples['Brand Root'].head(3), text_samples['Text_x'].head(3)), 1):
+                    clean_text = str(text).replace('\n', ' ').strip()
+                    print(f"{i}. {brand}: {clean_text[:120]}...")
+
+
+def brand_messaging(dimensions, brand_term_counts, brands):
+    """Sample messages and most used key terms of each brand"""
+    for brand in brands:
+        brand_data = dimensions.select('Brand Root', brand)
+        text_data = brand_data[brand_data['Text_x'].notna() & (brand_data['Text_x'] != '')]
+    
+        if len(text_data) > 0:
+            print(f"\n--- {brand} Messaging Analysis ---")
         
-        # Key phrases analysis
-        all_text = ' '.join(text_data['Text_x'].astype(str))
+            # Sample messages
+            print("Sample Messages:")
+            for i, text in enumerate(text_data['Text_x'].head(3), 1):
+                clean_text = str(text).replace('\n', ' ').strip()
+                print(f"{i}. {clean_text[:150]}...")
         
-        # Look for common breastfeeding terms
-        key_terms = {
-            'pump': all_text.lower().count('pump'),
-            'breast': all_text.lower().count('breast'),
-            'milk': all_text.lower().count('milk'),
-            'comfort': all_text.lower().count('comfort'),
-            'easy': all_text.lower().count('easy'),
-            'free': all_text.lower().count('free'),
-            'mom': all_text.lower().count('mom'),
-            'baby': all_text.lower().count('baby'),
-            'wireless': all_text.lower().count('wireless'),
-            'portable': all_text.lower().count('portable')
-        }
+            # Key phrases analysis from the precomputed brand term counts
+            key_terms = {term: int(brand_term_counts.loc[brand, term]) for term in brand_term_counts.columns}
         
-        top_terms = sorted([(k, v) for k, v in key_terms.items() if v > 0], key=lambda x: x[1], reverse=True)
-        if top_terms:
-            print(f"Key Terms: {dict(top_terms[:5])}")
+            top_terms = sorted([(k, v) for k, v in key_terms.items() if v > 0], key=lambda x: x[1], reverse=True)
+            if top_terms:
+                print(f"Key Terms: {dict(top_terms[:5])}")
+
+
+parser = argparse.ArgumentParser(description="Breastfeeding brand messaging and positioning analysis")
+parser.add_argument('--collapse-duplicates', action='store_true',
+                    help="count near-identical messages once, with their metrics summed")
+parser.add_argument('--brands', nargs='+', default=BREASTFEEDING_BRANDS, metavar='BRAND',
+                    help="brands to load, in any spelling; defaults to the breastfeeding brands")
+parser.add_argument('--top-brands', nargs='+', default=TOP_BRANDS, metavar='BRAND',
+                    help="brands whose messaging patterns are shown")
+parser.add_argument('--categories', nargs='+', default=CATEGORIES_TO_ANALYZE, metavar='CATEGORY',
+                    help="categories whose messaging is sampled")
+instrumentation.add_arguments(parser)
+result_cache.add_arguments(parser)
+args = instrumentation.check_arguments(parser, parser.parse_args())
+profile = Instrumentation.from_args('messaging_analysis', args)
+cache = ResultCache.from_args(args)
+
+with profile.stage('load') as record:
+    # Read only the columns this report uses, keeping the chosen brands while parsing
+    bf_data = load_ads(
+        columns=list(dict.fromkeys(SOURCE_COLUMNS + ['Text_x'])),
+        brands=args.brands
+    )
+    if args.collapse_duplicates:
+        # One row per near-duplicate message, so repeated copy isn't counted or sampled twice
+        bf_data = collapse_duplicates(bf_data, duplicate_clusters(bf_data, columns=['Text_x'])).reset_index(drop=True)
+
+    # Counts come from the cube; raw rows are only read for sample messages
+    cube = AdCube.from_frame(bf_data)
+    dimensions = DimensionIndex(bf_data, ['Brand Root', 'Main_Category', 'Product_Focus'])
+    if cache.enabled:
+        # Section keys use the export's fingerprint instead of hashing the frame and its indexes
+        source = (source_fingerprint(DEFAULT_CSV), sorted(args.brands), args.collapse_duplicates)
+        for name, value in [('bf_data', bf_data), ('cube', cube), ('dimensions', dimensions)]:
+            cache.tag(value, source, name)
+    record.rows_out = len(bf_data)
 
-print("\n=== VALUE PROPOSITIONS BY PRODUCT FOCUS ===")
+print("=== MESSAGING AND POSITIONING ANALYSIS ===")
 
-focus_areas = ['Breastfeeding Pump', 'Other: Baby Bottles/Feeding', 'Other: Smart Accessory/App']
+with profile.stage('category_messaging', len(bf_data)):
+    print("\n=== KEY MESSAGING THEMES BY CATEGORY ===")
+    cache.call(category_messaging, cube, dimensions, args.categories)
 
-for focus in focus_areas:
-    focus_data = bf_data[bf_data['Product_Focus'] == focus]
-    if len(focus_data) > 0:
-        print(f"\n--- {focus} ({len(focus_data)} ads) ---")
-        
-        # Brand distribution
-        brand_dist = focus_data['Brand Root'].value_counts().head(3)
-        print(f"Top Brands: {dict(brand_dist)}")
-        
-        # Sample messages
-        text_samples = focus_data[focus_data['Text_x'].notna() & (focus_data['Text_x'] != '')]
-        if len(text_samples) > 0:
-            print("Sample Messages:")
-            for i, text in enumerate(text_samples['Text_x'].head(2), 1):
-                clean_text = str(text).replace('\n', ' ').strip()
-                print(f"{i}. {clean_text[:120]}...")
+with profile.stage('brand_messaging', len(bf_data)) as record:
+    print("\n=== BRAND-SPECIFIC MESSAGING PATTERNS ===")
 
-print("\n=== EMOTIONAL VS FUNCTIONAL MESSAGING ===")
+    # Key terms counted once per row and summed per brand
+    keyword_index = KeywordIndex(bf_data['Text_x'], KEY_TERMS)
+    brand_term_counts = keyword_index.counts_by(bf_data['Brand Root'])
 
-emotional_data = bf_data[bf_data['Main_Category'] == 'Emotional Connection']
-functional_cats = ['Efficiency', 'Convenience Features', 'Comfort & Pain-Free Use']
-functional_data = bf_data[bf_data['Main_Category'].isin(functional_cats)]
+    cache.call(brand_messaging, dimensions, brand_term_counts, args.top_brands)
+    record.rows_out = len(brand_term_counts)
 
-print(f"Emotional Messaging ({len(emotional_data)} ads):")
-if len(emotional_data) > 0:
-    emotional_brands = emotional_data['Brand Root'].value_counts().head(3)
-    print(f"Leading Brands: {dict(emotional_brands)}")
+with profile.stage('key_terms', len(bf_data)) as record:
+    print("\n=== KEY TERMS ACROSS ALL BRANDS AND CATEGORIES ===")
 
-print(f"\nFunctional Messaging ({len(functional_data)} ads):")
-if len(functional_data) > 0:
-    functional_brands = functional_data['Brand Root'].value_counts().head(3)
-    print(f"Leading Brands: {dict(functional_brands)}")
+    print("By Brand:")
+    print(brand_term_counts.loc[brand_term_counts.sum(axis=1).sort_values(ascending=False).index])
 
-print("\n=== COMMUNICATION GAPS ANALYSIS ===")
+    print("\nBy Main Category:")
+    category_term_counts = keyword_index.counts_by(bf_data['Main_Category'])
+    print(category_term_counts.loc[category_term_counts.sum(axis=1).sort_values(ascending=False).index])
+    record.rows_out = len(category_term_counts)
 
-# Analyze underrepresented themes
-underrep_categories = [
-    'Support for Working Moms',
-    'Baby Monitoring & Peace of Mind', 
-    'Real Mom Testimonials',
-    'Hospital Grade or Doctor Recommended'
-]
+with profile.stage('product_focus_messaging', len(bf_data)):
+    print("\n=== VALUE PROPOSITIONS BY PRODUCT FOCUS ===")
 
-print("Underrepresented Communication Areas:")
-for category in underrep_categories:
-    cat_count = len(bf_data[bf_data['Main_Category'] == category])
-    if cat_count > 0:
-        cat_brands = bf_data[bf_data['Main_Category'] == category]['Brand Root'].value_counts()
-        print(f"{category}: {cat_count} ads - Leading: {cat_brands.index[0] if len(cat_brands) > 0 else 'None'}")
-    else:
-        print(f"{category}: {cat_count} ads - No significant presence")
+    focus_areas = ['Breastfeeding Pump', 'Other: Baby Bottles/Feeding', 'Other: Smart Accessory/App']
 
-print("\n=== ANALYSIS COMPLETE ===")
\ No newline at end of file
+    for focus in focus_areas:
+        focus_count = cube.total('ads', where={'Product_Focus': focus})
+        if focus_count > 0:
+            print(f"\n--- {focus} ({focus_count} ads) ---")
+        
+            # Brand distribution
+            brand_dist = cube.value_counts('Brand Root', where={'Product_Focus': focus}).head(3)
+            print(f"Top Brands: {dict(brand_dist)}")
+        
+            # Sample messages
+            focus_data = dimensions.select('Product_Focus', focus)
+            text_samples = focus_data[focus_data['Text_x'].notna() & (focus_data['Text_x'] != '')]
+            if len(text_samples) > 0:
+                print("Sample Messages:")
+                for i, text in enumerate(text_samples['Text_x'].head(2), 1):
+                    clean_text = str(text).replace('\n', ' ').strip()
+                    print(f"{i}. {clean_text[:120]}...")
+
+with profile.stage('emotional_vs_functional', len(bf_data)) as record:
+    print("\n=== EMOTIONAL VS FUNCTIONAL MESSAGING ===")
+
+    emotional = {'Main_Category': 'Emotional Connection'}
+    functional_cats = ['Efficiency', 'Convenience Features', 'Comfort & Pain-Free Use']
+    functional = {'Main_Category': functional_cats}
+    emotional_count = cube.total('ads', where=emotional)
+    functional_count = cube.total('ads', where=functional)
+
+    print(f"Emotional Messaging ({emotional_count} ads):")
+    if emotional_count > 0:
+        emotional_brands = cube.value_counts('Brand Root', where=emotional).head(3)
+        print(f"Leading Brands: {dict(emotional_brands)}")
+
+    print(f"\nFunctional Messaging ({functional_count} ads):")
+    if functional_count > 0:
+        functional_brands = cube.value_counts('Brand Root', where=functional).head(3)
+        print(f"Leading Brands: {dict(functional_brands)}")
+    record.rows_out = emotional_count + functional_count
+
+with profile.stage('communication_gaps', len(bf_data)):
+    print("\n=== COMMUNICATION GAPS ANALYSIS ===")
+
+    # Analyze underrepresented themes
+    underrep_categories = [
+        'Support for Working Moms',
+        'Baby Monitoring & Peace of Mind', 
+        'Real Mom Testimonials',
+        'Hospital Grade or Doctor Recommended'
+    ]
+
+    print("Underrepresented Communication Areas:")
+    for category in underrep_categories:
+        cat_count = cube.total('ads', where={'Main_Category': category})
+        if cat_count > 0:
+            cat_brands = cube.value_counts('Brand Root', where={'Main_Category': category})
+            print(f"{category}: {cat_count} ads - Leading: {cat_brands.index[0] if len(cat_brands) > 0 else 'None'}")
+        else:
+            print(f"{category}: {cat_count} ads - No significant presence")
+
+print("\n=== ANALYSIS COMPLETE ===")
+
+cache.report()
+profile.finish()
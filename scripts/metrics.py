@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import math
+
+import numpy as np
+import pandas as pd
+
+SPEND_COLUMN = 'Spend (USD)'
+IMPRESSIONS_COLUMN = 'Impressions'
+
+# Aggregation weighting a column by the spend of rows with impressions, e.g. {'CPM': SPEND_WEIGHTED}
+SPEND_WEIGHTED = 'spend_weighted'
+
+# Aggregations ``aggregate`` understands, besides SPEND_WEIGHTED
+SEGMENT_FUNCS = ('sum', 'count', 'mean', 'max')
+
+
+def _floats(values):
+    return np.asarray(values, dtype=float)
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """numerator / denominator * scale, and 0 where the denominator isn't positive"""
+    numerator, denominator = _floats(numerator), _floats(denominator)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator * scale, 0.0)
+
+
+def cpm(spend, impressions):
+    """Cost per thousand impressions; 0 without impressions"""
+    return _ratio(spend, impressions, 1000)
+
+
+def performance_score(impressions, cpm_values):
+    """Impressions discounted by cost: impressions / (1 + CPM)"""
+    return _floats(impressions) * (1 / (1 + _floats(cpm_values)))
+
+
+def engagement_rate(engagement, impressions):
+    """Engagements per impression; 0 without impressions"""
+    return _ratio(engagement, impressions)
+
+
+def share_of_voice(values):
+    """Each value's share of the total, e.g. of impressions per brand; 0 when the total is 0"""
+    values = _floats(values)
+    return _ratio(values, np.full(len(values), values.sum()))
+
+
+def segment_sum(values, codes, n):
+    """Sum of ``values`` per segment code (NaN skipped)"""
+    values = _floats(values)
+    present = ~np.isnan(values)
+    return np.bincount(codes[present], weights=values[present], minlength=n)
+
+
+def segment_count(values, codes, n):
+    """Non-missing values per segment code"""
+    present = ~pd.isna(values)
+    return np.bincount(codes[present], minlength=n)
+
+
+def segment_max(values, codes, n):
+    """Largest value per segment code; NaN for segments without values"""
+    values = _floats(values)
+    result = np.full(n, -np.inf)
+    np.fmax.at(result, codes, values)
+    result[segment_count(values, codes, n) == 0] = np.nan
+    return result
+
+
+def segment_weighted_mean(values, weights, codes, n):
+    """sum(value * weight) / sum(weight) per segment code; 0 where the weights sum to 0"""
+    values, weights = _floats(values), _floats(weights)
+    return _ratio(segment_sum(values * weights, codes, n), segment_sum(weights, codes, n))
+
+
+def cpm_weights(spend, impressions):
+    """Spend of every row as the weight of its CPM; 0 for rows without impressions, which have no CPM"""
+    return np.where(_floats(impressions) > 0, _floats(spend), 0.0)
+
+
+def weighted_cpm(cpm_values, spend, impressions, codes=None, n=1):
+    """Spend-weighted mean of row CPMs per segment code, or one figure over all rows without ``codes``.
+
+    Each ad's CPM counts in proportion to its spend, so a $5 ad moves the
+    average far less than a $50,000 one. This is an average of ad prices,
+    not the ratio of totals ``cpm(sum spend, sum impressions)``, which
+    weights by impressions and is what channel and format CPMs report.
+    """
+    weights = cpm_weights(spend, impressions)
+    if codes is None:
+        # Correctly rounded sums, so any chunking of the rows gives the same figure
+        total = math.fsum(weights)
+        return math.fsum(_floats(cpm_values) * weights) / total if total > 0 else 0.0
+    return segment_weighted_mean(cpm_values, weights, codes, n)
+
+
+# Metrics of a whole group, from its sums: name -> (kernel, summed columns)
+GROUP_METRICS = {
+    'CPM': (cpm, [SPEND_COLUMN, IMPRESSIONS_COLUMN]),
+    'Share_of_Voice': (share_of_voice, [IMPRESSIONS_COLUMN])
+}
+
+
+class _Segments:
+    """Rows split into segments by code, with each column's segment sum computed at most once"""
+
+    def __init__(self, df, codes, n):
+        self.df, self.codes, self.n = df, codes, n
+        self.sums = {}
+
+    def sum(self, column):
+        if column not in self.sums:
+            self.sums[column] = segment_sum(self.df[column].to_numpy(), self.codes, self.n)
+        return self.sums[column]
+
+    def count(self, column):
+        return segment_count(self.df[column].to_numpy(), self.codes, self.n)
+
+    def apply(self, column, func):
+        """One aggregation of one column over every segment"""
+        is_integer = pd.api.types.is_integer_dtype(self.df[column])
+        if func == 'count':
+            return self.count(column)
+        if func == SPEND_WEIGHTED:
+            weights = cpm_weights(self.df[SPEND_COLUMN].to_numpy(), self.df[IMPRESSIONS_COLUMN].to_numpy())
+            return segment_weighted_mean(self.df[column].to_numpy(), weights, self.codes, self.n)
+        if func == 'sum':
+            return self.sum(column).astype(np.int64) if is_integer else self.sum(column)
+        if func == 'mean':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self.sum(column) / self.count(column)
+        if func == 'max':
+            largest = segment_max(self.df[column].to_numpy(), self.codes, self.n)
+            return largest.astype(np.int64) if is_integer else largest
+        raise ValueError(f"Unknown aggregation {func!r}; use {', '.join(SEGMENT_FUNCS + (SPEND_WEIGHTED,))}")
+
+
+def aggregate(df, by, spec, metrics=()):
+    """``df.groupby(by).agg(spec)`` in one pass, plus SPEND_WEIGHTED means and GROUP_METRICS.
+
+    The groups are factorized once and every aggregation is a
+    ``np.bincount`` (or ``fmax.at``) over the shared codes, instead of one
+    groupby reduction per column; ``metrics`` such as 'CPM' are computed
+    from the same segment sums and appended as columns. Rows with a missing
+    key are left out and groups come out sorted, as groupby does.
+    """
+    codes, labels = pd.factorize(df[by], sort=True)
+    keep = codes >= 0
+    segments = _Segments(df[keep] if not keep.all() else df, codes[keep], len(labels))
+
+    multi = any(isinstance(funcs, list) for funcs in spec.values())
+    output = {}
+    for column, funcs in spec.items():
+        for func in funcs if isinstance(funcs, list) else [funcs]:
+            output[(column, func) if multi else column] = segments.apply(column, func)
+    for name in metrics:
+        kernel, columns = GROUP_METRICS[name]
+        output[(name, '') if multi else name] = kernel(*[segments.sum(column) for column in columns])
+
+    result = pd.DataFrame(output, index=pd.Index(labels, name=by))
+    if multi:
+        result.columns = pd.MultiIndex.from_tuples(result.columns)
+    return result
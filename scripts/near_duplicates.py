@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_loader import BREASTFEEDING_BRANDS, load_ads
+
+# Text fields whose combined copy identifies a creative's content
+DEDUP_TEXT_COLUMNS = ['Text_x', 'Text_y', 'transcription']
+
+# Characters per shingle
+SHINGLE_SIZE = 5
+
+# MinHash signature length, split into LSH bands of equal width. 16 bands of
+# 8 rows make pairs above roughly 0.7 Jaccard similarity likely to collide.
+NUM_PERMUTATIONS = 128
+BANDS = 16
+
+# Estimated Jaccard similarity needed to join a colliding pair into a cluster
+SIMILARITY_THRESHOLD = 0.8
+
+# Clusters never span two values of this column, so collapsing keeps each brand's totals
+GROUP_COLUMN = 'Brand Root'
+
+# Metrics summed per cluster when duplicates are collapsed
+SUM_COLUMNS = ['Impressions', 'Spend (USD)']
+
+# Prime just above 2**32 for the universal hash family
+_PRIME = np.uint64(4294967311)
+
+
+def normalize_text(text):
+    """Lowercase and reduce punctuation and whitespace runs to single spaces"""
+    return re.sub(r'[\W_]+', ' ', text.lower()).strip()
+
+
+def combined_text(df, columns=DEDUP_TEXT_COLUMNS):
+    """Space-joined text of the given columns present in ``df``"""
+    parts = [df[column].fillna('').astype(str) for column in columns if column in df.columns]
+    if not parts:
+        return pd.Series('', index=df.index)
+    text = parts[0]
+    for part in parts[1:]:
+        text = text + ' ' + part
+    return text
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """32-bit rolling hashes of every ``size``-character window of ``text``"""
+    data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint32)
+    if len(data) <= size:
+        size = len(data)
+    powers = np.uint32(31) ** np.arange(size - 1, -1, -1, dtype=np.uint32)
+    windows = np.lib.stride_tricks.sliding_window_view(data, size)
+    # uint32 arithmetic wraps, i.e. the polynomial hash is taken mod 2**32
+    return np.unique(windows @ powers)
+
+
+def minhash_signatures(texts, num_permutations=NUM_PERMUTATIONS, seed=1):
+    """MinHash signature (one row of ``num_permutations`` values) per text.
+
+    Shingle hashes of all texts are concatenated once; each permutation is
+    then a single vectorized pass with ``np.minimum.reduceat`` over the text
+    boundaries, so the cost is linear in the total number of shingles.
+    """
+    hashes = [shingle_hashes(text) for text in texts]
+    lengths = np.array([len(values) for values in hashes])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = np.concatenate(hashes).astype(np.uint64) if len(hashes) else np.empty(0, dtype=np.uint64)
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 32, size=num_permutations, dtype=np.uint64)
+    b = rng.integers(0, 2 ** 32, size=num_permutations, dtype=np.uint64)
+
+    signatures = np.empty((len(hashes), num_permutations), dtype=np.uint64)
+    for permutation in range(num_permutations):
+        permuted = (a[permutation] * values + b[permutation]) % _PRIME
+        signatures[:, permutation] = np.minimum.reduceat(permuted, offsets) if len(values) else 0
+    return signatures
+
+
+def connected_components(count, left, right):
+    """Component label (smallest member) of every node, given edges left-right"""
+    labels = np.arange(count)
+    while True:
+        # Pull both ends of every edge down to the smaller label, then jump pointers
+        smaller = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smaller)
+        np.minimum.at(updated, right, smaller)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def lsh_clusters(signatures, bands=BANDS, threshold=SIMILARITY_THRESHOLD):
+    """Cluster label per signature, joining LSH collisions that pass ``threshold``.
+
+    Signatures are cut into ``bands``; rows sharing a band are candidates and
+    are checked against the first row of their bucket only, so work grows
+    with the number of rows rather than with the number of pairs.
+    """
+    count, width = signatures.shape
+    rows_per_band = width // bands
+    left, right = [], []
+
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        _, first, buckets = np.unique(block.view(np.dtype((np.void, block.dtype.itemsize * rows_per_band))),
+                                      return_index=True, return_inverse=True)
+        anchors = first[buckets.ravel()]
+        candidates = np.flatnonzero(anchors != np.arange(count))
+        similarity = (signatures[candidates] == signatures[anchors[candidates]]).mean(axis=1)
+        joined = candidates[similarity >= threshold]
+        left.append(joined)
+        right.append(anchors[joined])
+
+    return connected_components(count, np.concatenate(left), np.concatenate(right))
+
+
+def duplicate_clusters(df, columns=DEDUP_TEXT_COLUMNS, threshold=SIMILARITY_THRESHOLD, by=GROUP_COLUMN):
+    """Cluster of every row: the position of the first row with near-identical text and the same ``by``.
+
+    Exact copies are folded before normalizing and hashing, so each distinct
+    text is processed once; rows of different brands with the same copy land
+    in separate clusters. Rows without any text are never clustered with
+    other rows.
+    """
+    raw_codes, raw_texts = pd.factorize(combined_text(df, columns).to_numpy())
+    normalized_codes, distinct = pd.factorize(np.array([normalize_text(text) for text in raw_texts], dtype=object))
+    codes = normalized_codes[raw_codes]
+    has_text = np.array([len(value) > 0 for value in distinct], dtype=bool)
+
+    text_labels = np.arange(len(distinct))
+    with_text = np.flatnonzero(has_text)
+    if len(with_text) > 1:
+        signatures = minhash_signatures(distinct[with_text])
+        text_labels[with_text] = with_text[lsh_clusters(signatures, threshold=threshold)]
+
+    # A cluster is named after its first row in frame order
+    row_labels = np.where(has_text[codes], text_labels[codes], len(distinct) + np.arange(len(df)))
+    if by in df.columns:
+        groups, _ = pd.factorize(df[by].to_numpy(dtype=object), use_na_sentinel=False)
+        row_labels = groups.astype(np.int64) * (len(distinct) + len(df)) + row_labels
+    _, first_rows, inverse = np.unique(row_labels, return_index=True, return_inverse=True)
+    return first_rows[inverse.ravel()]
+
+
+def collapse_duplicates(df, clusters, sum_columns=SUM_COLUMNS):
+    """One row per cluster: the first row's fields with ``sum_columns`` summed.
+
+    ``Duplicate_Count`` records how many rows each kept row stands for.
+    """
+    clusters = np.asarray(clusters)
+    keep = clusters == np.arange(len(df))
+    collapsed = df[keep].copy()
+
+    # Clusters are labelled by their first row, so sorted labels follow the kept rows
+    columns = [column for column in sum_columns if column in df.columns]
+    totals = df[columns].groupby(clusters).sum()
+    collapsed[columns] = totals.to_numpy()
+    collapsed['Duplicate_Count'] = np.bincount(clusters, minlength=len(df))[keep]
+    return collapsed
+
+
+def main():
+    """Report near-duplicate creative clusters among the breastfeeding brands"""
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate ad creatives")
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD,
+                        help="estimated Jaccard similarity needed to join two creatives")
+    parser.add_argument('--top', type=int, default=10, help="largest clusters to show")
+    args = parser.parse_args()
+
+    ads = load_ads(brands=BREASTFEEDING_BRANDS)
+    clusters = duplicate_clusters(ads, threshold=args.threshold)
+    sizes = pd.Series(clusters).value_counts()
+
+    print("\n=== NEAR-DUPLICATE CREATIVES ===")
+    print(f"Rows: {len(ads):,}")
+    print(f"Clusters: {len(sizes):,} ({(sizes > 1).sum():,} with more than one row)")
+    print(f"Rows folded into another: {len(ads) - len(sizes):,}")
+
+    print(f"\nLargest {args.top} clusters:")
+    for first_row, size in sizes.head(args.top).items():
+        row = ads.iloc[first_row]
+        text = str(row.get('Text_x', '')).replace('\n', ' ').strip()
+        print(f"{size:>6} rows  {row['Brand Root']}: {text[:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+
+from build_bubble_data import SOURCE_FILES, read_raw_source
+from data_loader import CACHE_FORMAT, DATA_DIR
+from source_normalizer import CANONICAL_SCHEMA, normalize_source, to_canonical
+
+# RivalIQ social exports are named rivaliq_<platform>_<account>.csv
+RIVALIQ_PATTERN = re.compile(r'^rivaliq_([a-z]+)_.+\.csv$', re.IGNORECASE)
+
+# Without a Parquet engine the dataset is pickled, like the data_loader cache
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'normalized_sources.parquet' if CACHE_FORMAT == 'parquet'
+                              else 'normalized_sources.pkl')
+
+
+def find_sources(data_dir):
+    """(source type, path) of the dashboard exports and the RivalIQ exports in ``data_dir``"""
+    sources = [(source_type, os.path.join(data_dir, filename)) for source_type, filename in SOURCE_FILES.items()]
+    for name in sorted(os.listdir(data_dir)):
+        match = RIVALIQ_PATTERN.match(name)
+        if match:
+            sources.append((match.group(1).lower(), os.path.join(data_dir, name)))
+    return sources
+
+
+def normalize_files(sources):
+    """Normalize (source type, path) pairs into one canonical frame, in the given order"""
+    frames = []
+    for source_type, path in sources:
+        if not os.path.exists(path):
+            print(f"Skipping {source_type}: {path} not found")
+            continue
+
+        frame = to_canonical(normalize_source(read_raw_source(path), source_type))
+        frames.append(frame)
+        print(f"Normalized {len(frame):,} {source_type} rows from {os.path.basename(path)}")
+
+    if not frames:
+        raise FileNotFoundError("None of the sources were found")
+
+    # Categories differ per file, so types are restored after stacking
+    return pd.concat(frames, ignore_index=True).astype(CANONICAL_SCHEMA)
+
+
+def write_canonical(canonical, path):
+    """Write the canonical dataset as Parquet, or as a pickle for any other extension"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith('.parquet'):
+        canonical.to_parquet(path, index=False)
+    else:
+        canonical.to_pickle(path)
+
+
+def main():
+    """Normalize the Pathmatics and social exports into one dataset"""
+    parser = argparse.ArgumentParser(description="Normalize Pathmatics and RivalIQ exports to one canonical schema")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the dataset (.parquet or .pkl)")
+    parser.add_argument('--source', nargs=2, action='append', metavar=('TYPE', 'PATH'),
+                        help="normalize only these exports, e.g. --source instagram export.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    canonical = normalize_files(args.source or find_sources(args.data_dir))
+    write_canonical(canonical, args.output)
+    elapsed = time.perf_counter() - start
+
+    print("\n=== NORMALIZED SOURCES ===")
+    summary = canonical.groupby('source', observed=True).agg(
+        rows=('brand', 'size'), impressions=('impressions', 'sum'), engagement=('engagement', 'sum'),
+        spend=('spend', 'sum')
+    )
+    print(summary)
+    print("\nImpressions taken from:")
+    print(pd.crosstab(canonical['source'], canonical['impressions_source']))
+    print(f"\nWrote {len(canonical):,} rows to {args.output} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CACHE_DIR
+
+# Memoized analysis results live next to the columnar cache
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, 'results')
+
+DEFAULT_MAX_MB = 512
+DEFAULT_MAX_ENTRIES = 1000
+
+# Part of every key; bump it to drop all stored results at once
+CACHE_VERSION = 1
+
+# Directory of the scripts; a cached function's module and the scripts it
+# imports from here are part of its key
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Source file -> fingerprint, computed once per run
+_source_fingerprints = {}
+
+
+def _code_parts(code):
+    """Bytecode and constants of a code object and the functions nested in it"""
+    parts = [code.co_code.hex()]
+    for const in code.co_consts:
+        parts.extend(_code_parts(const) if isinstance(const, types.CodeType) else [repr(const)])
+    return parts
+
+
+def function_fingerprint(func):
+    """Hash of a function's name and code, so editing it invalidates its results"""
+    parts = [getattr(func, '__module__', None) or '', getattr(func, '__qualname__', repr(func))]
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        parts.extend(_code_parts(code))
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def local_imports(path, directory=SOURCE_DIR):
+    """Scripts in ``directory`` that the file at ``path`` imports, directly or through each other"""
+    found = set()
+    pending = [os.path.abspath(path)]
+    while pending:
+        current = pending.pop()
+        if current in found:
+            continue
+        found.add(current)
+        with open(current, 'rb') as f:
+            tree = ast.parse(f.read(), filename=current)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                candidate = os.path.join(directory, module.split('.')[0] + '.py')
+                if os.path.exists(candidate):
+                    pending.append(candidate)
+    return sorted(found)
+
+
+def source_fingerprint(path, directory=SOURCE_DIR):
+    """Hash of a script and the scripts it imports, computed once per run.
+
+    Stages call helpers and read module-level specs that their own bytecode
+    doesn't show, so editing any of those files invalidates the stage's
+    results; editing an unrelated script leaves them alone.
+    """
+    if path is None:
+        return ''
+    path = os.path.abspath(path)
+    if path not in _source_fingerprints:
+        digest = hashlib.sha1()
+        for source in local_imports(path, directory):
+            digest.update(os.path.basename(source).encode('utf-8') + b'\0')
+            with open(source, 'rb') as f:
+                digest.update(hashlib.sha1(f.read()).digest())
+        _source_fingerprints[path] = digest.hexdigest()
+    return _source_fingerprints[path]
+
+
+def module_path(func):
+    """Source file of the module defining ``func``, or None"""
+    module = sys.modules.get(getattr(func, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    return path if path and path.endswith('.py') else None
+
+
+def _update(digest, value, tags):
+    """Feed a stable description of ``value`` into ``digest``"""
+    if id(value) in tags:
+        digest.update(b'tag:' + tags[id(value)][1].encode('ascii'))
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        dtypes = list(value.dtypes) if isinstance(value, pd.DataFrame) else [value.dtype]
+        digest.update(repr((type(value).__name__, value.shape, labels, [str(dtype) for dtype in dtypes])).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        digest.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for item_key, item in value.items():
+            _update(digest, item_key, tags)
+            _update(digest, item, tags)
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode('ascii'))
+        for item in value:
+            _update(digest, item, tags)
+    elif value is None or isinstance(value, (str, bytes, int, float, bool)):
+        digest.update(repr(value).encode('utf-8'))
+    else:
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class _Tee(io.TextIOBase):
+    """Write to a stream while keeping a copy of everything written"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.copy = io.StringIO()
+
+    def write(self, text):
+        self.copy.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ResultCache:
+    """Persistent memoization of analysis results, one pickle file per entry.
+
+    Entries are keyed on the function (name and code), the sources of its
+    module and the scripts that module imports, a fingerprint of every
+    argument and CACHE_VERSION. Parameters such as top_n or a brand subset
+    should therefore reach the function as arguments, not as edits to a
+    script. Frames are
+    fingerprinted by content unless they were ``tag``-ged with the
+    fingerprint of the data they came from, which spares hashing a freshly
+    loaded export. What the function printed is stored with its result and
+    printed again on a hit, so reports read the same either way.
+
+    A hit refreshes the entry's modification time; once the directory holds
+    more than ``max_bytes`` or ``max_entries``, the least recently used
+    entries are removed first. Entries are written to a temporary file and
+    renamed into place, so concurrent runs can share a directory.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+                 max_entries=DEFAULT_MAX_ENTRIES, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'saved_s': 0.0}
+        # id -> (object, fingerprint); the object is kept so its id isn't reused
+        self._tags = {}
+
+    @classmethod
+    def from_args(cls, args):
+        """Build from the options added by ``add_arguments``"""
+        cache = cls(args.result_cache_dir, args.result_cache_mb * 1024 * 1024, enabled=args.result_cache)
+        if args.clear_result_cache:
+            cache.clear()
+        elif cache.enabled:
+            # A lowered --result-cache-mb takes effect before anything is added
+            cache.evict()
+        return cache
+
+    def tag(self, value, *parts):
+        """Fingerprint ``value`` by ``parts`` (e.g. a source hash and load options); returns it.
+
+        Scalars can't be tagged: interned values such as None, small ints or
+        short strings share their id with every other use.
+        """
+        if self.enabled and not isinstance(value, (str, bytes, int, float, bool, type(None))):
+            fingerprint = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+            self._tags[id(value)] = (value, fingerprint)
+        return value
+
+    def key(self, func, args=(), kwargs=None, depends_on=None):
+        """Cache key of calling ``func`` with these arguments.
+
+        ``depends_on`` adds what the call reads besides its arguments, such as
+        the fingerprint of the export a loader reads.
+        """
+        code = f"v{CACHE_VERSION}:{source_fingerprint(module_path(func))}:{function_fingerprint(func)}"
+        digest = hashlib.sha1(code.encode('ascii'))
+        _update(digest, list(args), self._tags)
+        _update(digest, dict(sorted((kwargs or {}).items())), self._tags)
+        _update(digest, depends_on, self._tags)
+        name = getattr(func, '__name__', 'call')
+        return f"{name}-{digest.hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """The stored entry for ``key`` (result, output, seconds), or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Unreadable or stale entries are dropped and recomputed
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        self.stats['saved_s'] += entry['seconds']
+        return entry
+
+    def put(self, key, result, output='', seconds=0.0):
+        """Store a result, then evict down to the size limits"""
+        try:
+            data = pickle.dumps({'result': result, 'output': output, 'seconds': seconds},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        self.stats['writes'] += 1
+        self.evict()
+        return True
+
+    def call(self, func, *args, depends_on=None, **kwargs):
+        """``func(*args, **kwargs)``, answered from the cache when possible"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        key = self.key(func, args, kwargs, depends_on)
+        entry = self.get(key)
+        if entry is not None:
+            print(entry['output'], end='')
+            return self.tag(entry['result'], key)
+
+        tee = _Tee(sys.stdout)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(tee):
+            result = func(*args, **kwargs)
+        self.put(key, result, tee.copy.getvalue(), time.perf_counter() - start)
+        # Calls taking this result are keyed on how it was made, not on its contents
+        return self.tag(result, key)
+
+    def entries(self):
+        """(path, size, last used) of every stored entry"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                with contextlib.suppress(OSError):
+                    stat = os.stat(path)
+                    entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until both limits hold"""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            path, size, _ = entries.pop(0)
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                self.stats['evictions'] += 1
+            total -= size
+
+    def clear(self):
+        """Remove every stored entry"""
+        for path, _, _ in self.entries():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    def report(self):
+        """Print hits, misses and what the cache holds"""
+        if not self.enabled:
+            return
+        lookups = self.stats['hits'] + self.stats['misses']
+        entries = self.entries()
+        print("\n=== RESULT CACHE ===")
+        print(f"Hits: {self.stats['hits']} of {lookups} lookups "
+              f"({self.stats['hits'] / lookups if lookups else 0:.0%}), "
+              f"{self.stats['saved_s']:.3f}s of recorded compute reused")
+        print(f"Writes: {self.stats['writes']}, evictions: {self.stats['evictions']}")
+        print(f"Entries: {len(entries)} ({sum(size for _, size, _ in entries) / 1024 / 1024:.1f} MB "
+              f"of {self.max_bytes / 1024 / 1024:.0f} MB) in {self.directory}")
+
+
+def add_arguments(parser):
+    """Add the result cache options shared by the analysis scripts"""
+    parser.add_argument('--result-cache', action='store_true',
+                        help="reuse results of earlier runs on the same data and parameters")
+    parser.add_argument('--result-cache-dir', default=RESULT_CACHE_DIR, metavar='PATH',
+                        help="where cached results are stored")
+    parser.add_argument('--result-cache-mb', type=int, default=DEFAULT_MAX_MB, metavar='MB',
+                        help="evict least recently used results beyond this size")
+    parser.add_argument('--clear-result-cache', action='store_true',
+                        help="drop every cached result before running")
+    return parser
+
+
+def main():
+    """Show or clear the result cache"""
+    parser = argparse.ArgumentParser(description="Inspect the analysis result cache")
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.result_cache = True
+
+    cache = ResultCache.from_args(args)
+    entries = sorted(cache.entries(), key=lambda entry: entry[2], reverse=True)
+    cache.report()
+    for path, size, used in entries[:20]:
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(used))}  {size / 1024:10.1f} KB  "
+              f"{os.path.basename(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import gzip
+import json
+import math
+import os
+import time
+
+try:
+    import msgpack
+except ImportError:
+    # MessagePack output is optional; JSON and gzip need nothing extra
+    msgpack = None
+
+# Creative fields kept in compact output, with the type each is written as
+TOP_AD_SCHEMA = [
+    ('Creative Id', 'int'),
+    ('Brand Root', 'str'),
+    ('Advertiser', 'str'),
+    ('Channel', 'str'),
+    ('Creative Type_x', 'str'),
+    ('Format', 'str'),
+    ('Placement', 'str'),
+    ('First Seen', 'str'),
+    ('Last Seen', 'str'),
+    ('Duration', 'float'),
+    ('Impressions', 'int'),
+    ('Spend (USD)', 'float'),
+    ('CPM', 'float'),
+    ('Performance_Score', 'float'),
+    ('Main_Category', 'str'),
+    ('Sub_Category', 'str'),
+    ('Product_Focus', 'str'),
+    ('focus_vs_other', 'str'),
+    ('value_proposition', 'str'),
+    ('primary_cta', 'str'),
+    ('Text_x', 'str'),
+    ('Landing Page', 'str'),
+    ('Link To Creative', 'str')
+]
+
+# Output layouts: the original records dump, or compact deduplicated creatives
+LAYOUTS = ['legacy', 'rows', 'columns']
+
+# Serialization formats and the file extension each one gets
+FORMATS = {'json': '.json', 'gzip': '.json.gz', 'msgpack': '.msgpack'}
+
+COMPACT_VERSION = 1
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def typed_value(value, kind):
+    """Coerce one value to its schema type; missing values become None"""
+    if _is_missing(value):
+        return None
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    return str(value)
+
+
+def project_rows(df, schema=TOP_AD_SCHEMA):
+    """Keep only the schema fields present in ``df``, typed, as lists of values"""
+    fields = [(name, kind) for name, kind in schema if name in df.columns]
+    columns = [df[name].tolist() for name, _ in fields]
+    rows = [
+        [typed_value(value, kind) for value, (_, kind) in zip(values, fields)]
+        for values in zip(*columns)
+    ]
+    return fields, rows
+
+
+def dedupe_top_ads(top_ads_data, schema=TOP_AD_SCHEMA):
+    """Collect the creatives of all top-N lists once; lists become positions.
+
+    Rows are matched on their frame index, so an ad that is both a top
+    impression and a top efficiency ad is written a single time.
+    """
+    fields = None
+    creatives = []
+    positions = {}
+    top_ads = {}
+
+    for category, ads_df in top_ads_data.items():
+        new = ads_df[[label not in positions for label in ads_df.index]]
+        fields, rows = project_rows(new, schema)
+        for label, row in zip(new.index, rows):
+            positions[label] = len(creatives)
+            creatives.append(row)
+        top_ads[category] = [positions[label] for label in ads_df.index]
+
+    if fields is None:
+        fields = [(name, kind) for name, kind in schema]
+    return fields, creatives, top_ads
+
+
+def compact_results(results, top_ads_data, layout='rows', schema=TOP_AD_SCHEMA):
+    """Rebuild ``results`` with deduplicated, schema-projected top ads"""
+    fields, creatives, top_ads = dedupe_top_ads(top_ads_data, schema)
+
+    if layout == 'columns':
+        # Struct of arrays: one list per field
+        creative_block = {
+            name: [row[index] for row in creatives]
+            for index, (name, _) in enumerate(fields)
+        }
+    else:
+        creative_block = creatives
+
+    compact = {
+        'schema': {
+            'version': COMPACT_VERSION,
+            'layout': layout,
+            'creative_fields': [{'name': name, 'type': kind} for name, kind in fields]
+        },
+        'summary': results['summary'],
+        'creatives': creative_block,
+        'top_ads': top_ads
+    }
+    compact.update({key: value for key, value in results.items() if key not in compact})
+    return compact
+
+
+def output_path(path, fmt):
+    """Swap the extension of ``path`` for the one ``fmt`` writes"""
+    for extension in sorted(FORMATS.values(), key=len, reverse=True):
+        if path.endswith(extension):
+            path = path[:-len(extension)]
+            break
+    return path + FORMATS[fmt]
+
+
+def serialize(payload, fmt='json', indent=None):
+    """Encode ``payload`` as bytes in the given format"""
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ImportError("MessagePack output needs the msgpack package")
+        return msgpack.packb(payload, use_bin_type=True)
+
+    separators = None if indent is not None else (',', ':')
+    data = json.dumps(payload, indent=indent, ensure_ascii=False, separators=separators).encode('utf-8')
+    if fmt == 'gzip':
+        # Fixed mtime keeps the archive identical across runs with the same results
+        return gzip.compress(data, mtime=0)
+    return data
+
+
+def write_results(payload, path, fmt='json', indent=None):
+    """Write ``payload`` to ``path``; returns (bytes written, seconds taken)"""
+    start = time.perf_counter()
+    data = serialize(payload, fmt, indent)
+    with open(path, 'wb') as f:
+        f.write(data)
+    elapsed = time.perf_counter() - start
+    return os.path.getsize(path), elapsed
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+import re
+
+import numpy as np
+import pandas as pd
+
+# Boolean theme flag columns in the v2 exports, in dashboard order
+MARKETING_THEME_COLUMNS = [
+    'SUPPORT FOR WORKING MOMS',
+    'EMOTIONAL SUPPORT & WELLNESS',
+    'AUTHENTIC COMMUNITY & PEER VALIDATION',
+    'MEDICAL ENDORSEMENT & CLINICAL TRUST',
+    'EVERYDAY PRACTICALITY',
+    'PORTABILITY & DISCREET DESIGN',
+    'PRICE VS VALUE'
+]
+
+# Brand unification mapping, kept in sync with BRAND_MAPPING in js/bubble-chart-app.js
+BRAND_MAPPING = {
+    # Pathmatics Brand Manufacturer variations
+    'Eufy': 'Eufy',
+    'Momcozy': 'Momcozy',
+    'Elvie (Chiaro Technology Ltd)': 'Elvie',
+    'Avent': 'Avent',
+    'Lansinoh Laboratories, Inc.': 'Lansinoh',
+    'WillowPump (Exploramed NC7, Inc.)': 'Willow',
+    'Evenflo': 'Evenflo',
+    'Motif Medical': 'Motif Medical',
+    "Dr. Brown's (Handi-Craft Company)": "Dr. Brown's",
+    'TOMMEE TIPPEE (Mayborn USA Inc.)': 'Tommee Tippee',
+    'Medela Inc.': 'Medela',
+    'Baby Buddha Products': 'Baby Buddha',
+    'Freemie': 'Freemie',
+    'Pumpables': 'Pumpables',
+    'Spectra Baby': 'Spectra',
+
+    # Pathmatics DME variations
+    'Babylist, Inc': 'Babylist',
+    'Aeroflow, Inc.': 'Aeroflow',
+    'RGH ENTERPRISES, INC. (Edgepark Medical Supplies)': 'Edgepark',
+    'Byram Healthcare Centers, Inc.': 'Byram Healthcare',
+
+    # Social Media variations
+    'Babylist Baby Registry': 'Babylist',
+    'BabyBuddha® Breast Pump & Accessories': 'Baby Buddha',
+    'Hygeia Health': 'Hygeia',
+    'willowpump': 'Willow',
+    'Elvie': 'Elvie',
+    "Dr. Brown's": "Dr. Brown's",
+    'Medela': 'Medela',
+    'Pippeta | Feeding Real Easy': 'Pippeta',
+    "Hegen | Cherish Nature's Gift": 'Hegen',
+    'Aeroflow Breastpumps': 'Aeroflow',
+    'Ameda': 'Ameda',
+    'Ardo USA': 'Ardo',
+    'Byram Healthcare': 'Byram Healthcare',
+    'Haakaa USA': 'Haakaa',
+    'LansinohUSA': 'Lansinoh',
+    'Momcozy Official': 'Momcozy',
+    'Willow Pump': 'Willow',
+    "Elvie | Women's Health": 'Elvie',
+    'Evenflo Feeding': 'Evenflo',
+    'Freemiebreastpumps': 'Freemie',
+    'eufy Baby': 'Eufy',
+    'Zomee': 'Zomee',
+    'BabyBuddha': 'Baby Buddha',
+    'Babylist': 'Babylist',
+    'Hegen': 'Hegen',
+    'Pippeta': 'Pippeta',
+    'Mamava': 'Mamava',
+    'Loulou Lollipop': 'Loulou Lollipop',
+    'Boppy': 'Boppy',
+    'Frida': 'Frida',
+    'Nanit': 'Nanit',
+    'Newton Baby': 'Newton Baby',
+    'Wildbird': 'Wildbird',
+    'Woolino': 'Woolino',
+    'Baby Cottons': 'Baby Cottons',
+    'Inglesina': 'Inglesina',
+    'Bugaboo': 'Bugaboo',
+    'Anna Bella': 'Anna Bella',
+    'Nurture&': 'Nurture&',
+    'The Feeding Company': 'The Feeding Company',
+    'Loulou and Company': 'Loulou and Company',
+    'The Honest Company': 'The Honest Company',
+    'Owlet': 'Owlet',
+    'Safety 1st': 'Safety 1st',
+    'Stokke': 'Stokke',
+    'Tiny Love': 'Tiny Love',
+    'UBBI': 'UBBI',
+    'Zoestrollers': 'Zoe Strollers',
+    'Bobbie': 'Bobbie',
+    "The Baby's Brew": "The Baby's Brew",
+    'State Bags': 'State Bags'
+}
+
+# Impression columns in fallback order, as picked by the dashboards
+IMPRESSION_FALLBACK = ['Impressions', 'estimated_impressions', 'views', 'engagement_total']
+
+# Feed channel assigned to social sources
+SOCIAL_CHANNELS = {'instagram': 'IG Feed', 'tiktok': 'TT Feed'}
+
+# Canonical typed schema shared by the analysis scripts and dashboards, in column order
+CANONICAL_SCHEMA = {
+    'source': 'category',
+    'brand': 'category',
+    'channel': 'category',
+    'product_focus': 'category',
+    'impressions': 'float64',
+    'impressions_source': 'category',
+    'engagement': 'float64',
+    'spend': 'float64',
+    'themes': 'str'
+}
+
+# Separator between theme names in the canonical themes column
+THEME_SEPARATOR = ';'
+
+# Leading number as accepted by JavaScript's parseFloat
+_LEADING_FLOAT = re.compile(r'^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+
+
+def parse_float(series):
+    """Vectorized ``parseFloat(x) || 0`` over a column of raw CSV strings"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(0.0)
+    leading = series.astype(str).str.extract(_LEADING_FLOAT, expand=False)
+    return pd.to_numeric(leading, errors='coerce').fillna(0.0)
+
+
+def normalize_brand_names(series):
+    """Canonical brand names, resolved once per unique name by the brand resolver"""
+    from brand_resolver import brand_resolver
+    return brand_resolver().resolve_series(series).astype(str)
+
+
+def _column(df, name):
+    """A raw string column, or empty strings when the source lacks it"""
+    if name in df.columns:
+        return df[name].fillna('').astype(str)
+    return pd.Series('', index=df.index, dtype=str)
+
+
+def _first_non_empty(*columns):
+    """Elementwise ``a || b || ...`` over string columns"""
+    result = columns[0]
+    for column in columns[1:]:
+        result = result.where(result != '', column)
+    return result
+
+
+def detect_row_themes(df):
+    """Theme tuple per row: true flag columns, else MARKETING_THEMES, else ('NONE',)"""
+    flags = pd.DataFrame(
+        {theme: _column(df, theme) == 'true' for theme in MARKETING_THEME_COLUMNS},
+        index=df.index
+    )
+    names = np.array(MARKETING_THEME_COLUMNS, dtype=object)
+    flagged = [tuple(names[row]) for row in flags.to_numpy()]
+
+    listed = _column(df, 'MARKETING_THEMES').map(
+        lambda value: tuple(part.strip() for part in value.split(';') if part.strip())
+    )
+
+    themes = pd.Series(flagged, index=df.index, dtype=object)
+    themes = themes.where(themes.map(len) > 0, listed)
+    return themes.where(themes.map(len) > 0, pd.Series([('NONE',)] * len(df), index=df.index))
+
+
+def pick_impressions(df):
+    """Return (impressions, provenance) following the dashboard fallback chain"""
+    impressions = pd.Series(0.0, index=df.index)
+    provenance = pd.Series('none', index=df.index, dtype=object)
+    for column in reversed(IMPRESSION_FALLBACK):
+        values = df[column]
+        has_value = values > 0
+        impressions = impressions.where(~has_value, values)
+        provenance = provenance.where(~has_value, column)
+    return impressions, provenance
+
+
+def normalize_source(raw, source_type):
+    """Normalize one raw export the same way the dashboard's dataNormalizer does"""
+    df = pd.DataFrame(index=raw.index)
+    df['sourceType'] = source_type
+    df['themes'] = detect_row_themes(raw)
+    df['Product_Focus'] = _first_non_empty(
+        _column(raw, 'focus_vs_other'), _column(raw, 'Product_Focus'),
+        pd.Series('other', index=raw.index)
+    )
+
+    if source_type in SOCIAL_CHANNELS:
+        df['Channel'] = SOCIAL_CHANNELS[source_type]
+    else:
+        df['Channel'] = _first_non_empty(_column(raw, 'Channel'), pd.Series('Unspecified', index=raw.index))
+
+    brand_root = normalize_brand_names(_first_non_empty(_column(raw, 'Brand Root'), _column(raw, 'Advertiser')))
+    company = normalize_brand_names(_column(raw, 'company'))
+    df['Brand Root'] = brand_root.where(brand_root != 'Unknown Brand', company)
+
+    for column in IMPRESSION_FALLBACK + ['Spend (USD)']:
+        df[column] = parse_float(_column(raw, column)) if column in raw.columns else 0.0
+
+    df['impressions'], df['impressions_source'] = pick_impressions(df)
+    return df
+
+
+def to_canonical(normalized):
+    """Rename and type ``normalize_source`` output to CANONICAL_SCHEMA.
+
+    ``impressions_source`` records which fallback column the impressions came
+    from ('none' for zero rows); themes are joined with THEME_SEPARATOR.
+    """
+    canonical = pd.DataFrame({
+        'source': normalized['sourceType'],
+        'brand': normalized['Brand Root'],
+        'channel': normalized['Channel'],
+        'product_focus': normalized['Product_Focus'],
+        'impressions': normalized['impressions'],
+        'impressions_source': normalized['impressions_source'],
+        'engagement': normalized['engagement_total'],
+        'spend': normalized['Spend (USD)'],
+        'themes': normalized['themes'].map(THEME_SEPARATOR.join)
+    }, index=normalized.index)
+    return canonical.astype(CANONICAL_SCHEMA)
+
+
+def theme_lists(canonical):
+    """Theme names per row of a canonical frame"""
+    return canonical['themes'].str.split(THEME_SEPARATOR)
+
+
+def load_canonical(path):
+    """Read a canonical dataset written by normalize_sources.py or columnar_export.py"""
+    if path.endswith('.json'):
+        from columnar_export import read_columnar
+        canonical = read_columnar(path)
+    elif path.endswith('.parquet'):
+        canonical = pd.read_parquet(path)
+    else:
+        canonical = pd.read_pickle(path)
+    return canonical.astype(CANONICAL_SCHEMA)
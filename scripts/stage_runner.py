@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from instrumentation import Instrumentation, count_rows, peak_rss_mb, reset_peak_rss
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    # Without pyarrow the frame is still written once and read by each worker
+    pa = None
+
+# Shared frames go to RAM-backed storage when the platform has it
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+class SharedFrame:
+    """A DataFrame written once to an Arrow IPC file and memory-mapped by workers.
+
+    Only the file path is pickled when the handle is sent to another process.
+    Workers map the file and slice the table before converting it, so a shard
+    only materializes its own row range.
+    """
+
+    def __init__(self, df, directory=SHARED_DIR):
+        fd, self.path = tempfile.mkstemp(suffix='.arrow', prefix='ads-', dir=directory)
+        os.close(fd)
+        self.rows = len(df)
+        self.format = 'arrow' if pa is not None else 'pickle'
+
+        if self.format == 'arrow':
+            try:
+                # Store the index as a column so row slices keep their labels
+                table = pa.Table.from_pandas(df, preserve_index=True)
+                with pa.OSFile(self.path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                return
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Mixed-type object columns can't be stored as Arrow; fall back to pickle
+                self.format = 'pickle'
+
+        with open(self.path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, start=None, stop=None, columns=None):
+        """Return the frame, or only rows ``start:stop`` and ``columns`` of it"""
+        start = 0 if start is None else start
+        stop = self.rows if stop is None else stop
+
+        if self.format == 'pickle':
+            with open(self.path, 'rb') as f:
+                df = pickle.load(f).iloc[start:stop]
+            return df if columns is None else df[[column for column in columns if column in df.columns]]
+
+        with pa.memory_map(self.path, 'r') as source:
+            table = ipc.open_file(source).read_all().slice(start, stop - start)
+            if columns is not None:
+                index_columns = table.schema.pandas_metadata['index_columns']
+                table = table.select([column for column in columns if column in table.column_names] + index_columns)
+            return table.to_pandas()
+
+    def close(self):
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+
+class Stage:
+    """One node of the analysis DAG.
+
+    ``func`` is called with the results of ``inputs`` (names of other stages
+    or of initial values) as positional arguments. With ``shards`` set, the
+    first input is split into row ranges that run as separate tasks and the
+    partial results are joined with ``combine``. ``columns`` limits the
+    columns a worker reads from the first input.
+    """
+
+    def __init__(self, name, func, inputs=(), shards=False, combine=pd.concat, columns=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.shards = shards
+        self.combine = combine
+        self.columns = columns
+
+
+def _resolve(value, start=None, stop=None, columns=None):
+    if isinstance(value, SharedFrame):
+        return value.load(start, stop, columns)
+    if isinstance(value, pd.DataFrame) and columns is not None:
+        value = value[[column for column in columns if column in value.columns]]
+    if start is not None:
+        return value.iloc[start:stop]
+    return value
+
+
+def _run_task(func, args, shard=None, columns=None):
+    """Run a stage (or one shard of it), capturing its output and measuring it"""
+    per_stage_peak = reset_peak_rss()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    start, stop = shard if shard is not None else (None, None)
+    args = [_resolve(args[0], start, stop, columns)] + [_resolve(arg) for arg in args[1:]] if args else []
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = func(*args)
+
+    measures = {
+        'wall': time.perf_counter() - wall_start,
+        'cpu': time.process_time() - cpu_start,
+        'rows_in': count_rows(args[0]) if args else None,
+        'rows_out': count_rows(result),
+        'peak_mb': peak_rss_mb(),
+        'per_stage_peak': per_stage_peak
+    }
+    return result, output.getvalue(), measures
+
+
+def _row_ranges(rows, parts):
+    """Split ``rows`` into at most ``parts`` contiguous (start, stop) ranges"""
+    parts = max(1, min(parts, rows))
+    bounds = [rows * part // parts for part in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _frame_rows(value):
+    return value.rows if isinstance(value, SharedFrame) else len(value)
+
+
+class StageRunner:
+    """Run a DAG of stages, independent ones concurrently in a process pool.
+
+    With one worker everything runs in this process, in declaration order,
+    printing as it goes. With more, each stage's output is captured and
+    printed in declaration order once the stage and all stages before it are
+    done, so the log reads the same either way. Stage measurements are also
+    passed on to ``instrumentation`` when one is given. With an enabled
+    ``cache`` (a ResultCache), stages whose inputs were seen before are
+    answered from it instead of running.
+    """
+
+    def __init__(self, stages, workers=1, instrumentation=None, cache=None):
+        self.stages = list(stages)
+        self.workers = max(1, workers)
+        self.instrumentation = instrumentation or Instrumentation('stage_runner')
+        self.cache = cache if cache is not None and cache.enabled else None
+        self.timings = []
+        self.total = 0.0
+
+    def _record(self, name, wall, cpu, tasks=1, cached=False):
+        self.timings.append({'stage': name, 'wall': wall, 'cpu': cpu, 'tasks': tasks, 'cached': cached})
+
+    def _record_tasks(self, name, measures, result):
+        """Record a stage measured in the pool from the measures of its tasks"""
+        wall = max(measure['wall'] for measure in measures)
+        cpu = sum(measure['cpu'] for measure in measures)
+        self._record(name, wall, cpu, len(measures))
+
+        # Shards each read part of the input; the output is counted after combining
+        rows_in = [measure['rows_in'] for measure in measures]
+        self.instrumentation.record(name, wall, cpu, None if None in rows_in else sum(rows_in), count_rows(result),
+                                    max(measure['peak_mb'] for measure in measures),
+                                    all(measure['per_stage_peak'] for measure in measures))
+
+    def run(self, values):
+        """Run every stage on top of the initial ``values``; returns all results by name"""
+        values = dict(values)
+        start = time.perf_counter()
+        if self.workers == 1:
+            for stage in self.stages:
+                args = [values[name] for name in stage.inputs]
+                with self.instrumentation.stage(stage.name, count_rows(args[0]) if args else None) as record:
+                    wall_start, cpu_start = time.perf_counter(), time.process_time()
+                    if self.cache is not None:
+                        hits = self.cache.stats['hits']
+                        values[stage.name] = self.cache.call(stage.func, *args)
+                        cached = self.cache.stats['hits'] > hits
+                    else:
+                        values[stage.name] = stage.func(*args)
+                        cached = False
+                    self._record(stage.name, time.perf_counter() - wall_start, time.process_time() - cpu_start,
+                                 cached=cached)
+                    record.rows_out = count_rows(values[stage.name])
+        else:
+            values = self._run_parallel(values)
+        self.total = time.perf_counter() - start
+        return values
+
+    def _run_parallel(self, values):
+        # Share large frames through memory-mapped files instead of pickling them
+        shared = {
+            name: SharedFrame(value) for name, value in values.items()
+            if isinstance(value, pd.DataFrame)
+        }
+        pending = list(self.stages)
+        running = {}
+        partials = {}
+        outputs = {}
+        keys = {}
+        printed = 0
+
+        def argument(name):
+            return shared.get(name, values.get(name))
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                while pending or running:
+                    for stage in [stage for stage in pending if all(name in values for name in stage.inputs)]:
+                        pending.remove(stage)
+                        if self.cache is not None:
+                            # Keys come from the values themselves, not their shared-file handles
+                            keys[stage.name] = self.cache.key(stage.func, [values[name] for name in stage.inputs])
+                            entry = self.cache.get(keys[stage.name])
+                            if entry is not None:
+                                values[stage.name] = self.cache.tag(entry['result'], keys[stage.name])
+                                outputs[stage.name] = entry['output']
+                                self._record(stage.name, 0.0, 0.0, cached=True)
+                                if isinstance(values[stage.name], pd.DataFrame):
+                                    shared[stage.name] = SharedFrame(values[stage.name])
+                                continue
+
+                        args = [argument(name) for name in stage.inputs]
+                        if stage.shards:
+                            ranges = _row_ranges(_frame_rows(args[0]), self.workers)
+                            partials[stage.name] = [None] * len(ranges)
+                            for index, shard in enumerate(ranges):
+                                future = pool.submit(_run_task, stage.func, args, shard, stage.columns)
+                                running[future] = (stage, index)
+                        else:
+                            running[pool.submit(_run_task, stage.func, args, None, stage.columns)] = (stage, None)
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED) if running else (set(), set())
+                    for future in done:
+                        stage, index = running.pop(future)
+                        result, output, measures = future.result()
+                        if index is None:
+                            values[stage.name] = result
+                            outputs[stage.name] = output
+                            self._record_tasks(stage.name, [measures], result)
+                        else:
+                            partials[stage.name][index] = (result, output, measures)
+                            if any(part is None for part in partials[stage.name]):
+                                continue
+                            parts = partials.pop(stage.name)
+                            values[stage.name] = stage.combine([part[0] for part in parts])
+                            outputs[stage.name] = ''.join(part[1] for part in parts)
+                            self._record_tasks(stage.name, [part[2] for part in parts], values[stage.name])
+
+                        if stage.name in keys:
+                            self.cache.put(keys[stage.name], values[stage.name], outputs[stage.name],
+                                           self.timings[-1]['wall'])
+                            self.cache.tag(values[stage.name], keys[stage.name])
+                        if isinstance(values[stage.name], pd.DataFrame):
+                            shared[stage.name] = SharedFrame(values[stage.name])
+
+                    # Replay captured output in declaration order
+                    while printed < len(self.stages) and self.stages[printed].name in outputs:
+                        print(outputs.pop(self.stages[printed].name), end='')
+                        printed += 1
+        finally:
+            for frame in shared.values():
+                frame.close()
+
+        return values
+
+    def report(self):
+        """Print per-stage wall and CPU times and the total"""
+        order = [stage.name for stage in self.stages]
+        width = max(len(name) for name in order + ['total'])
+
+        print("\n=== STAGE TIMINGS ===")
+        print(f"Workers: {self.workers}")
+        for timing in sorted(self.timings, key=lambda timing: order.index(timing['stage'])):
+            shards = f" ({timing['tasks']} shards)" if timing['tasks'] > 1 else ''
+            cached = " (cached)" if timing['cached'] else ''
+            print(f"{timing['stage']:<{width}}  wall {timing['wall']:8.3f}s  cpu {timing['cpu']:8.3f}s{shards}{cached}")
+        print(f"{'total':<{width}}  wall {self.total:8.3f}s")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import math
+
+import pandas as pd
+
+from metrics import IMPRESSIONS_COLUMN, SPEND_COLUMN, SPEND_WEIGHTED, cpm_weights
+
+# How each requested aggregation is stored as mergeable partials
+PARTIALS = {
+    'sum': ['sum'],
+    'count': ['count'],
+    'max': ['max'],
+    'mean': ['sum', 'count'],
+    # sum(value * weight) and sum(weight), weighting rows by spend as metrics.cpm_weights does
+    SPEND_WEIGHTED: ['weighted_sum', 'weight']
+}
+
+# How partials of the same kind combine across chunks
+MERGE = {'sum': 'sum', 'count': 'sum', 'max': 'max', 'weighted_sum': 'sum', 'weight': 'sum'}
+
+# Partials kept as exact (hi, lo) float sums
+EXACT_PARTS = {'sum', 'weighted_sum', 'weight'}
+
+
+def exact_sum(values):
+    """Correctly rounded sum of floats plus the rounding remainder, as (hi, lo)"""
+    values = list(values)
+    hi = math.fsum(values)
+    lo = math.fsum(values + [-hi])
+    return hi, lo
+
+
+class StreamingAggregate:
+    """Per-group aggregates built chunk by chunk from mergeable partials.
+
+    Supports the sum, count, max, mean and spend-weighted mean aggregations;
+    means are kept as sum/count (weighted ones as sum(value * weight) and
+    sum(weight)) so partial results from any number of chunks can be merged.
+    Float sums are exact (correctly rounded) whatever the chunk boundaries.
+    ``result()`` matches ``df.groupby(by).agg(spec)`` on the full data.
+    """
+
+    def __init__(self, by, spec):
+        self.by = by
+        self.spec = {column: funcs if isinstance(funcs, list) else [funcs] for column, funcs in spec.items()}
+        self.multi = any(isinstance(funcs, list) for funcs in spec.values())
+        self.partials = None
+        self.rows = 0
+
+    def _partial_columns(self):
+        columns = []
+        for column, funcs in self.spec.items():
+            for func in funcs:
+                columns.extend((column, part) for part in PARTIALS[func])
+        return list(dict.fromkeys(columns))
+
+    def update(self, chunk):
+        """Fold one chunk into the running partials"""
+        self.rows += len(chunk)
+        if len(chunk) == 0:
+            return self
+
+        keys = chunk[self.by]
+        partial = {}
+        for column, part in self._partial_columns():
+            values = chunk[column]
+            if part in ('weighted_sum', 'weight'):
+                weights = pd.Series(cpm_weights(chunk[SPEND_COLUMN], chunk[IMPRESSIONS_COLUMN]), index=chunk.index)
+                values = values.astype(float) * weights if part == 'weighted_sum' else weights
+            grouped = values.groupby(keys, sort=False)
+
+            if part in EXACT_PARTS and pd.api.types.is_float_dtype(values):
+                # Float sums carry a (hi, lo) pair so the chunking order never shows
+                pairs = grouped.agg(lambda group: exact_sum(group.dropna().to_numpy()))
+                partial[(column, part)] = pairs.map(lambda pair: pair[0])
+                partial[(column, f'{part}_lo')] = pairs.map(lambda pair: pair[1])
+            else:
+                partial[(column, part)] = grouped.sum() if part in EXACT_PARTS else getattr(grouped, part)()
+        return self.merge_partials(pd.DataFrame(partial))
+
+    def merge_partials(self, partial):
+        """Combine a partials frame (e.g. from another process) into this one"""
+        if self.partials is None:
+            self.partials = partial
+            return self
+
+        combined = pd.concat([self.partials, partial])
+        grouped = combined.groupby(level=0, sort=False)
+        merged = grouped.agg({
+            key: MERGE[key[1]] for key in combined.columns if key[1] in MERGE
+        })
+        for key in combined.columns:
+            if not key[1].endswith('_lo'):
+                continue
+            total = (key[0], key[1][:-len('_lo')])
+            pairs = grouped[[total, key]].apply(
+                lambda rows: exact_sum(rows.fillna(0).to_numpy().ravel())
+            )
+            merged[total] = pairs.map(lambda pair: pair[0])
+            merged[key] = pairs.map(lambda pair: pair[1])
+
+        self.partials = merged
+        return self
+
+    def merge(self, other):
+        """Merge another StreamingAggregate over the same spec"""
+        self.rows += other.rows
+        if other.partials is not None:
+            self.merge_partials(other.partials)
+        return self
+
+    def result(self):
+        """Finalize the partials into the same frame an in-memory groupby produces"""
+        partials = self.partials
+        if partials is None:
+            partials = pd.DataFrame(columns=pd.MultiIndex.from_tuples(self._partial_columns()))
+
+        output = {}
+        for column, funcs in self.spec.items():
+            for func in funcs:
+                if func == 'mean':
+                    values = partials[(column, 'sum')] / partials[(column, 'count')]
+                elif func == SPEND_WEIGHTED:
+                    weight = partials[(column, 'weight')]
+                    values = (partials[(column, 'weighted_sum')] / weight).where(weight > 0, 0.0)
+                else:
+                    values = partials[(column, func)]
+                output[(column, func) if self.multi else column] = values
+
+        result = pd.DataFrame(output).sort_index()
+        result.index.name = self.by
+        return result
+
+
+class TopN:
+    """Bounded top-N buffer reproducing ``df.nlargest(n, column)`` over a stream.
+
+    Only the current best ``n`` rows are kept. Earlier rows stay ahead of later
+    ones on ties, so the result matches nlargest's keep='first' ordering.
+    """
+
+    def __init__(self, n, column, where=None):
+        self.n = n
+        self.column = column
+        self.where = where
+        self.best = None
+
+    def update(self, chunk):
+        """Fold one chunk into the running top rows"""
+        if self.where is not None:
+            chunk = chunk[self.where(chunk)]
+
+        candidates = chunk.nlargest(self.n, self.column)
+        if self.best is not None:
+            candidates = pd.concat([self.best, candidates])
+        self.best = candidates.nlargest(self.n, self.column)
+        return self
+
+    def result(self):
+        return self.best
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import BREASTFEEDING_BRANDS, DATA_DIR
+
+# Column order of Pathmatics_DME_classified_v2.csv, plus the v1 classification
+# columns (Main_Category, Sub_Category, Product_Focus) the analysis scripts read
+SCHEMA_COLUMNS = [
+    'Advertiser', 'Brand Root', 'Brand (Major)', 'Brand (Minor)', 'Brand (Leaf)',
+    'Category Level 1', 'Category Level 2', 'Category Level 3', 'Category Level 4',
+    'Category Level 5', 'Category Level 6', 'Category Level 7', 'Category Level 8',
+    'Channel', 'Creative Id', 'Width', 'Height', 'Creative Type_x', 'First Seen', 'Last Seen',
+    'Duration', 'Text_x', 'Landing Page', 'Link To Creative', 'Link to Post', 'Format',
+    'Placement', 'Ad Buy Type', 'Publisher', 'Spend (USD)', 'Impressions', 'Type', 'URL_to_use',
+    'Creative Type_y', 'Text_y', 'Download Status', 'Audio Status', 'File Path', 'Audio Path',
+    'Text File', 'transcription', 'objects_detected', 'people_detected', 'text_detected',
+    'overall_description', 'processing_status', 'ad_category', 'primary_cta',
+    'value_proposition', 'target_audience', 'focus_vs_other',
+    'SUPPORT FOR WORKING MOMS', 'EMOTIONAL SUPPORT & WELLNESS',
+    'AUTHENTIC COMMUNITY & PEER VALIDATION', 'MEDICAL ENDORSEMENT & CLINICAL TRUST',
+    'EVERYDAY PRACTICALITY', 'PORTABILITY & DISCREET DESIGN', 'PRICE VS VALUE',
+    'TOTAL_CATEGORIES', 'HAS_MARKETING_THEME', 'MARKETING_THEMES',
+    'Main_Category', 'Sub_Category', 'Product_Focus'
+]
+
+# Brand mix: the tracked breastfeeding brands plus the DME retailers around them
+BRAND_WEIGHTS = {
+    **{brand: weight for brand, weight in zip(BREASTFEEDING_BRANDS,
+                                              [10, 6, 14, 5, 3, 2, 3, 3, 2, 2, 2, 1])},
+    'Babylist, Inc': 25,
+    'Aeroflow, Inc.': 8,
+    'RGH ENTERPRISES, INC. (Edgepark Medical Supplies)': 5,
+    'Byram Healthcare Centers, Inc.': 1,
+    'Lansinoh Laboratories, Inc.': 4,
+    'WillowPump (Exploramed NC7, Inc.)': 3,
+    'Eufy': 2
+}
+
+# Channel, publisher and placement share the distributions of the DME export
+CHANNEL_WEIGHTS = {
+    'Facebook': 0.61, 'Instagram': 0.281, 'TikTok': 0.069,
+    'Desktop Display': 0.022, 'YouTube': 0.017, 'OTT': 0.001
+}
+CREATIVE_TYPE_WEIGHTS = {'Other': 0.298, 'Image': 0.288, 'Video': 0.288, 'Text': 0.071, 'Carousel': 0.055}
+PLACEMENT_WEIGHTS = {
+    'Feed': 0.478, 'Reels': 0.206, 'Stories': 0.151, 'Other': 0.125,
+    'Marketplace': 0.021, 'In-Stream': 0.019
+}
+PRODUCT_FOCUS_WEIGHTS = {
+    'Other: Unclear': 0.474, 'Breastfeeding Pump': 0.2, 'Other: Smart Accessory/App': 0.141,
+    'Other: Baby Bottles/Feeding': 0.116, 'Other: Baby Monitor': 0.066,
+    'Other: Sterilizer/Cleaning': 0.003
+}
+MAIN_CATEGORY_WEIGHTS = {
+    'Emotional Connection': 0.3, 'Price vs. Value': 0.2, 'Convenience Features': 0.12,
+    'Comfort & Pain-Free Use': 0.08, 'Portability & Discreet Design': 0.08, 'Efficiency': 0.06,
+    'Real Mom Testimonials': 0.05, 'Hospital Grade or Doctor Recommended': 0.05,
+    'Bottle Feeding & Transition Support': 0.04, 'Support for Working Moms': 0.02
+}
+SUB_CATEGORIES = [
+    '', 'format: static image', 'format: video', 'deal/value framing, format: static image',
+    'app connectivity / smart algorithms / tracking, format: static image', 'deal/value framing'
+]
+SIZES = [(360, 558), (375, 586), (430, 639), (1080, 1920), (300, 250), (728, 90), (0, 0)]
+
+# Marketing theme flags, how often each is set, and phrases that carry it.
+# The phrases also contain THEME_RULES keywords so theme detection finds work.
+MARKETING_THEMES = {
+    'SUPPORT FOR WORKING MOMS': (0.02, [
+        'pump at the office and return to work with confidence',
+        'made for busy moms on the go between meetings'
+    ]),
+    'EMOTIONAL SUPPORT & WELLNESS': (0.18, [
+        'we support you through every moment of your breastfeeding journey',
+        'care for yourself, mama, you deserve love and support'
+    ]),
+    'AUTHENTIC COMMUNITY & PEER VALIDATION': (0.12, [
+        'real moms share tips from their postpartum journey',
+        'join a community of moms who love it'
+    ]),
+    'MEDICAL ENDORSEMENT & CLINICAL TRUST': (0.06, [
+        'hospital grade suction recommended by lactation consultants',
+        'clinically proven performance trusted by doctors'
+    ]),
+    'EVERYDAY PRACTICALITY': (0.1, [
+        'easy to clean, quick to assemble and simple to use',
+        'one-touch controls make every session effortless'
+    ]),
+    'PORTABILITY & DISCREET DESIGN': (0.08, [
+        'wearable, wireless and hands-free so you can pump on the go',
+        'quiet, discreet and compact enough to wear under clothes'
+    ]),
+    'PRICE VS VALUE': (0.3, [
+        'get a free breast pump through insurance today',
+        'save 20% off with this limited time deal and free shipping'
+    ])
+}
+
+# Neutral sentences every ad text starts from
+BASE_TEXTS = [
+    'Shop the new collection for you and baby.',
+    'Everything you need for feeding, in one place.',
+    'Discover products designed for new parents.',
+    'Build your registry in minutes.',
+    'Upgrade your pumping routine.'
+]
+
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'synthetic', 'pathmatics_synthetic_{rows}.csv')
+
+# Rows generated and written per block, so memory stays flat at 10M rows
+BLOCK_SIZE = 250_000
+
+
+def _choice(rng, weights, size):
+    """Draw ``size`` values from a {value: weight} mapping"""
+    values = np.array(list(weights), dtype=object)
+    probabilities = np.array(list(weights.values()), dtype=float)
+    return values[rng.choice(len(values), size=size, p=probabilities / probabilities.sum())]
+
+
+def _dates(days):
+    return pd.to_datetime('2023-01-01') + pd.to_timedelta(days, unit='D')
+
+
+def generate_block(rows, seed, id_offset=0):
+    """One block of Pathmatics-shaped rows with consistent theme flags and text"""
+    rng = np.random.default_rng(seed)
+
+    brands = _choice(rng, BRAND_WEIGHTS, rows)
+    channels = _choice(rng, CHANNEL_WEIGHTS, rows)
+    creative_types = _choice(rng, CREATIVE_TYPE_WEIGHTS, rows)
+    focus = _choice(rng, PRODUCT_FOCUS_WEIGHTS, rows)
+
+    # About a third of the rows repeat a creative on another placement
+    unique_creatives = max(1, int(rows * 0.62))
+    creative_ids = id_offset + rng.integers(0, unique_creatives, size=rows) + 100_000_000
+
+    # Spend and CPM are log-normal around the DME medians ($1.7k spend, ~$7.6 CPM)
+    spend = np.round(rng.lognormal(np.log(1650), 1.6, size=rows), 2)
+    cpm = rng.lognormal(np.log(7.6), 0.6, size=rows)
+    impressions = np.maximum(1, np.round(spend / cpm * 1000)).astype(np.int64)
+    duration = np.where(creative_types == 'Video', rng.integers(5, 120, size=rows), 0)
+
+    first_days = rng.integers(0, 900, size=rows)
+    last_days = first_days + rng.geometric(1 / 45, size=rows)
+    sizes = np.array(SIZES)[rng.integers(0, len(SIZES), size=rows)]
+
+    # Theme flags first, then a text built from one phrase per set flag
+    flags = {}
+    text = pd.Series(np.array(BASE_TEXTS, dtype=object)[rng.integers(0, len(BASE_TEXTS), size=rows)])
+    for theme, (rate, phrases) in MARKETING_THEMES.items():
+        flags[theme] = rng.random(rows) < rate
+        phrase = np.array(phrases, dtype=object)[rng.integers(0, len(phrases), size=rows)]
+        text = text.where(~flags[theme], text + ' ' + phrase.astype(str))
+
+    total = pd.DataFrame(flags).sum(axis=1)
+    marketing_themes = pd.Series('', index=text.index)
+    for theme, flag in flags.items():
+        separator = np.where(marketing_themes == '', '', '; ')
+        marketing_themes = marketing_themes.where(~flag, marketing_themes + separator + theme)
+    marketing_themes = marketing_themes.replace('', 'NONE')
+
+    missing_text = rng.random(rows) < 0.04
+    downloaded = rng.random(rows) < 0.64
+    description = 'The ad shows a mother with her baby. ' + text.str.slice(0, 80)
+
+    frame = pd.DataFrame({
+        'Advertiser': brands,
+        'Brand Root': brands,
+        'Brand (Major)': brands,
+        'Brand (Minor)': brands,
+        'Brand (Leaf)': brands,
+        'Category Level 1': 'All Categories',
+        'Category Level 2': 'Shopping',
+        'Category Level 3': 'Family & Parenting Shopping',
+        'Category Level 4': '',
+        'Category Level 5': '',
+        'Category Level 6': '',
+        'Category Level 7': '',
+        'Category Level 8': '',
+        'Channel': channels,
+        'Creative Id': creative_ids,
+        'Width': sizes[:, 0],
+        'Height': sizes[:, 1],
+        'Creative Type_x': creative_types,
+        'First Seen': _dates(first_days).strftime('%d/%m/%Y'),
+        'Last Seen': _dates(last_days).strftime('%d/%m/%Y'),
+        'Duration': duration,
+        'Text_x': text.where(~missing_text, ''),
+        'Landing Page': 'https://example.com/landing/' + pd.Series(creative_ids).astype(str),
+        'Link To Creative': 'https://example.com/creative/' + pd.Series(creative_ids).astype(str),
+        'Link to Post': '',
+        'Format': np.where(channels == 'Desktop Display', 'Banner', 'Other'),
+        'Placement': _choice(rng, PLACEMENT_WEIGHTS, rows),
+        'Ad Buy Type': np.where(rng.random(rows) < 0.988, 'Direct', 'Indirect'),
+        'Publisher': channels,
+        'Spend (USD)': spend,
+        'Impressions': impressions,
+        'Type': np.where(creative_types == 'Video', 'Video', np.where(downloaded, 'Image', 'Not Available')),
+        'URL_to_use': '',
+        'Creative Type_y': creative_types,
+        'Text_y': text.where(downloaded, ''),
+        'Download Status': np.where(downloaded, 'success', 'Not Available'),
+        'Audio Status': '',
+        'File Path': '',
+        'Audio Path': '',
+        'Text File': '',
+        'transcription': np.where(duration > 0, text, ''),
+        'objects_detected': np.where(downloaded, 'breast pump, bottle', ''),
+        'people_detected': np.where(downloaded, 'woman, baby', ''),
+        'text_detected': '',
+        'overall_description': description.where(downloaded, 'No media file specified'),
+        'processing_status': np.where(downloaded, 'Success', 'Skipped'),
+        'ad_category': np.where(downloaded, 'Ad Category/Product Type:\nBaby Registry Service', ''),
+        'primary_cta': np.where(downloaded, 'Primary Call-to-Action:\nLearn More', ''),
+        'value_proposition': np.where(flags['PRICE VS VALUE'], 'Free pump through insurance', ''),
+        'target_audience': np.where(downloaded, 'Expecting and new mothers', ''),
+        'focus_vs_other': np.where(focus == 'Breastfeeding Pump', 'focus', 'other'),
+        **flags,
+        'TOTAL_CATEGORIES': total,
+        'HAS_MARKETING_THEME': total > 0,
+        'MARKETING_THEMES': marketing_themes,
+        'Main_Category': _choice(rng, MAIN_CATEGORY_WEIGHTS, rows),
+        'Sub_Category': np.array(SUB_CATEGORIES, dtype=object)[rng.integers(0, len(SUB_CATEGORIES), size=rows)],
+        'Product_Focus': focus
+    })
+    return frame[SCHEMA_COLUMNS]
+
+
+def generate_csv(rows, path=None, seed=0, block_size=BLOCK_SIZE):
+    """Write ``rows`` synthetic rows to ``path`` block by block; returns the path"""
+    path = path or DEFAULT_OUTPUT.format(rows=rows)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for block, start in enumerate(range(0, rows, block_size)):
+            size = min(block_size, rows - start)
+            frame = generate_block(size, seed=(seed, block), id_offset=start)
+            frame.to_csv(f, index=False, header=(block == 0))
+            written += size
+
+    return path
+
+
+def main():
+    """Generate synthetic Pathmatics-shaped exports of the requested sizes"""
+    parser = argparse.ArgumentParser(description="Generate synthetic Pathmatics-shaped CSV exports")
+    parser.add_argument('rows', type=int, nargs='+', help="row counts to generate, e.g. 10000 1000000")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="output path (only with a single row count)")
+    args = parser.parse_args()
+
+    if args.output and len(args.rows) > 1:
+        parser.error("--output needs a single row count")
+
+    for rows in args.rows:
+        start = time.perf_counter()
+        path = generate_csv(rows, args.output, args.seed)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"Wrote {rows:,} rows to {path} ({size_mb:,.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
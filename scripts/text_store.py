@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from brand_resolver import brand_resolver
+from data_loader import BREASTFEEDING_BRANDS, CACHE_DIR, DEFAULT_CSV, cache_paths, load_ads, source_header
+
+# Free-text columns kept out of the analysis frame
+TEXT_COLUMNS = ['Text_x', 'Text_y', 'transcription', 'overall_description', 'text_detected',
+                'objects_detected', 'value_proposition']
+
+# Rows can also be looked up by creative
+KEY_COLUMN = 'Creative Id'
+
+STORE_VERSION = 1
+
+
+def write_text_store(df, directory, columns=TEXT_COLUMNS, signature=None, header=None):
+    """Write the text ``columns`` of ``df`` as offsets arrays plus UTF-8 buffers.
+
+    Row ``i`` of a column is ``buffer[offsets[i]:offsets[i + 1]]``; a separate
+    mask marks missing values so they read back as missing, not as ''.
+    ``header`` is the export's column order, restored by ``TextStore.attach``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for number, column in enumerate(column for column in columns if column in df.columns):
+        values = df[column]
+        missing = values.isna().to_numpy()
+        encoded = [b'' if absent else str(value).encode('utf-8') for value, absent in zip(values.tolist(), missing)]
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+
+        stem = f"column{number}"
+        np.save(os.path.join(directory, f"{stem}.offsets.npy"), offsets)
+        np.save(os.path.join(directory, f"{stem}.missing.npy"), missing)
+        with open(os.path.join(directory, f"{stem}.utf8"), 'wb') as f:
+            f.write(b''.join(encoded))
+        files[column] = stem
+
+    if KEY_COLUMN in df.columns:
+        keys = pd.to_numeric(df[KEY_COLUMN], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        np.save(os.path.join(directory, 'keys.npy'), keys)
+
+    manifest = {
+        'version': STORE_VERSION,
+        'rows': len(df),
+        'columns': files,
+        'keys': KEY_COLUMN in df.columns,
+        'header': header,
+        'signature': signature
+    }
+    # The manifest goes last, so a store interrupted mid-write is never opened
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return TextStore(directory)
+
+
+class TextStore:
+    """Read-only text columns backed by memory-mapped files.
+
+    Nothing is decoded until a value is asked for. ``raw`` returns a
+    zero-copy view into the mapped buffer. ``snippet`` decodes only as many
+    bytes as the requested prefix needs. When a store is pickled, only its
+    directory travels, and worker processes map the files themselves.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.columns = list(self.manifest['columns'])
+        self._open()
+
+    def _open(self):
+        self.offsets = {}
+        self.missing = {}
+        self.buffers = {}
+        for column, stem in self.manifest['columns'].items():
+            base = os.path.join(self.directory, stem)
+            self.offsets[column] = np.load(f"{base}.offsets.npy", mmap_mode='r')
+            self.missing[column] = np.load(f"{base}.missing.npy", mmap_mode='r')
+            # np.memmap can't map an empty file
+            if os.path.getsize(f"{base}.utf8"):
+                self.buffers[column] = np.memmap(f"{base}.utf8", dtype=np.uint8, mode='r')
+            else:
+                self.buffers[column] = np.empty(0, dtype=np.uint8)
+
+        self.keys = None
+        self._key_order = None
+        if self.manifest['keys']:
+            self.keys = np.load(os.path.join(self.directory, 'keys.npy'), mmap_mode='r')
+
+    def __getstate__(self):
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def raw(self, column, row):
+        """UTF-8 bytes of one value as a view into the mapped buffer; None when missing"""
+        if self.missing[column][row]:
+            return None
+        offsets = self.offsets[column]
+        return memoryview(self.buffers[column][offsets[row]:offsets[row + 1]])
+
+    def get(self, column, row):
+        """One decoded value; None when missing"""
+        data = self.raw(column, row)
+        return None if data is None else str(data, 'utf-8')
+
+    def snippet(self, column, row, chars):
+        """The first ``chars`` characters of a value, decoding no more than needed"""
+        data = self.raw(column, row)
+        if data is None:
+            return None
+        # A character is at most four bytes; a cut-off last character is dropped
+        return str(data[:chars * 4], 'utf-8', errors='ignore')[:chars]
+
+    def column(self, column, rows=None):
+        """Decode a column (or only ``rows`` of it) into a string Series"""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        values = [self.get(column, row) for row in rows]
+        return pd.Series(values, index=rows, dtype='str', name=column)
+
+    def frame(self, columns=None, rows=None):
+        """Decode several columns into a frame indexed by row position"""
+        columns = self.columns if columns is None else [column for column in columns if column in self.columns]
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        return pd.DataFrame({column: self.column(column, rows) for column in columns}, index=rows)
+
+    def rows_for(self, creative_id):
+        """Row positions of a creative"""
+        if self.keys is None:
+            raise KeyError(f"This store was written without {KEY_COLUMN}")
+        if self._key_order is None:
+            self._key_order = np.argsort(self.keys, kind='stable')
+        ordered = self.keys[self._key_order]
+        start, stop = np.searchsorted(ordered, [creative_id, creative_id + 1])
+        return self._key_order[start:stop]
+
+    def attach(self, df, columns=None, order=None):
+        """``df`` (indexed by store row) with its text columns decoded and added back.
+
+        Columns follow ``order``, by default the export header; columns not in
+        it (such as derived metrics) stay at the end.
+        """
+        text = self.frame(columns, df.index.to_numpy())
+        text.index = df.index
+        combined = pd.concat([df, text], axis=1)
+        order = order if order is not None else self.manifest.get('header')
+        if order is not None:
+            combined = combined[[column for column in order if column in combined.columns] +
+                                [column for column in combined.columns if column not in order]]
+        return combined
+
+
+def store_directory(path, brands, columns, cache_dir=CACHE_DIR):
+    """Where the text store of an export lives, next to its columnar cache"""
+    data_path, _ = cache_paths(path, cache_dir)
+    # One store per brand filter and column set; a changed export is rebuilt in place
+    selection = {'brands': sorted(brands) if brands is not None else None, 'columns': list(columns)}
+    tag = hashlib.sha1(json.dumps(selection, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(data_path)[0]}-text-{tag}"
+
+
+def open_text_store(path=DEFAULT_CSV, brands=None, columns=TEXT_COLUMNS, cache_dir=CACHE_DIR, rebuild=False):
+    """The text store of an export, (re)built when the export or the brand filter changed.
+
+    The filter keeps every spelling the brand resolver maps to ``brands``, so
+    the resolver's alias table is part of the signature too. ``rebuild``
+    rewrites the store even if its signature matches.
+    """
+    stat = os.stat(path)
+    header = source_header(path, cache_dir)
+    columns = [column for column in columns if column in header]
+    signature = {
+        'source': os.path.abspath(path),
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'brands': sorted(brands) if brands is not None else None,
+        'resolver': brand_resolver().fingerprint() if brands is not None else None,
+        'columns': columns
+    }
+
+    directory = store_directory(path, brands, columns, cache_dir)
+    if not rebuild:
+        try:
+            store = TextStore(directory)
+            if store.manifest.get('signature') == signature:
+                return store
+        except (OSError, ValueError, KeyError):
+            pass
+
+    keys = [KEY_COLUMN] if KEY_COLUMN in header else []
+    texts = load_ads(path, columns=columns + keys, brands=brands, cache_dir=cache_dir, verbose=False)
+    return write_text_store(texts, directory, columns, signature, header)
+
+
+def _in_step(df, store):
+    """Whether the rows of ``df`` are the rows of ``store``, by creative id"""
+    if store.keys is None or KEY_COLUMN not in df.columns:
+        return True
+    keys = pd.to_numeric(df[KEY_COLUMN], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    return len(keys) == len(store) and np.array_equal(keys, store.keys)
+
+
+def load_ads_with_text_store(path=DEFAULT_CSV, brands=None, text_columns=TEXT_COLUMNS, cache_dir=CACHE_DIR):
+    """Load an export without its text columns, plus the store holding them.
+
+    Both are read with the same brand filter, so row ``i`` of the frame is row
+    ``i`` of the store; the creative ids are checked to make sure. A store
+    that is out of step anyway is rebuilt once before giving up.
+    """
+    header = source_header(path, cache_dir)
+    store = open_text_store(path, brands, text_columns, cache_dir)
+    df = load_ads(path, columns=[column for column in header if column not in store.columns],
+                  brands=brands, cache_dir=cache_dir)
+
+    if not _in_step(df, store):
+        print(f"Text store {store.directory} is out of step with {path}; rebuilding it")
+        # Drop the old mappings before their files are rewritten
+        store = None
+        store = open_text_store(path, brands, text_columns, cache_dir, rebuild=True)
+        if not _in_step(df, store):
+            raise ValueError(f"Text store {store.directory} is out of step with {path}")
+
+    return df, store
+
+
+def main():
+    """Build the text store for an export and report its size"""
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    store = open_text_store(path, BREASTFEEDING_BRANDS)
+    size = sum(os.path.getsize(os.path.join(store.directory, name)) for name in os.listdir(store.directory))
+    print(f"Text store for {len(store):,} rows x {len(store.columns)} columns at {store.directory} "
+          f"({size / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Theme detection rules used across the ads analysis
+THEME_RULES = {
+    'Wearable/Portability': [
+        r'wearable', r'hands.?free', r'portable', r'on the go', r'discreet',
+        r'quiet', r'wireless', r'compact', r'stealth', r'under clothes'
+    ],
+    'Comfort/Soothing': [
+        r'comfort', r'gentle', r'soft', r'fit', r'soothe', r'sore',
+        r'lanolin', r'leak', r'pain.?free', r'gentle', r'cushion'
+    ],
+    'Performance/Suction': [
+        r'power', r'performance', r'strong', r'suction', r'hospital.?grade',
+        r'efficiency', r'output', r'milk.?production', r'flow'
+    ],
+    'Education/How-to': [
+        r'how to', r'guide', r'tips?', r'tutorial', r'learn', r'explainer',
+        r'step.?by.?step', r'instructions', r'help'
+    ],
+    'Lifestyle/Motherhood': [
+        r'mom', r'mother', r'family', r'postpartum', r'journey',
+        r'return to work', r'night', r'sleep', r'breastfeeding.?journey'
+    ],
+    'Value/Promotion': [
+        r'deal', r'discount', r'save', r'off\b', r'coupon', r'promo',
+        r'bundle', r'free', r'gift', r'sale', r'offer'
+    ],
+    'Emotional Connection': [
+        r'love', r'care', r'support', r'confidence', r'empower',
+        r'beautiful', r'special', r'moment', r'connection'
+    ],
+    'Convenience': [
+        r'easy', r'simple', r'quick', r'fast', r'convenient',
+        r'time.?saving', r'effortless', r'one.?touch'
+    ]
+}
+
+# Text fields combined (space separated) before matching
+THEME_TEXT_COLUMNS = ['Text_x', 'Text_y', 'overall_description', 'value_proposition']
+
+
+def compile_theme_patterns(theme_rules=THEME_RULES):
+    """Combine each theme's patterns into a single alternation regex"""
+    return {
+        theme: '|'.join(f'(?:{pattern})' for pattern in patterns)
+        for theme, patterns in theme_rules.items()
+    }
+
+
+def combine_text_columns(df, text_columns=THEME_TEXT_COLUMNS):
+    """Build the lowercased combined text for every row at once"""
+    combined = None
+    for column in text_columns:
+        if column in df.columns:
+            # Missing values are rendered as 'nan', like the f-string they replace
+            part = df[column].fillna('nan').astype(str)
+        else:
+            part = pd.Series('', index=df.index, dtype=str)
+        combined = part if combined is None else combined + ' ' + part
+
+    if combined is None:
+        combined = pd.Series('', index=df.index, dtype=str)
+
+    return combined.str.lower()
+
+
+def detect_theme_matrix(df, theme_rules=THEME_RULES, text_columns=THEME_TEXT_COLUMNS):
+    """Return a rows x themes boolean matrix of detected themes"""
+    text = combine_text_columns(df, text_columns)
+    patterns = compile_theme_patterns(theme_rules)
+
+    matrix = {}
+    for theme, pattern in patterns.items():
+        matrix[theme] = text.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+    return pd.DataFrame(matrix, index=df.index, columns=list(patterns), dtype=bool)
+
+
+def _ordered_counter(block, first_rows, themes):
+    """Build a Counter whose key order follows first appearance in row order"""
+    counts = block.sum(axis=0)
+    present = np.flatnonzero(counts > 0)
+    # Themes are appended per row in rule order, so sort by (first row, rule order)
+    order = present[np.lexsort((present, first_rows[present]))]
+
+    counter = Counter()
+    for idx in order:
+        counter[themes[idx]] = int(counts[idx])
+    return counter
+
+
+def summarize_theme_matrix(theme_matrix, brands):
+    """Compute overall and per-brand theme Counters from a theme matrix"""
+    themes = list(theme_matrix.columns)
+    values = theme_matrix.to_numpy(dtype=bool)
+    n_rows = len(values)
+
+    # Row position of each hit, or n_rows where the theme is absent
+    positions = np.where(values, np.arange(n_rows)[:, None], n_rows)
+
+    overall = _ordered_counter(values, positions.min(axis=0, initial=n_rows), themes)
+
+    codes, uniques = pd.factorize(pd.Series(brands).reset_index(drop=True), use_na_sentinel=False)
+    # Stable sort groups each brand's rows together while keeping row order
+    grouped = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[grouped], np.arange(len(uniques) + 1))
+
+    brand_themes = {}
+    for code, brand in enumerate(uniques):
+        rows = grouped[bounds[code]:bounds[code + 1]]
+        brand_themes[brand] = _ordered_counter(
+            values[rows], positions[rows].min(axis=0, initial=n_rows), themes
+        )
+
+    return overall, brand_themes
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_loader import BREASTFEEDING_BRANDS, load_ads
+from metrics import cpm, performance_score
+from theme_engine import THEME_TEXT_COLUMNS, detect_theme_matrix
+from trend_engine import group_pairs
+
+
+class Ranking:
+    """Rows with the largest ``column``; with ``above`` = (column, value), only rows where column > value"""
+
+    def __init__(self, column, above=None):
+        self.column = column
+        self.above = above
+
+    def mask(self, df):
+        """Rows eligible for the ranking"""
+        if self.above is None:
+            return pd.Series(True, index=df.index)
+        column, value = self.above
+        return df[column] > value
+
+    def values(self, df):
+        """Ranking values as floats; NaN for rows that can't rank"""
+        values = pd.to_numeric(df[self.column], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        if self.above is not None:
+            values = np.where(self.mask(df).to_numpy(), values, np.nan)
+        return values
+
+
+# Rankings of the top ads report
+TOP_RANKINGS = {
+    'top_by_impressions': Ranking('Impressions'),
+    # High impressions at a low CPM
+    'top_by_efficiency': Ranking('Performance_Score'),
+    # Spend efficiency among ads past 1,000 impressions
+    'efficient_ads': Ranking('Impressions', above=('Impressions', 1000))
+}
+
+# Dimensions top ads can be ranked within; themes come from the theme matrix
+TOP_K_DIMENSIONS = ['Brand Root', 'Channel', 'theme']
+
+
+def top_positions(values, positions, k):
+    """The ``k`` positions with the largest values, largest first, like ``nlargest(keep='first')``.
+
+    ``positions`` must be ascending. ``np.argpartition`` finds the k-th
+    largest value without sorting the segment; rows tied with it are taken
+    in position order, so ties resolve exactly as pandas resolves them.
+    Only the k survivors are sorted. NaN values never rank, where nlargest
+    would pad a short result with them.
+    """
+    keep = ~np.isnan(values)
+    values, positions = values[keep], positions[keep]
+    if len(values) > k:
+        if k <= 0:
+            return positions[:0]
+        threshold = values[np.argpartition(values, len(values) - k)[len(values) - k]]
+        above = values > threshold
+        ties = np.flatnonzero(values == threshold)[:k - int(above.sum())]
+        chosen = np.sort(np.concatenate([np.flatnonzero(above), ties]))
+        values, positions = values[chosen], positions[chosen]
+    return positions[np.lexsort((positions, -values))]
+
+
+class TopK:
+    """Top-``k`` rows of several rankings within every group, in one pass.
+
+    Rows are sorted by group once; every ranking then partitions each
+    group's segment with ``top_positions``, so no group is ever fully sorted
+    and the grouping is shared by all rankings. ``groups`` is a label Series
+    (one group per row) or a boolean rows x groups frame such as the theme
+    matrix (a row ranks in every group it is flagged for); without it the
+    whole frame is one group, keyed None.
+
+    Only row positions are stored. ``frame`` copies just the ranked rows,
+    and ``records`` just the requested columns of them.
+    """
+
+    def __init__(self, df, k=20, rankings=TOP_RANKINGS, groups=None):
+        self.df = df
+        self.k = k
+        self.rankings = rankings
+
+        if groups is None:
+            rows, codes, self.labels = np.arange(len(df)), np.zeros(len(df), dtype=np.int64), pd.Index([None])
+        else:
+            rows, codes, self.labels = group_pairs(groups)
+        order = np.argsort(codes, kind='stable')
+        rows, codes = rows[order], codes[order]
+        starts = np.searchsorted(codes, np.arange(len(self.labels)), side='left')
+        stops = np.searchsorted(codes, np.arange(len(self.labels)), side='right')
+
+        self.positions = {}
+        for name, ranking in rankings.items():
+            values = ranking.values(df)
+            self.positions[name] = {
+                label: top_positions(values[rows[start:stop]], rows[start:stop], k)
+                for label, start, stop in zip(self.labels, starts, stops)
+            }
+
+    def frame(self, name, group=None, columns=None):
+        """The ranked rows (with their original index), optionally only ``columns``"""
+        df = self.df if columns is None else self.df[[column for column in columns if column in self.df.columns]]
+        return df.iloc[self.positions[name][group]]
+
+    def frames(self, group=None):
+        """Every ranking's rows for one group, by ranking name"""
+        return {name: self.frame(name, group) for name in self.rankings}
+
+    def records(self, name, group=None, columns=None):
+        """The ranked rows as dicts of ``columns``, read straight from the column arrays"""
+        return ad_records(self.df, columns, self.positions[name][group])
+
+
+def ad_records(df, columns=None, positions=None):
+    """Rows of ``df`` (or only ``positions``) as dicts holding just ``columns``.
+
+    Values are plain Python objects, as ``iterrows`` yields them, so records
+    serialize to JSON as they are.
+    """
+    columns = list(df.columns) if columns is None else [column for column in columns if column in df.columns]
+    positions = np.arange(len(df)) if positions is None else positions
+    arrays = [df[column].to_numpy()[positions].astype(object) for column in columns]
+    return [dict(zip(columns, values)) for values in zip(*arrays)]
+
+
+def main():
+    """Print the top ads of every ranking within each brand, channel or theme"""
+    parser = argparse.ArgumentParser(description="Top ads per brand, channel or theme")
+    parser.add_argument('--by', choices=TOP_K_DIMENSIONS, default='Brand Root')
+    parser.add_argument('--k', type=int, default=3, help="rows per group and ranking")
+    parser.add_argument('--ranking', choices=list(TOP_RANKINGS), action='append',
+                        help="rankings to show (default: all)")
+    args = parser.parse_args()
+
+    columns = ['Brand Root', 'Channel', 'Creative Id', 'Impressions', 'Spend (USD)'] + THEME_TEXT_COLUMNS
+    ads = load_ads(columns=columns, brands=BREASTFEEDING_BRANDS)
+    # Same derivation as ads_performance_analysis
+    impressions = ads['Impressions'].fillna(0)
+    ads['CPM'] = cpm(ads['Spend (USD)'].fillna(0), impressions)
+    ads['Performance_Score'] = performance_score(impressions, ads['CPM'])
+
+    groups = detect_theme_matrix(ads) if args.by == 'theme' else ads[args.by]
+    rankings = {name: TOP_RANKINGS[name] for name in args.ranking or TOP_RANKINGS}
+    top = TopK(ads, args.k, rankings, groups)
+
+    shown = ['Creative Id', 'Brand Root', 'Channel', 'Impressions', 'CPM', 'Performance_Score']
+    for name in rankings:
+        print(f"\n=== {name.replace('_', ' ').upper()} BY {args.by.upper()} ===")
+        for group in top.labels:
+            records = top.records(name, group, shown)
+            if not records:
+                continue
+            print(f"\n--- {group} ---")
+            for record in records:
+                print(f"{record['Creative Id']:>12}  {record['Brand Root'][:28]:<28}  {record['Channel']:<12}"
+                      f"  {record['Impressions']:>14,.0f}  CPM {record['CPM']:8.2f}"
+                      f"  score {record['Performance_Score']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
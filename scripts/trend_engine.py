@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import BREASTFEEDING_BRANDS, load_ads, parse_dates
+from theme_engine import THEME_TEXT_COLUMNS, detect_theme_matrix
+
+# Measures spread over each creative's active days
+TREND_MEASURES = ['spend', 'impressions']
+
+# Series frequencies: daily dates, Monday-to-Sunday weeks, calendar months
+FREQUENCIES = {'daily': None, 'weekly': 'W-SUN', 'monthly': 'M'}
+
+# Dimensions trends are broken down by; themes come from the theme matrix
+TREND_DIMENSIONS = ['Brand Root', 'Channel', 'theme']
+
+
+def active_days(df):
+    """(first day, number of active days) per row.
+
+    Days run from First Seen to Last Seen inclusive. Where Last Seen is
+    missing or earlier than First Seen, the export's Duration (in days) is
+    used instead, and a row is always active for at least one day.
+    """
+    first = parse_dates(df['First Seen'])
+    last = parse_dates(df['Last Seen'])
+    days = ((last - first).dt.days + 1).to_numpy(dtype=float)
+
+    if 'Duration' in df.columns:
+        duration = pd.to_numeric(df['Duration'], errors='coerce').to_numpy(dtype=float)
+        days = np.where(np.isnan(days) | (days < 1), duration, days)
+
+    days = np.nan_to_num(days, nan=1.0)
+    return first, np.maximum(days, 1).astype(np.int64)
+
+
+def group_pairs(groups):
+    """(row, group code) pairs and group labels for a label Series or a boolean matrix.
+
+    A Series puts each row in one group. A rows x groups boolean frame (such
+    as the theme matrix) puts a row in every group it is flagged for.
+    """
+    if isinstance(groups, pd.DataFrame):
+        rows, codes = np.nonzero(groups.to_numpy(dtype=bool))
+        return rows, codes, pd.Index(groups.columns)
+
+    codes, labels = pd.factorize(groups, sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    return rows, codes[rows], pd.Index(labels, name=groups.name)
+
+
+class TrendEngine:
+    """Daily spend and impressions per group, with prefix sums for window queries.
+
+    Each row's measures are spread evenly over its active days with a
+    difference array: the daily rate is added on the first day and taken off
+    the day after the last. A cumulative sum then gives every group's daily
+    series in one vectorized pass, with no per-row date loop. A second
+    cumulative sum gives prefix sums, so the total of any date window costs
+    two lookups.
+    """
+
+    def __init__(self, start, daily, groups):
+        self.start = start
+        self.daily = daily
+        self.groups = groups
+        days = next(iter(daily.values())).shape[1]
+        self.dates = pd.date_range(start, periods=days, freq='D')
+        # prefix[measure][g, d] is the total of days before d
+        self.prefix = {
+            measure: np.concatenate([np.zeros((len(groups), 1)), np.cumsum(values, axis=1)], axis=1)
+            for measure, values in daily.items()
+        }
+
+    @classmethod
+    def from_frame(cls, df, groups):
+        """Spread the Spend (USD) and Impressions of ``df`` over days, per group"""
+        first, days = active_days(df)
+        rows, codes, labels = group_pairs(groups)
+
+        dated = ~first.isna().to_numpy()
+        keep = dated[rows]
+        rows, codes = rows[keep], codes[keep]
+
+        if len(rows) == 0:
+            start = pd.Timestamp.today().normalize()
+            empty = np.zeros((len(labels), 0))
+            return cls(start, {measure: empty for measure in TREND_MEASURES}, labels)
+
+        start = first[dated].min()
+        offsets = (first.to_numpy()[rows] - start.to_datetime64()).astype('timedelta64[D]').astype(np.int64)
+        ends = offsets + days[rows]
+        span = int(ends.max())
+
+        values = {
+            'spend': pd.to_numeric(df['Spend (USD)'], errors='coerce').fillna(0).to_numpy(dtype=float),
+            'impressions': pd.to_numeric(df['Impressions'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        }
+
+        daily = {}
+        for measure, totals in values.items():
+            rates = totals[rows] / days[rows]
+            delta = np.zeros((len(labels), span + 1))
+            np.add.at(delta, (codes, offsets), rates)
+            np.add.at(delta, (codes, ends), -rates)
+            # Clip the rounding residue left where rates cancel out
+            daily[measure] = np.maximum(np.cumsum(delta, axis=1)[:, :span], 0)
+
+        return cls(start, daily, labels)
+
+    def _rows(self, group):
+        if group is None:
+            return slice(None)
+        return self.groups.get_loc(group)
+
+    def series(self, frequency='daily', measure='spend', group=None):
+        """Series of ``measure`` at ``frequency``: a frame of all groups, or one group's Series"""
+        frame = pd.DataFrame(self.daily[measure].T, index=self.dates, columns=self.groups)
+        if FREQUENCIES[frequency] is not None:
+            frame = frame.groupby(self.dates.to_period(FREQUENCIES[frequency])).sum()
+        return frame if group is None else frame[group]
+
+    def _offset(self, date):
+        """Number of series days before ``date``, clipped to the series"""
+        days = (pd.Timestamp(date) - self.start).days
+        return int(np.clip(days, 0, len(self.dates)))
+
+    def window(self, start, end, measure='spend', group=None):
+        """Total of ``measure`` from ``start`` to ``end`` inclusive, in O(1) per group"""
+        prefix = self.prefix[measure][self._rows(group)]
+        end = pd.Timestamp(end) + pd.Timedelta(days=1)
+        return prefix[..., self._offset(end)] - prefix[..., self._offset(start)]
+
+    def rolling(self, days, measure='spend', group=None):
+        """Trailing ``days``-day totals for every day, from the prefix sums"""
+        prefix = self.prefix[measure][self._rows(group)]
+        upper = np.arange(1, len(self.dates) + 1)
+        lower = np.maximum(upper - days, 0)
+        totals = prefix[..., upper] - prefix[..., lower]
+        if group is None:
+            return pd.DataFrame(totals.T, index=self.dates, columns=self.groups)
+        return pd.Series(totals, index=self.dates, name=group)
+
+
+def build_trends(df, theme_matrix=None):
+    """A TrendEngine per trend dimension present in ``df``"""
+    trends = {}
+    for dimension in TREND_DIMENSIONS:
+        if dimension == 'theme':
+            if theme_matrix is None:
+                theme_matrix = detect_theme_matrix(df)
+            trends[dimension] = TrendEngine.from_frame(df, theme_matrix)
+        elif dimension in df.columns:
+            trends[dimension] = TrendEngine.from_frame(df, df[dimension])
+    return trends
+
+
+def main():
+    """Print spend trends per brand, channel and theme"""
+    parser = argparse.ArgumentParser(description="Spend and impression trends over the creatives' active days")
+    parser.add_argument('--frequency', choices=list(FREQUENCIES), default='monthly',
+                        help="granularity of the printed series")
+    parser.add_argument('--measure', choices=TREND_MEASURES, default='spend')
+    parser.add_argument('--window', type=int, default=30, help="days in the trailing window")
+    parser.add_argument('--output', help="directory to write every series to as CSV")
+    args = parser.parse_args()
+
+    ads = load_ads(
+        columns=['Brand Root', 'Channel', 'First Seen', 'Last Seen', 'Duration', 'Spend (USD)', 'Impressions']
+        + THEME_TEXT_COLUMNS,
+        brands=BREASTFEEDING_BRANDS
+    )
+    trends = build_trends(ads)
+
+    for dimension, engine in trends.items():
+        print(f"\n=== {dimension.upper()} {args.measure.upper()} ({args.frequency}) ===")
+        print(engine.series(args.frequency, args.measure).tail(12).round(2))
+
+        if len(engine.dates):
+            last = engine.dates[-1]
+            first = last - pd.Timedelta(days=args.window - 1)
+            print(f"\nLast {args.window} days ({first.date()} to {last.date()}):")
+            print(pd.Series(engine.window(first, last, args.measure), index=engine.groups).round(2)
+                  .sort_values(ascending=False))
+
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            name = dimension.lower().replace(' ', '_')
+            for frequency in FREQUENCIES:
+                for measure in TREND_MEASURES:
+                    path = os.path.join(args.output, f"{name}_{frequency}_{measure}.csv")
+                    engine.series(frequency, measure).to_csv(path)
+
+    if args.output:
+        print(f"\nSeries written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()